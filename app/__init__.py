@@ -0,0 +1,20 @@
+"""
+app  ––  the experiment scripts as an importable, lazily loaded package
+
+    from app import query_engine
+    print(query_engine.query("how to get select clip from sequence"))
+
+  - `import app` imports nothing else; each submodule below is imported
+    on first attribute access
+  - importing a submodule has no side effects either: models, stores and
+    indexes are built on first use (get_index(), get_retriever(), ...)
+    and llama_index / faiss / langchain are imported at that point
+"""
+import importlib
+
+__all__ = ["query_engine", "ollama_query_engine", "embed_save", "similarity", "langchain_exp"]
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
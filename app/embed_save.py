@@ -1,70 +1,120 @@
-import logging
-import os
-from dotenv import load_dotenv
-import faiss
-from pymongo import MongoClient
-
-from llama_index.core import VectorStoreIndex, StorageContext, Settings, SimpleDirectoryReader
-from llama_index.embeddings.ollama import OllamaEmbedding
-from llama_index.vector_stores.faiss import FaissVectorStore
-from llama_index.storage.docstore.mongodb import MongoDocumentStore
-from llama_index.storage.index_store.mongodb import MongoIndexStore
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Load environment variables
-load_dotenv()
-
-# ---- Embedding model ----
-embed_model = OllamaEmbedding(model_name="embeddinggemma", base_url="http://localhost:11434")
-Settings.embed_model = embed_model
-
-# ---- Detect embedding dimension dynamically ----
-sample_vec = embed_model.get_text_embedding("test")
-embedding_dim = len(sample_vec)
-logger.info(f"Detected embedding dimension: {embedding_dim}")
-
-# ---- MongoDB setup ----
-mongo_uri = "mongodb://127.0.0.1:27017"
-db_name = "llama_index"
-
-MongoClient(mongo_uri).drop_database(db_name)
-logger.info("Old MongoDB database dropped")
+"""
+embed_save.py  ––  build the LlamaIndex docstore + FAISS index from docs_txt/
 
-docstore = MongoDocumentStore.from_uri(uri=mongo_uri, db_name=db_name)
-index_store = MongoIndexStore.from_uri(uri=mongo_uri, db_name=db_name)
+    python app/embed_save.py [--input-dir ./docs_txt]
 
-# ---- FAISS setup ----
-faiss_index = faiss.IndexFlatL2(embedding_dim)
-vector_store = FaissVectorStore(faiss_index=faiss_index)
+    from app.embed_save import build_index
+    build_index()
 
-# Ensure embeddings folder exists
-os.makedirs("./embeddings", exist_ok=True)
-faiss_file_path = "./embeddings/faiss.index"
-
-# ---- Storage Context ----
-storage_context = StorageContext.from_defaults(
-    docstore=docstore,
-    index_store=index_store,
-    vector_store=vector_store
-)
-
-# ---- Read and index documents ----
-documents = SimpleDirectoryReader(input_dir="./docs_txt", recursive=True).load_data()
-logger.info(f"Loaded {len(documents)} documents")
-
-index = VectorStoreIndex.from_documents(
-    documents,
-    storage_context=storage_context,
-    embed_model=embed_model
-)
-
-# ---- Persist everything ----
-storage_context.persist()
-faiss.write_index(vector_store._faiss_index, faiss_file_path)
+  - builds into a new docstore generation (sqlite_docstore.py) and writes
+    the FAISS index into it; the live one keeps serving until the
+    validated build is promoted, and FAISS file and docstore switch
+    together with a single rename (FAISS_PATH is a symlink through it)
+  - importing does nothing; llama_index, faiss and dotenv are imported
+    when build_index() runs
+"""
+import logging
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
 
-logger.info(f"FAISS index saved at {faiss_file_path}")
-logger.info(f"Total vectors in FAISS: {vector_store._faiss_index.ntotal}")
+logger = logging.getLogger(__name__)
 
-logger.info("Index creation and storage complete")
+# --- Config ---
+EMBED_MODEL = "embeddinggemma"
+DOCS_DIR = "./docs_txt"
+FAISS_PATH = "./embeddings/faiss.index"
+SMOKE_QUERY = "sequence"
+FAISS_FILE = "faiss.index"      # name inside the docstore generation
+
+# --- Validate + promote ---
+def validate_staged(faiss_index, docstore, retriever):
+    """Raise SystemExit unless the staged build is consistent and searchable."""
+    n_vectors, n_nodes = faiss_index.ntotal, len(docstore.docs)
+    if n_vectors != n_nodes:
+        raise SystemExit(f"Staged build rejected: {n_vectors} vectors but {n_nodes} docstore nodes")
+    if not retriever.retrieve(SMOKE_QUERY):
+        raise SystemExit("Staged build rejected: smoke query returned nothing")
+    logger.info(f"Staged build validated ({n_nodes} nodes)")
+    return n_nodes
+
+def promote(staging, faiss_index, faiss_file_path: str = FAISS_PATH):
+    """Write the FAISS index into the staging generation and make both live."""
+    import faiss
+    from sqlite_docstore import promote_stores
+
+    faiss.write_index(faiss_index, str(Path(staging) / FAISS_FILE))
+    promote_stores(staging, links={FAISS_FILE: Path(faiss_file_path)})
+
+# --- Build ---
+def build_index(input_dir: str = DOCS_DIR, faiss_file_path: str = FAISS_PATH):
+    """Embed, validate and promote; returns the number of indexed nodes."""
+    from dotenv import load_dotenv
+    import faiss
+    from llama_index.core import VectorStoreIndex, StorageContext, Settings, SimpleDirectoryReader
+    from llama_index.vector_stores.faiss import FaissVectorStore
+
+    from ollama_client import llama_index_embedding
+    from sqlite_docstore import DOCSTORE_BACKEND, make_staging_stores
+
+    # Load environment variables
+    load_dotenv()
+
+    # ---- Embedding model ----
+    embed_model = llama_index_embedding(EMBED_MODEL)
+    Settings.embed_model = embed_model
+
+    # ---- Detect embedding dimension dynamically ----
+    sample_vec = embed_model.get_text_embedding("test")
+    embedding_dim = len(sample_vec)
+    logger.info(f"Detected embedding dimension: {embedding_dim}")
+
+    # ---- Docstore / index store (embedded SQLite unless DOCSTORE_BACKEND=mongo) ----
+    # Build into a staging store; the live one keeps serving until promotion.
+    staging, (docstore, index_store) = make_staging_stores()
+    logger.info(f"Building into staging {DOCSTORE_BACKEND} docstore: {staging}")
+
+    # ---- FAISS setup ----
+    faiss_index = faiss.IndexFlatL2(embedding_dim)
+    vector_store = FaissVectorStore(faiss_index=faiss_index)
+
+    # ---- Storage Context ----
+    storage_context = StorageContext.from_defaults(
+        docstore=docstore,
+        index_store=index_store,
+        vector_store=vector_store
+    )
+
+    # ---- Read and index documents ----
+    documents = SimpleDirectoryReader(input_dir=input_dir, recursive=True).load_data()
+    logger.info(f"Loaded {len(documents)} documents")
+
+    index = VectorStoreIndex.from_documents(
+        documents,
+        storage_context=storage_context,
+        embed_model=embed_model
+    )
+
+    # ---- Validate, then promote: FAISS file and docstore switch together ----
+    n_nodes = validate_staged(vector_store._faiss_index, docstore,
+                              index.as_retriever(similarity_top_k=1))
+    promote(staging, vector_store._faiss_index, faiss_file_path)
+    storage_context.persist()
+
+    logger.info(f"FAISS index saved at {faiss_file_path}")
+    logger.info(f"Total vectors in FAISS: {n_nodes}")
+    return n_nodes
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input-dir", default=DOCS_DIR)
+    parser.add_argument("--faiss", default=FAISS_PATH)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    build_index(args.input_dir, args.faiss)
+    logger.info("Index creation and storage complete")
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,34 @@
-# app/langchain_ollama_rag.py
+"""
+langchain_exp.py  ––  LangChain RAG: FAISS + docstore retrieval, Ollama answer
+
+    python app/langchain_exp.py "How to set backend preference?"
+
+    from app.langchain_exp import rag_query
+    print(rag_query("How to set backend preference?"))
+
+  - importing does nothing: LLM, embeddings, FAISS index and docstore
+    are opened on first use and cached for the process
+  - langchain / faiss are imported by the functions that need them
+"""
 import logging
-import os
-import faiss
-import numpy as np
-from pymongo import MongoClient
-from langchain_ollama.llms import OllamaLLM
-from langchain_ollama.embeddings import OllamaEmbeddings
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS
-
-logging.basicConfig(level=logging.INFO)
+import sys
+from functools import lru_cache
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from tracing import span
+
 logger = logging.getLogger(__name__)
 
 # --- Config ---
 mongo_uri = "mongodb://127.0.0.1:27017/llama_index"
 FAISS_PATH = "./embeddings/faiss.index"
-DOCSTORE_DB = "llama_index"
 DOCSTORE_COLLECTION = "docstore"
+LLM_MODEL = "llama3.1:8b"
+EMBED_MODEL = "EmbeddingGemma:latest"
+TOP_K = 2
+DEFAULT_QUERY = "How to set backend preference?"
 
-# --- 1. LLM + Embeddings ---
-llm = OllamaLLM(model="llama3.1:8b", base_url="http://localhost:11434")
-embeddings = OllamaEmbeddings(model="EmbeddingGemma:latest", base_url="http://localhost:11434")
-
-# --- 2. Load FAISS ---
-try:
-    faiss_index = faiss.read_index(FAISS_PATH)
-    logger.info(f"Loaded FAISS index with {faiss_index.ntotal} vectors.")
-except Exception as e:
-    logger.error(f"Failed to load FAISS index: {e}")
-    faiss_index = None
-
-# --- 3. Custom Retriever ---
-class LlamaIndexSplitRetriever:
-    def __init__(self, faiss_index, embeddings, mongo_client, k=2):
-        self.faiss_index = faiss_index
-        self.embeddings = embeddings
-        self.mongo_client = mongo_client
-        self.k = k
-
-    def get_relevant_docs(self, query: str):
-        query_vector = np.array(self.embeddings.embed_query(query)).reshape(1, -1)
-        D, I = self.faiss_index.search(query_vector, self.k)
-        db = self.mongo_client[DOCSTORE_DB]
-        collection = db[DOCSTORE_COLLECTION]
-        docs = []
-        for idx in I[0]:
-            doc_data = collection.find_one({"_id": int(idx.item())})  # ensures pure int
-            if doc_data:
-                docs.append(Document(
-                    page_content=doc_data.get("text", ""),
-                    metadata=doc_data.get("metadata", {})
-                ))
-        return docs
-
-client = MongoClient(mongo_uri)
-retriever = LlamaIndexSplitRetriever(faiss_index, embeddings, client, k=2)
-
-# --- 4. RAG Prompt ---
+# --- RAG Prompt ---
 template = """Use the following context to answer the question.
 If you don't know the answer, just say you don't know.
 ----------------
@@ -69,17 +38,63 @@ CONTEXT:
 QUESTION:
 {question}"""
 
-prompt = ChatPromptTemplate.from_template(template)
+# --- Components (built on first use) ---
+@lru_cache(maxsize=None)
+def get_llm():
+    from ollama_client import langchain_llm
+    return langchain_llm(LLM_MODEL)
+
+@lru_cache(maxsize=None)
+def get_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_template(template)
+
+def load_faiss(path: str = FAISS_PATH):
+    import faiss
+    try:
+        faiss_index = faiss.read_index(path)
+        logger.info(f"Loaded FAISS index with {faiss_index.ntotal} vectors.")
+        return faiss_index
+    except Exception as e:
+        logger.error(f"Failed to load FAISS index: {e}")
+        return None
 
-# --- 5. Build chain ---
+@lru_cache(maxsize=None)
+def get_retriever():
+    """Batched lookups + LRU node cache, see mongo_retriever.py. Reads the
+    docstore embed_save.py wrote (SQLite unless DOCSTORE_BACKEND=mongo)."""
+    from mongo_retriever import make_retriever
+    from ollama_client import langchain_embeddings
+
+    return make_retriever(load_faiss(), langchain_embeddings(EMBED_MODEL), k=TOP_K,
+                          uri=mongo_uri, collection=DOCSTORE_COLLECTION)
+
+# --- Chain ---
 def rag_query(question: str):
-    docs = retriever.get_relevant_docs(question)
-    context_text = "\n".join(doc.page_content for doc in docs)
-    final_prompt = prompt.format(context=context_text, question=question)
-    return llm.invoke(final_prompt)
-
-# --- 6. Test ---
-query = "How to set backend preference?"
-response = rag_query(query)
-logger.info(f"Question: {query}\nAnswer: {response}")
-print(response)
+    from context_packer import pack_texts
+    with span("rag_query"):
+        docs = get_retriever().get_relevant_docs(question)       # embed / faiss_search / resolve spans
+        with span("pack", candidates=len(docs)):
+            context_text = "\n".join(pack_texts(question, [doc.page_content for doc in docs]))
+        final_prompt = get_prompt().format(context=context_text, question=question)
+        with span("llm"):
+            return get_llm().invoke(final_prompt)
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("query", nargs="?", default=DEFAULT_QUERY)
+    parser.add_argument("--metrics", action="store_true", help="Print per-stage latency summary")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    response = rag_query(args.query)
+    logger.info(f"Question: {args.query}\nAnswer: {response}")
+    print(response)
+    if args.metrics:
+        import json
+        import tracing
+        print(json.dumps(tracing.metrics(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,97 @@
-import logging
-import os
-import faiss
+"""
+ollama_query_engine.py  ––  same query engine as query_engine.py, fully local (Ollama LLM)
+
+    python app/ollama_query_engine.py "how to set transition of duration"
 
-from llama_index.core import StorageContext, Settings, load_index_from_storage
-from llama_index.embeddings.ollama import OllamaEmbedding
-from llama_index.llms.ollama import Ollama
-from llama_index.vector_stores.faiss import FaissVectorStore
-from llama_index.storage.docstore.mongodb import MongoDocumentStore
-from llama_index.storage.index_store.mongodb import MongoIndexStore
+    from app.ollama_query_engine import query
+    print(query("how to set transition of duration"))
+
+  - importing does nothing: models, stores and index load on first use
+    and are cached for the process
+  - the LLM and embedding model are passed explicitly, the global
+    LlamaIndex Settings are left alone
+"""
+import logging
+import sys
+from functools import lru_cache
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from tracing import span
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# LLM and embedding model (local Ollama)
-llm = Ollama(model="phi3:latest")  # local model
-embed_model = OllamaEmbedding(model_name="embeddinggemma:latest", base_url="http://localhost:11434")  # embeddings still local
-
-# MongoDB stores
-mongo_uri = "mongodb://127.0.0.1:27017/llama_index"
-docstore = MongoDocumentStore.from_uri(uri=mongo_uri, db_name="llama_index")
-index_store = MongoIndexStore.from_uri(uri=mongo_uri, db_name="llama_index")
-
-# Load persisted Faiss index
-embedding_dim = 768
-faiss_index = faiss.read_index("./embeddings/faiss.index")
-vector_store = FaissVectorStore(faiss_index=faiss_index)
-
-# Storage context
-storage_context = StorageContext.from_defaults(
-    docstore=docstore,
-    index_store=index_store,
-    vector_store=vector_store
-)
-
-# Load index fully (nodes + Faiss vectors)
-index = load_index_from_storage(
-    storage_context,
-    embed_model=embed_model
-)
-# Create query engine
-query_engine = index.as_query_engine(similarity_top_k=2, response_mode="compact",llm=llm)
-
-# Query
-query = "how to set transition of duration"
-retrieved_nodes = index.as_retriever(similarity_top_k=2).retrieve(query)
-context = "\n".join([node.text for node in retrieved_nodes])
-logger.info(f"Query: {query}\nContext:\n{context}")
-
-response = query_engine.query(query)
-logger.info(f"Response: {response}")
-print(response)
+# --- Config ---
+LLM_MODEL = "phi3:latest"                  # local model
+EMBED_MODEL = "embeddinggemma:latest"      # embeddings still local
+FAISS_PATH = "./embeddings/faiss.index"
+TOP_K = 2
+DEFAULT_QUERY = "how to set transition of duration"
+
+# --- Components (built on first use) ---
+@lru_cache(maxsize=None)
+def get_llm():
+    from ollama_client import llama_index_llm
+    return llama_index_llm(LLM_MODEL)
+
+@lru_cache(maxsize=None)
+def get_embed_model():
+    from ollama_client import llama_index_embedding
+    return llama_index_embedding(EMBED_MODEL)
+
+@lru_cache(maxsize=None)
+def get_index():
+    """Persisted index (docstore nodes + FAISS vectors)."""
+    import faiss
+    from llama_index.core import StorageContext, load_index_from_storage
+    from llama_index.vector_stores.faiss import FaissVectorStore
+    from sqlite_docstore import make_stores
+
+    with span("load_index"):
+        # Docstore / index store (embedded SQLite unless DOCSTORE_BACKEND=mongo)
+        docstore, index_store = make_stores()
+        vector_store = FaissVectorStore(faiss_index=faiss.read_index(FAISS_PATH))
+        storage_context = StorageContext.from_defaults(
+            docstore=docstore,
+            index_store=index_store,
+            vector_store=vector_store
+        )
+        return load_index_from_storage(storage_context, embed_model=get_embed_model())
+
+@lru_cache(maxsize=None)
+def get_query_engine():
+    from context_packer import llama_index_postprocessor
+    return get_index().as_query_engine(similarity_top_k=TOP_K, response_mode="compact", llm=get_llm(),
+                                       node_postprocessors=[llama_index_postprocessor()])
+
+# --- Query ---
+def retrieve(query: str, top_k: int = TOP_K):
+    with span("retrieve", top_k=top_k) as s:
+        nodes = get_index().as_retriever(similarity_top_k=top_k).retrieve(query)
+        s["hits"] = len(nodes)
+    return nodes
+
+def query(text: str):
+    with span("query"):
+        return get_query_engine().query(text)
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("query", nargs="?", default=DEFAULT_QUERY)
+    parser.add_argument("--metrics", action="store_true", help="Print per-stage latency summary")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    context = "\n".join([node.text for node in retrieve(args.query)])
+    logger.info(f"Query: {args.query}\nContext:\n{context}")
+
+    response = query(args.query)
+    logger.info(f"Response: {response}")
+    print(response)
+    if args.metrics:
+        import json
+        import tracing
+        print(json.dumps(tracing.metrics(), indent=2))
+
+if __name__ == "__main__":
+    main()
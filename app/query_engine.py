@@ -1,54 +1,100 @@
+"""
+query_engine.py  ––  LlamaIndex query engine over the persisted FAISS index (Gemini LLM)
+
+    python app/query_engine.py "how to get select clip from sequence"
+
+    from app.query_engine import query
+    print(query("how to get select clip from sequence"))
+
+  - importing does nothing: the models, stores and index are built on
+    first use and cached for the process
+  - llama_index, faiss and dotenv are imported by the functions that need them
+"""
 import logging
 import os
-from dotenv import load_dotenv
-import faiss
-
-from llama_index.core import StorageContext, Settings, load_index_from_storage
-from llama_index.embeddings.ollama import OllamaEmbedding
-from llama_index.llms.google_genai import GoogleGenAI
-from llama_index.vector_stores.faiss import FaissVectorStore
-from llama_index.storage.docstore.mongodb import MongoDocumentStore
-from llama_index.storage.index_store.mongodb import MongoIndexStore
+import sys
+from functools import lru_cache
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from tracing import span
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-
-# LLM and embedding model
-Settings.llm = GoogleGenAI(model="models/gemini-2.5-flash", api_key=api_key)
-Settings.embed_model = OllamaEmbedding(model_name="embeddinggemma", base_url="http://localhost:11434")
-
-# MongoDB stores
-mongo_uri = "mongodb://127.0.0.1:27017/llama_index"
-docstore = MongoDocumentStore.from_uri(uri=mongo_uri, db_name="llama_index")
-index_store = MongoIndexStore.from_uri(uri=mongo_uri, db_name="llama_index")
-
-# Load persisted Faiss index
-embedding_dim = 768
-faiss_index = faiss.read_index("./embeddings/faiss.index")
-vector_store = FaissVectorStore(faiss_index=faiss_index)
-
-# Storage context
-storage_context = StorageContext.from_defaults(
-    docstore=docstore,
-    index_store=index_store,
-    vector_store=vector_store
-)
-
-# Load index fully (nodes + Faiss vectors)
-index = load_index_from_storage(storage_context)
-
-# Create query engine
-query_engine = index.as_query_engine(similarity_top_k=10, response_mode="compact")
-
-# Query
-query = "how to get select clip from sequence" 
-retrieved_nodes = index.as_retriever(similarity_top_k=10).retrieve(query)
-context = "\n".join([node.text for node in retrieved_nodes])
-logger.info(f"Query: {query}\nContext:\n{context}")
-
-response = query_engine.query(query)
-logger.info(f"Response: {response}")
-print(response)
+# --- Config ---
+LLM_MODEL = "models/gemini-2.5-flash"
+EMBED_MODEL = "embeddinggemma"
+FAISS_PATH = "./embeddings/faiss.index"
+TOP_K = 10
+DEFAULT_QUERY = "how to get select clip from sequence"
+
+# --- Components (built on first use) ---
+@lru_cache(maxsize=None)
+def configure():
+    """LLM and embedding model on the global LlamaIndex Settings."""
+    from dotenv import load_dotenv
+    from llama_index.core import Settings
+    from llama_index.llms.google_genai import GoogleGenAI
+    from ollama_client import llama_index_embedding
+
+    load_dotenv()
+    Settings.llm = GoogleGenAI(model=LLM_MODEL, api_key=os.getenv("GEMINI_API_KEY"))
+    Settings.embed_model = llama_index_embedding(EMBED_MODEL)
+
+@lru_cache(maxsize=None)
+def get_index():
+    """Persisted index (docstore nodes + FAISS vectors)."""
+    import faiss
+    from llama_index.core import StorageContext, load_index_from_storage
+    from llama_index.vector_stores.faiss import FaissVectorStore
+    from sqlite_docstore import make_stores
+
+    configure()
+    with span("load_index"):
+        # Docstore / index store (embedded SQLite unless DOCSTORE_BACKEND=mongo)
+        docstore, index_store = make_stores()
+        vector_store = FaissVectorStore(faiss_index=faiss.read_index(FAISS_PATH))
+        storage_context = StorageContext.from_defaults(
+            docstore=docstore,
+            index_store=index_store,
+            vector_store=vector_store
+        )
+        return load_index_from_storage(storage_context)
+
+@lru_cache(maxsize=None)
+def get_query_engine():
+    from context_packer import llama_index_postprocessor
+    return get_index().as_query_engine(similarity_top_k=TOP_K, response_mode="compact",
+                                       node_postprocessors=[llama_index_postprocessor()])
+
+# --- Query ---
+def retrieve(query: str, top_k: int = TOP_K):
+    with span("retrieve", top_k=top_k) as s:
+        nodes = get_index().as_retriever(similarity_top_k=top_k).retrieve(query)
+        s["hits"] = len(nodes)
+    return nodes
+
+def query(text: str):
+    with span("query"):
+        return get_query_engine().query(text)
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("query", nargs="?", default=DEFAULT_QUERY)
+    parser.add_argument("--metrics", action="store_true", help="Print per-stage latency summary")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    context = "\n".join([node.text for node in retrieve(args.query)])
+    logger.info(f"Query: {args.query}\nContext:\n{context}")
+
+    response = query(args.query)
+    logger.info(f"Response: {response}")
+    print(response)
+    if args.metrics:
+        import json
+        import tracing
+        print(json.dumps(tracing.metrics(), indent=2))
+
+if __name__ == "__main__":
+    main()
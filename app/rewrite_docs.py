@@ -1,38 +1,48 @@
+import hashlib
+import json
 import os
-import requests
-from dotenv import load_dotenv
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
 
-load_dotenv()
+from ollama_client import MAX_CONCURRENCY, OllamaClient, get_client
 
 INPUT_DIR = "docs_txt"
 OUTPUT_DIR = "docs_txt_natural"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-OLLAMA_API_URL = "http://localhost:11434/api/chat"
 MODEL_NAME = "llama3.1:8b"
 
+# Bulk mode
+MANIFEST_NAME = ".rewrite_manifest.json"   # lives in the output dir
+JOURNAL_NAME = ".rewrite_manifest.jsonl"   # appended per file, folded into the manifest per run
+REPORT_NAME = "rewrite_report.json"
+BULK_WORKERS = MAX_CONCURRENCY             # match Ollama's parallelism
+BULK_RETRIES = 2                           # the only retry layer: bulk uses a retries=0 client
+
+PROMPT_TEMPLATE = (
+    "Rewrite the following function documentation into a single natural-language paragraph. "
+    "Include what the function does, how to use it, any limitations or dependencies. "
+    "Do not include headings or tables, just natural flowing text:\n\n"
+    "{text}\n\nNatural paragraph:"
+)
+
+def rewrite_text(text, client=None):
+    """Ask the LLM for the natural paragraph. Raises on failure or an empty answer."""
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": PROMPT_TEMPLATE.format(text=text)}
+    ]
+    result = (client or get_client()).chat(MODEL_NAME, messages, options={"temperature": 0.2}).strip()
+    if not result:
+        raise ValueError("empty completion")
+    return result
+
 def generate_natural_description(text):
-    prompt_text = (
-        "Rewrite the following function documentation into a single natural-language paragraph. "
-        "Include what the function does, how to use it, any limitations or dependencies. "
-        "Do not include headings or tables, just natural flowing text:\n\n"
-        f"{text}\n\nNatural paragraph:"
-    )
-    payload = {
-        "model": MODEL_NAME,
-        "messages": [
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt_text}
-        ],
-        "temperature": 0.2,
-        "stream": False  # Important: disable streaming for simpler parsing
-    }
     try:
-        response = requests.post("http://localhost:11434/api/chat", json=payload)
-        response.raise_for_status()
-        data = response.json()
-        # The response structure is: {"message": {"content": "..."}, ...}
-        return data.get("message", {}).get("content", "").strip()
+        return rewrite_text(text)
     except Exception as e:
         print(f"Failed to get completion: {e}")
         return ""
@@ -43,6 +53,8 @@ def process_file(input_path, output_path):
         content = f.read()
 
     natural_text = generate_natural_description(content)
+    if not natural_text:
+        return  # keep whatever was there before rather than an empty file
 
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(natural_text)
@@ -63,6 +75,148 @@ def process_folder(input_dir, output_dir):
             print(f"Processing {input_path}")
             process_file(input_path, output_path)
 
+# ---------------------------------------------------------------------------
+# Bulk mode: worker pool + resumable manifest + content-hash skipping
+# ---------------------------------------------------------------------------
+def content_hash(content):
+    """Hash of everything that determines the output: input, prompt and model."""
+    h = hashlib.sha256()
+    for part in (MODEL_NAME, PROMPT_TEMPLATE, content):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def load_manifest(path, journal_path=None):
+    """The manifest snapshot plus every entry journaled after it (a torn
+    last line from an interrupted run is ignored)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+    if journal_path and os.path.exists(journal_path):
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                manifest[entry.pop("file")] = entry
+    return manifest
+
+def write_json_atomic(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def write_text_atomic(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def collect_inputs(input_dir):
+    for root, _, files in os.walk(input_dir):
+        for file in sorted(files):
+            if file.endswith(".txt"):
+                yield os.path.relpath(os.path.join(root, file), input_dir)
+
+def rewrite_with_retries(content, client, retries=BULK_RETRIES):
+    for attempt in range(retries + 1):
+        try:
+            return rewrite_text(content, client)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+
+def process_folder_bulk(input_dir, output_dir, workers=BULK_WORKERS, force=False, client=None):
+    """Rewrite only new or changed inputs, BULK_WORKERS at a time.
+
+    Every finished file appends one line to JOURNAL_NAME, so an
+    interrupted run picks up where it stopped; the journal is folded into
+    MANIFEST_NAME once per run. Files that still fail after BULK_RETRIES
+    are left untouched and listed in REPORT_NAME.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    journal_path = os.path.join(output_dir, JOURNAL_NAME)
+    manifest = load_manifest(manifest_path, journal_path)
+    lock = threading.Lock()
+    own_client = client is None
+    client = client or OllamaClient(retries=0)
+
+    todo, skipped = [], 0
+    for rel in collect_inputs(input_dir):
+        with open(os.path.join(input_dir, rel), "r", encoding="utf-8") as f:
+            content = f.read()
+        digest = content_hash(content)
+        entry = manifest.get(rel)
+        if (not force and entry and entry.get("sha256") == digest
+                and os.path.exists(os.path.join(output_dir, rel))):
+            skipped += 1
+            continue
+        todo.append((rel, content, digest))
+
+    print(f"{len(todo)} to rewrite, {skipped} unchanged (skipped), {workers} workers")
+
+    def work(rel, content, digest):
+        text = rewrite_with_retries(content, client)
+        output_path = os.path.join(output_dir, rel)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        write_text_atomic(output_path, text)
+        entry = {"sha256": digest, "model": MODEL_NAME, "rewritten_at": time.time()}
+        with lock:
+            manifest[rel] = entry
+            journal.write(json.dumps({"file": rel, **entry}) + "\n")
+            journal.flush()
+
+    failures = {}
+    started = time.time()
+    try:
+        with open(journal_path, "a", encoding="utf-8") as journal, \
+                ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(work, *item): item[0] for item in todo}
+            for done, fut in enumerate(as_completed(futures), 1):
+                rel = futures[fut]
+                try:
+                    fut.result()
+                    print(f"[{done}/{len(todo)}] ok   {rel}")
+                except Exception as e:
+                    failures[rel] = str(e)
+                    print(f"[{done}/{len(todo)}] FAIL {rel}: {e}")
+        # compact: one snapshot per run instead of one rewrite per file
+        write_json_atomic(manifest_path, manifest)
+        os.remove(journal_path)
+    finally:
+        if own_client:
+            client.close()
+
+    report = {
+        "rewritten": len(todo) - len(failures),
+        "skipped_unchanged": skipped,
+        "failed": failures,
+        "seconds": round(time.time() - started, 1),
+    }
+    write_json_atomic(os.path.join(output_dir, REPORT_NAME), report)
+    return report
+
 if __name__ == "__main__":
-    process_folder(INPUT_DIR, OUTPUT_DIR)
-    print("All files processed. Natural descriptions saved to", OUTPUT_DIR)
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bulk", action="store_true", help="Concurrent, resumable rewrite of changed files only")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS)
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and rewrite everything")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    if args.bulk:
+        report = process_folder_bulk(INPUT_DIR, OUTPUT_DIR, workers=args.workers, force=args.force)
+        print(f"Rewrote {report['rewritten']}, skipped {report['skipped_unchanged']}, "
+              f"failed {len(report['failed'])} (see {os.path.join(OUTPUT_DIR, REPORT_NAME)})")
+    else:
+        process_folder(INPUT_DIR, OUTPUT_DIR)
+        print("All files processed. Natural descriptions saved to", OUTPUT_DIR)
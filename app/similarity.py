@@ -1,74 +1,74 @@
-# app/langchain_ollama_rag_test.py
+"""
+similarity.py  ––  FAISS ids -> LlamaIndex docstore nodes (SQLite or Mongo), no LLM
+
+    python app/similarity.py "How to set backend preference?"
+
+    from app.similarity import search
+    for doc in search("How to set backend preference?"):
+        print(doc.page_content)
+
+  - importing does nothing: embeddings, the FAISS index and the
+    docstore are opened on first use and cached for the process
+"""
 import logging
-import os
-import faiss
-import numpy as np
-from pymongo import MongoClient
-from langchain_ollama.embeddings import OllamaEmbeddings
-from langchain_core.documents import Document
+import sys
+from functools import lru_cache
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # --- Config ---
 mongo_uri = "mongodb://127.0.0.1:27017/llama_index"
 FAISS_PATH = "./embeddings/faiss.index"
-DOCSTORE_DB = "llama_index"
 DOCSTORE_COLLECTION = "docstore"
+EMBED_MODEL = "EmbeddingGemma:latest"
+TOP_K = 2
+DEFAULT_QUERY = "How to set backend preference?"
 
-# --- 1. Embeddings ---
-embeddings = OllamaEmbeddings(model="EmbeddingGemma:latest", base_url="http://localhost:11434")
+# --- Components (built on first use) ---
+def load_faiss(path: str = FAISS_PATH):
+    import faiss
+    try:
+        faiss_index = faiss.read_index(path)
+        logger.info(f"Loaded FAISS index with {faiss_index.ntotal} vectors.")
+        return faiss_index
+    except Exception as e:
+        logger.error(f"Failed to load FAISS index: {e}")
+        return None
 
-# --- 2. Load FAISS ---
-try:
-    faiss_index = faiss.read_index(FAISS_PATH)
-    logger.info(f"Loaded FAISS index with {faiss_index.ntotal} vectors.")
-except Exception as e:
-    logger.error(f"Failed to load FAISS index: {e}")
-    faiss_index = None
+@lru_cache(maxsize=None)
+def get_retriever():
+    """Batched lookups + LRU node cache, see mongo_retriever.py. Reads the
+    docstore embed_save.py wrote (SQLite unless DOCSTORE_BACKEND=mongo)."""
+    from mongo_retriever import make_retriever
+    from ollama_client import langchain_embeddings
 
-# --- 3. Retriever ---
-class LlamaIndexSplitRetriever:
-    def __init__(self, faiss_index, embeddings, mongo_client, k=2):
-        self.faiss_index = faiss_index
-        self.embeddings = embeddings
-        self.mongo_client = mongo_client
-        self.k = k
+    return make_retriever(load_faiss(), langchain_embeddings(EMBED_MODEL), k=TOP_K,
+                          uri=mongo_uri, collection=DOCSTORE_COLLECTION)
 
-    def get_relevant_docs(self, query: str):
-        if faiss_index is not None:
-            query_vector = np.array(embeddings.embed_query("How to set backend preference?")).reshape(1, -1)
-            D, I = faiss_index.search(query_vector, 2)
-            print("Distances:", D)
-            print("Indices:", I)
-            if I[0][0] != -1:
-                db = client[DOCSTORE_DB]
-                col = db[DOCSTORE_COLLECTION]
-                for idx in I[0]:
-                    doc = col.find_one({"doc_id": int(idx.item())})
-                    print(doc)
+# --- Query ---
+def search(query: str):
+    return get_retriever().get_relevant_docs(query)
 
-        db = self.mongo_client[DOCSTORE_DB]
-        collection = db[DOCSTORE_COLLECTION]
-        docs = []
-        for idx in I[0]:
-            doc_data = collection.find_one({"_id": int(idx.item())})  # ensures pure int
-            if doc_data:
-                docs.append(Document(
-                    page_content=doc_data.get("text", ""),
-                    metadata=doc_data.get("metadata", {})
-                ))
-        return docs
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("query", nargs="?", default=DEFAULT_QUERY)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
 
-# --- 4. Test ---
-client = MongoClient(mongo_uri)
-retriever = LlamaIndexSplitRetriever(faiss_index, embeddings, client, k=2)
+    # one embedding + one FAISS search: the ids feed both the log line and the documents
+    retriever = get_retriever()
+    ids, distances = retriever.search_ids(args.query)
+    logger.debug(f"Indices: {ids} Distances: {distances}")
+    docs = retriever.fetch_docs(ids)
 
-query = "How to set backend preference?"
-docs = retriever.get_relevant_docs(query)
+    logger.info(f"Query: {args.query}")
+    for i, doc in enumerate(docs):
+        print(f"\n--- Document {i+1} ---")
+        print(doc.page_content)
+        print("Metadata:", doc.metadata)
 
-logger.info(f"Query: {query}")
-for i, doc in enumerate(docs):
-    print(f"\n--- Document {i+1} ---")
-    print(doc.page_content)
-    print("Metadata:", doc.metadata)
+if __name__ == "__main__":
+    main()
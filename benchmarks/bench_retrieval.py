@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+bench_retrieval.py  ––  retrieval scaling benchmark, no Ollama needed
+
+  - synthetic Premiere-like corpora (1k … 1M chunks) built with the real
+    create_method_chunk() from 03_build_embeddings.py
+  - a deterministic hashing embedder instead of the Ollama model
+  - per backend: build throughput, on-disk size, RSS, cold-start time
+    (fresh process), p50/p95/p99 search and metadata-resolution latency
+  - SQLite backends also resolve with the DB evicted from the OS page
+    cache (Linux posix_fadvise) on a fresh connection: latency and bytes
+    actually read from disk per lookup
+  - results as JSON, tagged with the git commit, for commit-to-commit diffs
+    (.build_cache/bench_results.json, gitignored, unless --out)
+  - chunks are never held all at once: the corpus is regenerated from its
+    seed on each pass, so build times include producing the rows
+    (chunk_per_s); only the vectors are materialized
+
+    python benchmarks/bench_retrieval.py --sizes 1000,10000
+    python benchmarks/bench_retrieval.py --compare old.json new.json
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import faiss
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+SIZES       = [1_000, 10_000, 100_000, 1_000_000]
+BACKENDS    = ["faiss_flat", "faiss_flat_legacy", "faiss_hnsw", "bundle"]
+DIM         = 384
+N_QUERIES   = 200
+N_COLD      = 50             # cold-cache resolves per backend (each evicts the DB first)
+TOP_K       = 5
+SEED        = 7
+EMBED_BATCH = 1024
+DEFAULT_OUT = ROOT / ".build_cache" / "bench_results.json"
+ROW_COLUMNS = ("class_name", "item_name", "member_type", "full_signature", "description",
+               "parameters", "return_type", "details", "example_code")
+
+CLASSES = ["Application", "Project", "Sequence", "Track", "TrackItem", "ProjectItem",
+           "Encoder", "Marker", "Component", "ComponentParam", "Source", "Time",
+           "SourceMonitor", "ProjectManager", "Anywhere", "Title", "Properties"]
+VERBS = ["get", "set", "create", "insert", "remove", "move", "export", "import",
+         "clone", "attach", "detach", "find", "select", "render", "open", "close"]
+NOUNS = ["Clip", "Marker", "Sequence", "Track", "Transition", "Effect", "Bin",
+         "Selection", "Playhead", "InPoint", "OutPoint", "Proxy", "Caption", "Setting"]
+TYPES = ["String", "Number", "Boolean", "Object", "Array", "Time", "ProjectItem"]
+WORDS = ("the clip sequence track project item selected active timeline value returns "
+         "current position marker encoder render queue media path duration frame rate "
+         "audio video effect parameter property event object index range ticks").split()
+
+# -----------------------------------------------------------
+# Deterministic embedder
+# -----------------------------------------------------------
+class HashEmbedder:
+    """Bag of hashed tokens → fixed random vectors → L2-normalised sum."""
+
+    def __init__(self, dim=DIM):
+        self.dim = dim
+        self._cache = {}
+
+    def _token(self, tok):
+        vec = self._cache.get(tok)
+        if vec is None:
+            seed = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=8).digest(), "little")
+            vec = np.random.default_rng(seed).standard_normal(self.dim).astype("float32")
+            self._cache[tok] = vec
+        return vec
+
+    def get_text_embedding(self, text):
+        v = np.zeros(self.dim, dtype="float32")
+        for tok in text.lower().split():
+            v += self._token(tok)
+        n = np.linalg.norm(v)
+        return v / n if n else v
+
+    def get_text_embedding_batch(self, texts):
+        return np.stack([self.get_text_embedding(t) for t in texts])
+
+# -----------------------------------------------------------
+# Synthetic corpus (same chunk shape as the real build)
+# -----------------------------------------------------------
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+def synthetic_chunks(n, seed=SEED):
+    build = importlib.import_module("03_build_embeddings")
+    rng = random.Random(seed)
+    for i in range(n):
+        cls = rng.choice(CLASSES)
+        n_params = rng.choice([0, 0, 1, 2, 3])
+        command = {"command": {
+            "name": f"{rng.choice(VERBS)}{rng.choice(NOUNS)}{i}" + ("()" if n_params else ""),
+            "description": _sentence(rng, rng.randint(6, 20)),
+            "parameters": [{"Name": f"p{j}", "Type": rng.choice(TYPES),
+                            "Description": _sentence(rng, 8)} for j in range(n_params)],
+            "returns": [{"Type": rng.choice(TYPES), "Description": _sentence(rng, 6)}],
+            "details": [{"content": _sentence(rng, rng.randint(10, 40))}]
+                       + ([{"code": f"var x = app.project.{cls.lower()}.call({i});"}]
+                          if rng.random() < 0.3 else []),
+        }}
+        section = "Instance Methods" if n_params else "Attributes"
+        yield build.create_method_chunk(cls, section, command)
+
+class SyntheticCorpus:
+    """n synthetic chunks, regenerated on every iteration instead of kept
+    in memory (1M chunks would be several GB as a list)."""
+
+    def __init__(self, n, seed=SEED):
+        self.n, self.seed = n, seed
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return synthetic_chunks(self.n, self.seed)
+
+    def batches(self, size):
+        it = iter(self)
+        while batch := list(islice(it, size)):
+            yield batch
+
+def make_queries(chunks, n=N_QUERIES, seed=SEED):
+    rng = random.Random(seed + 1)
+    picks = set(rng.sample(range(len(chunks)), min(n, len(chunks))))
+    return [f"{c['item_name']} {c['description'][:60]}" for i, c in enumerate(chunks) if i in picks]
+
+# -----------------------------------------------------------
+# Backends: build(vectors, chunks, dir) / open(dir) / search / resolve
+# -----------------------------------------------------------
+def _write_sqlite(chunks, db_path, slim=True):
+    from docs_db import insert_documents
+    build = importlib.import_module("03_build_embeddings")
+    conn = build.create_sqlite_db(db_path, slim=slim)
+    insert_documents(conn, ({**c, "doc_id": f"{c['doc_id']}#{i}", "faiss_id_main": i}
+                            for i, c in enumerate(chunks)))
+    conn.commit()
+    conn.close()
+
+class FaissBackend:
+    def __init__(self, kind, slim=True):
+        self.kind = kind
+        self.slim = slim     # docs_db layout: hot/cold split vs. legacy single table
+
+    def build(self, vectors, chunks, out_dir):
+        if self.kind == "hnsw":
+            index = faiss.IndexHNSWFlat(vectors.shape[1], 32)
+        else:
+            index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        faiss.write_index(index, str(out_dir / "main.index"))
+        _write_sqlite(chunks, out_dir / "premiere_docs.db", slim=self.slim)
+
+    def open(self, out_dir):
+        self.index = faiss.read_index(str(out_dir / "main.index"))
+        self.db_path = out_dir / "premiere_docs.db"
+        self.conn = sqlite3.connect(self.db_path)
+
+    def evict_rows(self):
+        """Next resolve() reads premiere_docs.db from disk: fresh connection
+        (empty SQLite page cache), file dropped from the OS page cache."""
+        self.conn.close()
+        evict(self.db_path)
+        self.conn = sqlite3.connect(self.db_path)
+
+    def search(self, vec, k):
+        return self.index.search(vec, k)
+
+    def resolve(self, ids):
+        from docs_db import rows_by_faiss_id
+        rows = rows_by_faiss_id(self.conn, ROW_COLUMNS, [i for i in ids if i != -1])
+        return [rows.get(int(i)) for i in ids if i != -1]
+
+class BundleBackend:
+    def build(self, vectors, chunks, out_dir):
+        from index_bundle import publish, write_bundle
+        path = write_bundle(vectors, chunks, embed_model="hash-embedder", root=out_dir)
+        publish(path, out_dir)
+
+    def open(self, out_dir):
+        from index_bundle import open_bundle
+        self.bundle = open_bundle(out_dir / "current")
+
+    def search(self, vec, k):
+        return self.bundle.search(vec, k)
+
+    def resolve(self, ids):
+        rows = (self.bundle.row(int(i)) for i in ids if i != -1)
+        return [r for r in rows if r is not None]
+
+def make_backend(name):
+    return {"faiss_flat": lambda: FaissBackend("flat"),
+            "faiss_flat_legacy": lambda: FaissBackend("flat", slim=False),
+            "faiss_hnsw": lambda: FaissBackend("hnsw"),
+            "bundle": BundleBackend}[name]()
+
+# -----------------------------------------------------------
+# Measurement helpers
+# -----------------------------------------------------------
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def dir_bytes(path):
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file() and not p.is_symlink())
+
+def evict(path):
+    """Drop a file's pages from the OS page cache (Linux; flushed first)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+def disk_read_bytes():
+    """Bytes this process has read from storage (not the page cache)."""
+    with open("/proc/self/io") as f:
+        return int(next(line for line in f if line.startswith("read_bytes:")).split()[1])
+
+def percentiles(samples_s):
+    ms = np.asarray(samples_s) * 1000
+    return {f"p{p}": round(float(np.percentile(ms, p)), 4) for p in (50, 95, 99)}
+
+def cold_start(backend, out_dir):
+    """Open the index in a fresh interpreter and time it there."""
+    code = (f"import sys, time; sys.path[:0] = [{str(ROOT / 'benchmarks')!r}, {str(ROOT / 'src')!r}]\n"
+            "from pathlib import Path; import bench_retrieval as b\n"
+            f"t = time.perf_counter(); be = b.make_backend({backend!r}); be.open(Path({str(out_dir)!r}))\n"
+            "print(time.perf_counter() - t)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+# -----------------------------------------------------------
+# Benchmark
+# -----------------------------------------------------------
+def run_size(n, backends, embedder, workdir):
+    print(f"\n📦 {n:,} chunks")
+    chunks = SyntheticCorpus(n)
+    vectors = np.empty((n, embedder.dim), dtype="float32")
+    chunk_s = embed_s = 0.0
+    t = time.perf_counter()
+    for start, batch in zip(range(0, n, EMBED_BATCH), chunks.batches(EMBED_BATCH)):
+        t2 = time.perf_counter()
+        chunk_s += t2 - t
+        vectors[start:start + len(batch)] = embedder.get_text_embedding_batch([c["main_text"] for c in batch])
+        t = time.perf_counter()
+        embed_s += t - t2
+    queries = embedder.get_text_embedding_batch(make_queries(chunks)).astype("float32")
+
+    result = {"chunks": n, "chunk_per_s": round(n / chunk_s, 1), "embed_per_s": round(n / embed_s, 1),
+              "backends": {}}
+    for name in backends:
+        out_dir = Path(workdir) / f"{name}-{n}"
+        out_dir.mkdir(parents=True)
+        backend = make_backend(name)
+
+        rss_before = rss_mb()
+        t = time.perf_counter()
+        backend.build(vectors, chunks, out_dir)
+        build_s = time.perf_counter() - t
+
+        backend.open(out_dir)
+        search_lat, resolve_lat = [], []
+        for q in queries:
+            t = time.perf_counter()
+            _, I = backend.search(q.reshape(1, -1), TOP_K)
+            t2 = time.perf_counter()
+            backend.resolve(I[0])
+            search_lat.append(t2 - t)
+            resolve_lat.append(time.perf_counter() - t2)
+
+        result["backends"][name] = stats = {
+            "build_s": round(build_s, 3),
+            "build_per_s": round(n / build_s, 1),
+            "index_bytes": dir_bytes(out_dir),
+            "rss_delta_mb": round(rss_mb() - rss_before, 1),
+            "cold_start_s": round(cold_start(name, out_dir), 4),
+            "search_ms": percentiles(search_lat),
+            "resolve_ms": percentiles(resolve_lat),
+        }
+        cold = ""
+        if hasattr(backend, "evict_rows"):
+            cold_lat, read_bytes = [], 0
+            for q in queries[:N_COLD]:
+                _, I = backend.search(q.reshape(1, -1), TOP_K)
+                backend.evict_rows()
+                before = disk_read_bytes()
+                t = time.perf_counter()
+                backend.resolve(I[0])
+                cold_lat.append(time.perf_counter() - t)
+                read_bytes += disk_read_bytes() - before
+            stats["resolve_cold_ms"] = percentiles(cold_lat)
+            stats["resolve_cold_read_kb"] = round(read_bytes / len(cold_lat) / 1024, 1)
+            cold = (f"  cold p50 {stats['resolve_cold_ms']['p50']}ms"
+                    f" ({stats['resolve_cold_read_kb']} KB read)")
+        print(f"  {name:<17} build {build_s:7.2f}s  search p50 {stats['search_ms']['p50']}ms"
+              f"  resolve p50 {stats['resolve_ms']['p50']}ms{cold}")
+        del backend
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare(old_path, new_path):
+    """Print new/old ratios for every latency and build number."""
+    old, new = (json.loads(Path(p).read_text()) for p in (old_path, new_path))
+    old_sizes = {r["chunks"]: r for r in old["results"]}
+    for r in new["results"]:
+        o = old_sizes.get(r["chunks"])
+        if not o:
+            continue
+        for name, b in r["backends"].items():
+            ob = o["backends"].get(name)
+            if not ob:
+                continue
+            for metric in ("search_ms", "resolve_ms", "resolve_cold_ms"):
+                if metric not in b or metric not in ob:
+                    continue
+                for p, v in b[metric].items():
+                    ratio = v / ob[metric][p] if ob[metric][p] else float("inf")
+                    flag = "  ⚠️" if ratio > 1.2 else ""
+                    print(f"{r['chunks']:>9,} {name:<11} {metric:<10} {p}: {ob[metric][p]:.4f} → {v:.4f} ({ratio:.2f}x){flag}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES))
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    embedder = HashEmbedder()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-retrieval-") as workdir:
+        for n in (int(s) for s in args.sizes.split(",")):
+            results.append(run_size(n, args.backends.split(","), embedder, workdir))
+
+    report = {"commit": git_commit(), "created_at": time.time(), "dim": DIM, "top_k": TOP_K,
+              "queries": N_QUERIES, "peak_rss_mb": round(peak_rss_mb(), 1), "results": results}
+    out = Path(args.out)
+    if not out.is_absolute():
+        out = ROOT / out
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"\n✅ Results written to {out}")
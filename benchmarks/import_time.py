@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+import_time.py  ––  cold import / CLI start-up benchmark, no Ollama needed
+
+  - every target runs in a fresh interpreter under `python -X importtime`,
+    REPEAT times; reports the median wall time and the import tree's cost
+  - lists the heaviest top-level imports per target and flags any HEAVY
+    library (llama_index, faiss, torch, ...) that got imported just by
+    importing the module or printing --help
+  - a target whose dependencies are missing is reported as an error,
+    the others still run
+  - results as JSON, tagged with the git commit, for commit-to-commit diffs;
+    written to .build_cache/import_times.json (gitignored) unless --out
+    names another file, or "-" for stdout
+
+    python benchmarks/import_time.py --out /tmp/import_times.json
+    python benchmarks/import_time.py --targets app.query_engine,06_llamaindex_exp
+    python benchmarks/import_time.py --compare old.json new.json
+"""
+
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_OUT = ROOT / ".build_cache" / "import_times.json"
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+REPEAT  = 5
+TOP_N   = 5              # heaviest top-level imports listed per target
+HEAVY   = ("llama_index", "faiss", "langchain", "langchain_core", "langchain_community",
+           "langchain_ollama", "sentence_transformers", "torch", "transformers", "pymongo")
+
+# label -> python code run with cwd=ROOT, or ["script", args...] for a CLI start-up
+TARGETS = {
+    "app":                     "import app",
+    "app.query_engine":        "import app.query_engine",
+    "app.ollama_query_engine": "import app.ollama_query_engine",
+    "app.embed_save":          "import app.embed_save",
+    "app.similarity":          "import app.similarity",
+    "app.langchain_exp":       "import app.langchain_exp",
+    "04_query_engine":         "import sys; sys.path.insert(0, 'src'); import importlib; importlib.import_module('04_query_engine')",
+    "05_pipeline":             "import sys; sys.path.insert(0, 'src'); import importlib; importlib.import_module('05_pipeline')",
+    "06_llamaindex_exp":       "import sys; sys.path.insert(0, 'src'); import importlib; importlib.import_module('06_llamaindex_exp')",
+    "06_llamaindex_exp --help": ["src/06_llamaindex_exp.py", "--help"],
+    "bulk_query --help":       ["src/bulk_query.py", "--help"],
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+# -----------------------------------------------------------
+# Measure
+# -----------------------------------------------------------
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) per -X importtime line."""
+    out = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            out.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return out
+
+def run_once(target) -> dict:
+    cmd = [sys.executable, "-X", "importtime"]
+    cmd += target if isinstance(target, list) else ["-c", target]
+    t = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - t
+    tree = parse_importtime(proc.stderr)
+    errors = [l for l in proc.stderr.splitlines() if l and not l.startswith("import time:")]
+    return {"ok": proc.returncode == 0, "wall_s": wall, "tree": tree,
+            "error": errors[-1] if errors and proc.returncode else None}
+
+def measure(label, target, repeat=REPEAT, startup=frozenset()) -> dict:
+    """`startup`: modules the bare interpreter imports anyway, left out."""
+    runs = [run_once(target) for _ in range(repeat)]
+    for r in runs:
+        r["tree"] = [row for row in r["tree"] if row[0] not in startup]
+    last = runs[-1]
+    if not last["ok"]:
+        return {"target": label, "error": last["error"]}
+    top = [(name, cum) for name, _, cum, depth in last["tree"] if depth == 0]
+    return {
+        "target": label,
+        "wall_ms": round(statistics.median(r["wall_s"] for r in runs) * 1000, 1),
+        "import_ms": round(statistics.median(sum(c for _, _, c, d in r["tree"] if d == 0)
+                                             for r in runs) / 1000, 1),
+        "modules": len(last["tree"]),
+        "top": [{"module": n, "ms": round(c / 1000, 1)}
+                for n, c in sorted(top, key=lambda x: -x[1])[:TOP_N]],
+        "heavy": sorted({name.split(".")[0] for name, *_ in last["tree"]} & set(HEAVY)),
+    }
+
+def baseline(repeat=REPEAT) -> tuple[float, frozenset]:
+    """Bare interpreter start-up (ms, to subtract when reading wall_ms) and
+    the modules it imports."""
+    runs = [run_once("pass") for _ in range(repeat)]
+    return (round(statistics.median(r["wall_s"] for r in runs) * 1000, 1),
+            frozenset(name for name, *_ in runs[-1]["tree"]))
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare(old_path, new_path):
+    """Print new/old ratios of the wall and import times per target."""
+    old, new = (json.loads(Path(p).read_text()) for p in (old_path, new_path))
+    old_targets = {r["target"]: r for r in old["results"]}
+    for r in new["results"]:
+        o = old_targets.get(r["target"])
+        if not o or "error" in r or "error" in o:
+            continue
+        for metric in ("wall_ms", "import_ms"):
+            ratio = r[metric] / o[metric] if o[metric] else float("inf")
+            flag = "  ⚠️" if ratio > 1.2 else ""
+            print(f"{r['target']:<26} {metric:<9}: {o[metric]:8.1f} → {r[metric]:8.1f} ({ratio:.2f}x){flag}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--out", default=str(DEFAULT_OUT), help='JSON report path, "-" for stdout')
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+
+    log = sys.stderr if args.out == "-" else sys.stdout      # keep stdout pure JSON
+    startup, startup_modules = baseline(args.repeat)
+    print(f"🐍 interpreter start-up: {startup} ms", file=log)
+    results = []
+    for label in args.targets.split(","):
+        r = measure(label, TARGETS[label], args.repeat, startup_modules)
+        results.append(r)
+        if "error" in r:
+            print(f"  {label:<26} ❌ {r['error']}", file=log)
+            continue
+        heavy = f"  ⚠️ heavy: {', '.join(r['heavy'])}" if r["heavy"] else ""
+        print(f"  {label:<26} wall {r['wall_ms']:8.1f} ms  imports {r['import_ms']:8.1f} ms"
+              f"  ({r['modules']} modules){heavy}", file=log)
+        for t in r["top"]:
+            print(f"      {t['ms']:8.1f} ms  {t['module']}", file=log)
+
+    report = {"commit": git_commit(), "created_at": time.time(), "python": sys.version.split()[0],
+              "repeat": args.repeat, "startup_ms": startup, "results": results}
+    if args.out == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, indent=2))
+        print(f"\n✅ Wrote {out}")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+ollama_replay.py  ––  record/replay stand-in for the Ollama HTTP API
+
+record: a proxy in front of the real Ollama that captures every embed /
+        chat / generate exchange, including when each streamed token line
+        arrived, into a JSONL fixture.
+replay: serves those exchanges back from the fixture with the original
+        timing, scaled by --latency-scale (0 = instant, 1 = as recorded).
+
+Every module talks to Ollama through src/ollama_client.py, which reads
+OLLAMA_URL, so pointing a pipeline at the stand-in is one variable:
+
+    python benchmarks/ollama_replay.py record --fixture fx.jsonl --port 11435
+    OLLAMA_URL=http://127.0.0.1:11435 python src/04_query_engine.py     # captures
+
+    python benchmarks/ollama_replay.py replay --fixture fx.jsonl --port 11435 --latency-scale 0
+    OLLAMA_URL=http://127.0.0.1:11435 python src/04_query_engine.py     # offline
+
+/api/embed is recorded per input text, not per request: EmbeddingBatcher
+groups texts differently from run to run, so a replayed batch is
+reassembled from the single-text records (404 if any text is missing).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+UPSTREAM  = "http://localhost:11434"
+HOST      = "127.0.0.1"
+PORT      = 11435
+IGNORED_FIELDS = {"keep_alive"}          # do not affect the model's answer
+EMBED_PATH = "/api/embed"
+
+# -----------------------------------------------------------
+# Fixture
+# -----------------------------------------------------------
+def exchange_key(method: str, path: str, body: bytes) -> str:
+    """Stable key for a request: path + canonical JSON body."""
+    try:
+        payload = json.loads(body) if body else {}
+        payload = {k: v for k, v in payload.items() if k not in IGNORED_FIELDS}
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    except (json.JSONDecodeError, AttributeError):
+        canonical = body.decode("utf-8", "replace")
+    return hashlib.sha256(f"{method} {path} {canonical}".encode("utf-8")).hexdigest()
+
+
+def embed_inputs(body: bytes):
+    """(payload without "input", [texts]) for an /api/embed body, else None."""
+    try:
+        payload = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(payload, dict) or "input" not in payload:
+        return None
+    texts = [payload["input"]] if isinstance(payload["input"], str) else payload["input"]
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return None
+    return {k: v for k, v in payload.items() if k != "input"}, texts
+
+
+def input_key(rest: dict, text: str) -> str:
+    """Key of one /api/embed input text (same for any batch it arrives in;
+    never equal to a whole-request key)."""
+    return exchange_key("INPUT", EMBED_PATH, json.dumps({**rest, "input": text}).encode("utf-8"))
+
+
+class Fixture:
+    def __init__(self, path):
+        self.path = path
+        self.exchanges = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        ex = json.loads(line)
+                        self.exchanges[ex["key"]] = ex
+        except FileNotFoundError:
+            pass
+
+    def get(self, key):
+        return self.exchanges.get(key)
+
+    def add(self, exchange):
+        with self._lock:
+            self.exchanges[exchange["key"]] = exchange
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(exchange) + "\n")
+
+# -----------------------------------------------------------
+# HTTP handler
+# -----------------------------------------------------------
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "ollama-replay"
+
+    fixture: Fixture = None
+    mode = "replay"
+    latency_scale = 1.0
+    upstream: httpx.Client = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _start(self, status, content_type, chunked):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, obj):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        body = self._body() if method == "POST" else b""
+        key = exchange_key(method, self.path, body)
+        embed = embed_inputs(body) if method == "POST" and self.path == EMBED_PATH else None
+        if self.mode == "record":
+            self._record(method, key, body, embed)
+        elif embed is not None and self.fixture.get(key) is None:
+            self._replay_embed(*embed)
+        else:
+            self._replay(key)
+
+    do_GET = lambda self: self._handle("GET")
+    do_POST = lambda self: self._handle("POST")
+
+    # ---------- record: proxy + capture token timing ----------
+    def _record(self, method, key, body, embed=None):
+        started = time.perf_counter()
+        chunks = []
+        with self.upstream.stream(method, self.path, content=body,
+                                  headers={"Content-Type": "application/json"}) as r:
+            content_type = r.headers.get("content-type", "application/json")
+            streamed = "ndjson" in content_type
+            self._start(r.status_code, content_type, chunked=True)
+            lines = r.iter_lines() if streamed else iter([r.read().decode("utf-8")])
+            for line in lines:
+                if not line:
+                    continue
+                chunks.append([round(time.perf_counter() - started, 6), line])
+                self._write_chunk((line + "\n").encode("utf-8") if streamed else line.encode("utf-8"))
+        # saved before the response ends: a client that got it can replay it
+        if not (embed is not None and r.status_code == 200 and self._record_embed(chunks, *embed)):
+            self.fixture.add({
+                "key": key, "method": method, "path": self.path,
+                "request": json.loads(body) if body else None,
+                "status": r.status_code, "content_type": content_type,
+                "streamed": streamed, "chunks": chunks,
+            })
+        self._write_chunk(b"")
+
+    def _record_embed(self, chunks, rest, texts) -> bool:
+        """Store one exchange per input text; False if the response does
+        not split (then the whole exchange is stored as usual)."""
+        try:
+            embeddings = json.loads("".join(line for _, line in chunks))["embeddings"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return False
+        if len(embeddings) != len(texts):
+            return False
+        elapsed = chunks[-1][0] if chunks else 0.0
+        for text, vector in zip(texts, embeddings):
+            self.fixture.add({
+                "key": input_key(rest, text), "method": "POST", "path": EMBED_PATH,
+                "request": {**rest, "input": text}, "status": 200,
+                "embedding": vector, "elapsed": elapsed,
+            })
+        return True
+
+    # ---------- replay: serve from fixture with scaled timing ----------
+    def _replay_embed(self, rest, texts):
+        """Reassemble a batch from per-text records; it takes as long as the
+        slowest batch they were recorded in."""
+        parts = [self.fixture.get(input_key(rest, t)) for t in texts]
+        missing = sum(p is None for p in parts)
+        if missing:
+            self._send_json(404, {"error": f"no recorded embedding for {missing} of {len(texts)} inputs"})
+            return
+        time.sleep(max(p["elapsed"] for p in parts) * self.latency_scale if parts else 0)
+        self._send_json(200, {"model": rest.get("model"), "embeddings": [p["embedding"] for p in parts]})
+
+    def _replay(self, key):
+        ex = self.fixture.get(key)
+        if ex is None:
+            self._send_json(404, {"error": f"no recorded exchange for {self.path}"})
+            return
+        started = time.perf_counter()
+        self._start(ex["status"], ex["content_type"], chunked=True)
+        for offset, line in ex["chunks"]:
+            wait = offset * self.latency_scale - (time.perf_counter() - started)
+            if wait > 0:
+                time.sleep(wait)
+            self._write_chunk((line + "\n").encode("utf-8") if ex["streamed"] else line.encode("utf-8"))
+        self._write_chunk(b"")
+
+
+def serve(mode, fixture_path, host=HOST, port=PORT, latency_scale=1.0, upstream=UPSTREAM):
+    handler = type("Handler", (ReplayHandler,), {
+        "fixture": Fixture(fixture_path),
+        "mode": mode,
+        "latency_scale": latency_scale,
+        "upstream": httpx.Client(base_url=upstream, timeout=None) if mode == "record" else None,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"🎞️  {mode} on http://{host}:{port} ({len(handler.fixture.exchanges)} exchanges in {fixture_path})")
+    return server
+
+# -----------------------------------------------------------
+# CLI
+# -----------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--fixture", required=True)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Replay timing multiplier (0 = no delay)")
+    parser.add_argument("--upstream", default=UPSTREAM, help="Real Ollama (record mode)")
+    args = parser.parse_args()
+
+    server = serve(args.mode, args.fixture, args.host, args.port, args.latency_scale, args.upstream)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
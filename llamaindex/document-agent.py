@@ -1,74 +1,109 @@
+"""
+document-agent.py  ––  in-memory LlamaIndex index over docs_txt/ (Gemini LLM, BGE embeddings)
+
+    python llamaindex/document-agent.py "what we can use to create returna and insert component action?"
+
+  - nothing runs until main(): models, stores and the index are built on
+    first use and cached, heavy libraries are imported there too
+  - the file name has a hyphen, so load it with runpy / importlib.util
+    when reusing it from another process
+"""
 import logging
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, StorageContext, Settings
-from llama_index.vector_stores.faiss import FaissVectorStore
-from llama_index.storage.docstore.mongodb import MongoDocumentStore
-from llama_index.storage.index_store.mongodb import MongoIndexStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.llms.gemini import Gemini
-from llama_index.core.node_parser import SentenceSplitter
-import faiss
-from dotenv import load_dotenv
 import os
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Initialize SentenceSplitter
-splitter = SentenceSplitter(chunk_size=256, chunk_overlap=32)
+import sys
+from functools import lru_cache
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from tracing import span
 
-# Set LLM and embedding model
-Settings.llm = Gemini(
-    model="models/gemini-2.5-flash",
-    api_key=api_key
-)
-Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-base-en-v1.5")
+logger = logging.getLogger(__name__)
 
-# Initialize Faiss vector store
-embedding_dim = 768
-faiss_index = faiss.IndexFlatL2(embedding_dim)
-vector_store = FaissVectorStore(faiss_index=faiss_index)
+# --- Config ---
+LLM_MODEL = "models/gemini-2.5-flash"
+EMBED_MODEL = "BAAI/bge-base-en-v1.5"
+EMBEDDING_DIM = 768
+DOCS_DIR = "./docs_txt"
+CHUNK_SIZE, CHUNK_OVERLAP = 256, 32
+TOP_K = 2
+DEFAULT_QUERY = "what we can use to create returna and insert component action?"
 
-# Initialize MongoDB stores
-mongo_uri = "mongodb://127.0.0.1:27017/llama_index"
-docstore = MongoDocumentStore.from_uri(uri=mongo_uri, db_name="llama_index")
-index_store = MongoIndexStore.from_uri(uri=mongo_uri, db_name="llama_index")
+# --- Components (built on first use) ---
+@lru_cache(maxsize=None)
+def configure():
+    """LLM and embedding model on the global LlamaIndex Settings."""
+    from dotenv import load_dotenv
+    from llama_index.core import Settings
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from llama_index.llms.gemini import Gemini
 
-# Create storage context
-storage_context = StorageContext.from_defaults(
-    docstore=docstore, index_store=index_store, vector_store=vector_store
-)
+    load_dotenv()
+    Settings.llm = Gemini(model=LLM_MODEL, api_key=os.getenv("GEMINI_API_KEY"))
+    Settings.embed_model = HuggingFaceEmbedding(model_name=EMBED_MODEL)
 
-# Load documents
-reader = SimpleDirectoryReader(input_dir="./docs_txt")
-documents = reader.load_data()
+@lru_cache(maxsize=None)
+def get_index(input_dir: str = DOCS_DIR):
+    import faiss
+    from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, StorageContext, Settings
+    from llama_index.core.node_parser import SentenceSplitter
+    from llama_index.vector_stores.faiss import FaissVectorStore
+    from sqlite_docstore import make_stores
 
-# Split documents into nodes
-nodes = splitter.get_nodes_from_documents(documents)
-logger.info(f"Created {len(nodes)} nodes from documents")
+    configure()
+    # Faiss vector store + docstore / index store (embedded SQLite unless DOCSTORE_BACKEND=mongo)
+    vector_store = FaissVectorStore(faiss_index=faiss.IndexFlatL2(EMBEDDING_DIM))
+    docstore, index_store = make_stores()
+    storage_context = StorageContext.from_defaults(
+        docstore=docstore, index_store=index_store, vector_store=vector_store
+    )
 
-# Build index
-index = VectorStoreIndex(nodes, storage_context=storage_context, embed_model=Settings.embed_model)
+    # Load documents and split them into nodes
+    with span("build_index") as s:
+        documents = SimpleDirectoryReader(input_dir=input_dir).load_data()
+        splitter = SentenceSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        nodes = splitter.get_nodes_from_documents(documents)
+        logger.info(f"Created {len(nodes)} nodes from documents")
+        s.update(documents=len(documents), nodes=len(nodes))
+        return VectorStoreIndex(nodes, storage_context=storage_context, embed_model=Settings.embed_model)
 
-# Create query engine
-query_engine = index.as_query_engine(similarity_top_k=2, response_mode="compact")
+@lru_cache(maxsize=None)
+def get_query_engine():
+    from context_packer import llama_index_postprocessor
+    return get_index().as_query_engine(similarity_top_k=TOP_K, response_mode="compact",
+                                       node_postprocessors=[llama_index_postprocessor()])
 
 # Debug token count
 def log_token_count(query, nodes):
+    from context_packer import count_tokens
     context = "\n".join([node.text for node in nodes])
     full_input = f"{query}\n{context}"
-    # Use HuggingFace tokenizer for token counting
-    tokenizer = Settings.embed_model._model.tokenize
-    token_count = len(tokenizer(full_input))
+    # Cached process-wide tokenizer, same one the context packer budgets with
+    token_count = count_tokens(full_input)
     logger.info(f"Total tokens sent to LLM: {token_count}")
     return token_count
-# Query
-query = "what we can use to create returna and insert component action?"
-retrieved_nodes = index.as_retriever(similarity_top_k=2).retrieve(query)
-context = "\n".join([node.text for node in retrieved_nodes])
-logger.info(f"Query: {query}\nContext sent to LLM:\n{context}")
-log_token_count(query, retrieved_nodes)
-response = query_engine.query(query)
-logger.info(f"Response: {response}")
-print(response)
\ No newline at end of file
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("query", nargs="?", default=DEFAULT_QUERY)
+    parser.add_argument("--metrics", action="store_true", help="Print per-stage latency summary")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    index = get_index()
+    with span("retrieve", top_k=TOP_K) as s:
+        retrieved_nodes = index.as_retriever(similarity_top_k=TOP_K).retrieve(args.query)
+        s["hits"] = len(retrieved_nodes)
+    context = "\n".join([node.text for node in retrieved_nodes])
+    logger.info(f"Query: {args.query}\nContext sent to LLM:\n{context}")
+    log_token_count(args.query, retrieved_nodes)
+    with span("query"):
+        response = get_query_engine().query(args.query)
+    logger.info(f"Response: {response}")
+    print(response)
+    if args.metrics:
+        import json
+        import tracing
+        print(json.dumps(tracing.metrics(), indent=2))
+
+if __name__ == "__main__":
+    main()
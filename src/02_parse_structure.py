@@ -1,6 +1,13 @@
 import json
 import requests
 from collections import defaultdict
+from pathlib import Path
+
+from record_io import GROUPED_SCHEMA, RecordSink
+
+# <base>.json plus the flat <base>.parquet / .jsonl.gz export; 05_pipeline.py
+# reads DOCS_PATH = <base>.json and prefers the export next to it
+OUTPUT_BASE = Path("data/processed/ppro_grouped")
 
 # Download JSON
 url = "https://extendscript.docsforadobe.dev/"
@@ -52,8 +59,15 @@ grouped = defaultdict(dict)
 for (section, object_name), fields in temp_store.items():
     grouped[section][object_name] = fields
 
-# Save grouped JSON
-with open("ppro_grouped_with_details.json", "w", encoding="utf-8") as f:
-    json.dump(grouped, f, indent=2, ensure_ascii=False)
+# Save grouped JSON (compact; nested section -> object layout)
+OUTPUT_BASE.parent.mkdir(parents=True, exist_ok=True)
+with open(OUTPUT_BASE.with_suffix(".json"), "w", encoding="utf-8") as f:
+    json.dump(grouped, f, ensure_ascii=False, separators=(",", ":"))
+
+# Flat rows in the same order, for streaming / column-selective readers
+with RecordSink(OUTPUT_BASE, GROUPED_SCHEMA) as sink:
+    sink.write({"section": section, "name": name, **fields}
+               for section, objs in grouped.items() for name, fields in objs.items())
+print(f"Rows saved to {', '.join(map(str, sink.paths))}")
 
 print(f"Grouped JSON with details saved. Sections: {len(grouped)}")
@@ -1,26 +1,59 @@
 import os
+import sys
 import json
+import shutil
 import sqlite3
 import numpy as np
 import faiss
 from pathlib import Path
-from llama_index.core import VectorStoreIndex, Document, StorageContext, Settings
-from llama_index.vector_stores.faiss import FaissVectorStore
-from llama_index.embeddings.ollama import OllamaEmbedding
-from llama_index.llms.ollama import Ollama
+
+from docs_db import create_schema, insert_documents
+from index_bundle import (bundle_from_build, ensure_symlink, generation_id, open_bundle,
+                          prune_generations, publish, swap_symlink)
+from ollama_client import llama_index_embedding
+from id_filters import FilterIndex
+from record_io import DOCUMENT_SCHEMA, RecordSink
+from shards import link_shard
+from symbol_index import SymbolIndex
+from type_graph import TypeGraph
+from vector_metric import COSINE, calibrate, index_metric, new_index, normalize, save_metric
 
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
 DOCS_DIR = Path("docs_json")                       # JSON files from scraper
-PROCESSED_DIR = Path("data/processed")             # Processed chunks
+PROCESSED_DIR = Path("data/processed")             # Processed chunks (-> builds/current/processed_chunks.*)
 EMBEDDINGS_DIR = Path("embeddings")                # All embedding outputs
-FAISS_DIR = EMBEDDINGS_DIR / "faiss_indexes"      # FAISS indexes
-SQLITE_DB = EMBEDDINGS_DIR / "premiere_docs.db"    # SQLite metadata
+FAISS_DIR = EMBEDDINGS_DIR / "faiss_indexes"      # FAISS indexes (-> builds/current/faiss_indexes)
+SQLITE_DB = EMBEDDINGS_DIR / "premiere_docs.db"    # SQLite metadata (-> builds/current/premiere_docs.db)
+BUILDS_DIR = EMBEDDINGS_DIR / "builds"             # one directory per build generation
+CURRENT_BUILD = BUILDS_DIR / "current"             # the one symlink a promotion flips
+# Type graph in SimpleGraphStore layout (-> builds/current/type_graph_store.json). Not
+# storage/graph_store.json: that is LlamaIndex's default, overwritten by every persist()
+GRAPH_STORE = Path("storage/type_graph_store.json")
+KEEP_BUILDS = 3
+CHUNKS_NAME = "processed_chunks"                   # chunk export, written into the build
+
+# Streaming build: at most BATCH_SIZE chunks are in memory at once
+BATCH_SIZE = 50
+CHUNK_FIELDS = {"main": "main_text", "description": "description",
+                "details": "details", "example": "example_code"}
+
+METRIC = COSINE         # normalized vectors + inner product ("l2" = legacy IndexFlatL2)
+SLIM_SCHEMA = True      # hot/cold split + compressed blobs in premiere_docs.db
+WRITE_PARQUET = True    # also export processed chunks as Parquet (needs pyarrow)
 
-# Create directories
-for dir_path in [PROCESSED_DIR, EMBEDDINGS_DIR, FAISS_DIR]:
-    dir_path.mkdir(parents=True, exist_ok=True)
+# Validation
+SMOKE_SAMPLES = 5
+SMOKE_TOLERANCE = 1e-4   # a sampled vector's top score must match its own score
+SMOKE_QUERY = "get the active sequence"
+INDEX_COLUMNS = {"main": "faiss_id_main", "description": "faiss_id_description",
+                 "details": "faiss_id_details", "example": "faiss_id_example"}
+
+# Corpus tag: the published bundle is also exposed as shard CORPUS@CORPUS_VERSION,
+# tagged with EMBED_MODEL; a service embedding with another model skips it
+CORPUS = "premiere-pro"
+CORPUS_VERSION = "latest"      # bump when the docs target a new Premiere Pro API version
 
 # Model configuration
 EMBED_MODEL = "all-minilm"  # Fast and good quality
@@ -29,30 +62,14 @@ LLM_MODEL = "llama3.2"      # or "mistral", "codellama"
 # ============================================================================
 # DATABASE SETUP
 # ============================================================================
-def create_sqlite_db():
-    """Create SQLite database with optimized schema"""
-    conn = sqlite3.connect(SQLITE_DB)
+def create_sqlite_db(db_path=SQLITE_DB, slim=SLIM_SCHEMA):
+    """Create SQLite database with optimized schema (see docs_db.py for
+    the slim hot/cold layout)"""
+    conn = sqlite3.connect(db_path)
     c = conn.cursor()
     
     # Main documents table with FAISS mapping
-    c.execute('''CREATE TABLE IF NOT EXISTS documents
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  doc_id TEXT UNIQUE,
-                  class_name TEXT,
-                  section_type TEXT,
-                  item_name TEXT,
-                  member_type TEXT,
-                  full_signature TEXT,
-                  description TEXT,
-                  return_type TEXT,
-                  parameters TEXT,
-                  details TEXT,
-                  example_code TEXT,
-                  faiss_id_main INTEGER,
-                  faiss_id_description INTEGER,
-                  faiss_id_details INTEGER,
-                  faiss_id_example INTEGER,
-                  json_metadata TEXT)''')
+    create_schema(conn, slim=slim)
     
     # Parameters table for granular search
     c.execute('''CREATE TABLE IF NOT EXISTS parameters
@@ -73,38 +90,23 @@ def create_sqlite_db():
     c.execute('CREATE INDEX IF NOT EXISTS idx_method_params ON parameters(method_name)')
     
     conn.commit()
-    print(f"✅ SQLite database created: {SQLITE_DB}")
+    print(f"✅ SQLite database created: {db_path}")
     return conn
 
 # ============================================================================
 # FAISS SETUP - Multiple indexes for different content types
 # ============================================================================
-def create_faiss_indexes(dimension):
+def create_faiss_indexes(dimension, metric=METRIC):
     """Create separate FAISS indexes for different content types"""
     faiss_indexes = {
-        "main": faiss.IndexFlatL2(dimension),           # Full content
-        "description": faiss.IndexFlatL2(dimension),    # Short descriptions
-        "details": faiss.IndexFlatL2(dimension),        # Detailed info
-        "example": faiss.IndexFlatL2(dimension),        # Code examples
+        "main": new_index(dimension, metric),           # Full content
+        "description": new_index(dimension, metric),    # Short descriptions
+        "details": new_index(dimension, metric),        # Detailed info
+        "example": new_index(dimension, metric),        # Code examples
     }
-    print(f"✅ Created FAISS indexes with dimension {dimension}")
+    print(f"✅ Created {metric} FAISS indexes with dimension {dimension}")
     return faiss_indexes
 
-def add_to_faiss(faiss_indexes, index_name, text, embed_model):
-    """Safely add text embedding to FAISS index"""
-    if not text or not text.strip():
-        return None
-    
-    try:
-        vector = embed_model.get_text_embedding(text)
-        vector = np.array(vector, dtype='float32').reshape(1, -1)
-        idx = faiss_indexes[index_name].ntotal
-        faiss_indexes[index_name].add(vector)
-        return idx
-    except Exception as e:
-        print(f"Warning: Failed to embed text for {index_name}: {e}")
-        return None
-
 # ============================================================================
 # CONTENT FORMATTING
 # ============================================================================
@@ -323,16 +325,10 @@ def create_overview_chunk(file_data):
     }
 
 # ============================================================================
-# MAIN PROCESSING
+# MAIN PROCESSING – streaming: chunk → embed batch → index/DB write → JSONL sink
 # ============================================================================
-def process_json_files(conn, faiss_indexes, embed_model):
-    """Process all JSON files and create embeddings"""
-    chunks = []
-    c = conn.cursor()
-    
-    json_files = list(DOCS_DIR.glob("*.json"))
-    print(f"\n📄 Found {len(json_files)} JSON files to process")
-    
+def iter_chunks(json_files):
+    """Yield chunks one source file at a time; nothing is accumulated."""
     for idx, json_file in enumerate(json_files, 1):
         print(f"[{idx}/{len(json_files)}] Processing {json_file.name}...")
         
@@ -342,8 +338,7 @@ def process_json_files(conn, faiss_indexes, embed_model):
         class_name = data.get("title", json_file.stem)
         
         # Create overview chunk
-        overview_chunk = create_overview_chunk(data)
-        chunks.append(overview_chunk)
+        yield create_overview_chunk(data)
         
         # Process sections
         for section in data.get("sections", []):
@@ -352,78 +347,262 @@ def process_json_files(conn, faiss_indexes, embed_model):
                 # Handle method/property sections with commands
                 if isinstance(section_data, dict) and "commands" in section_data:
                     for command in section_data["commands"]:
-                        chunk = create_method_chunk(class_name, section_name, command)
-                        chunks.append(chunk)
+                        yield create_method_chunk(class_name, section_name, command)
                 
                 # Handle enumerations
                 elif section_name == "Enumerations" and isinstance(section_data, dict):
                     for enum_name, enum_values in section_data.items():
                         if enum_name != "content":
-                            chunk = create_enum_chunk(class_name, enum_name, enum_values)
-                            chunks.append(chunk)
-    
-    print(f"\n✅ Created {len(chunks)} chunks")
-    print("\n🔢 Creating embeddings and inserting into database...")
-    
-    # Process chunks in batches
-    batch_size = 50
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i+batch_size]
-        
-        for chunk in batch:
-            # Create embeddings for different content types
-            faiss_id_main = add_to_faiss(faiss_indexes, "main", chunk["main_text"], embed_model)
-            faiss_id_desc = add_to_faiss(faiss_indexes, "description", chunk["description"], embed_model)
-            faiss_id_details = add_to_faiss(faiss_indexes, "details", chunk["details"], embed_model)
-            faiss_id_example = add_to_faiss(faiss_indexes, "example", chunk["example_code"], embed_model)
-            
-            # Insert into database
-            c.execute('''INSERT OR REPLACE INTO documents 
-                       (doc_id, class_name, section_type, item_name, member_type,
-                        full_signature, description, return_type, parameters, details, example_code,
-                        faiss_id_main, faiss_id_description, faiss_id_details, faiss_id_example, json_metadata)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                     (chunk["doc_id"], chunk["class_name"], chunk["section_type"], 
-                      chunk["item_name"], chunk["member_type"], chunk["full_signature"],
-                      chunk["description"], chunk["return_type"], chunk["parameters"], 
-                      chunk["details"], chunk["example_code"],
-                      faiss_id_main, faiss_id_desc, faiss_id_details, faiss_id_example,
-                      chunk["json_metadata"]))
-            
-            # Insert parameters
-            for param in chunk["parameters_list"] or []:
-                if isinstance(param, dict):
-                    c.execute('''INSERT INTO parameters 
-                               (doc_id, class_name, method_name, param_name, param_type, param_description)
-                               VALUES (?, ?, ?, ?, ?, ?)''',
-                             (chunk["doc_id"], chunk["class_name"], chunk["item_name"],
-                              param.get("Name", param.get("Parameter", "")),
-                              param.get("Type", ""),
-                              param.get("Description", "")))
+                            yield create_enum_chunk(class_name, enum_name, enum_values)
+
+def batched(iterable, n):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def embed_texts(embed_model, texts):
+    """One batched embedding call; on failure fall back to per-text calls
+    so a single bad text only loses its own vector."""
+    try:
+        return embed_model.get_text_embedding_batch(texts)
+    except Exception as e:
+        print(f"Warning: batch embedding failed ({e}), retrying one by one")
+    vectors = []
+    for text in texts:
+        try:
+            vectors.append(embed_model.get_text_embedding(text))
+        except Exception as e:
+            print(f"Warning: Failed to embed text: {e}")
+            vectors.append(None)
+    return vectors
+
+def index_batch(faiss_indexes, batch, embed_model):
+    """Embed every field of a batch and append to the FAISS indexes.
+    Returns {index_name: [faiss_id or None per chunk]}."""
+    ids = {}
+    for index_name, field in CHUNK_FIELDS.items():
+        ids[index_name] = [None] * len(batch)
+        todo = [(i, chunk[field]) for i, chunk in enumerate(batch)
+                if chunk[field] and chunk[field].strip()]
+        if not todo:
+            continue
+        vectors = embed_texts(embed_model, [text for _, text in todo])
+        index = faiss_indexes[index_name]
+        kept = [(i, vector) for (i, _), vector in zip(todo, vectors) if vector is not None]
+        if not kept:
+            continue
+        for n, (i, _) in enumerate(kept):
+            ids[index_name][i] = index.ntotal + n
+        matrix = np.array([vector for _, vector in kept], dtype='float32')
+        index.add(normalize(matrix) if METRIC == COSINE else matrix)
+    return ids
+
+def write_batch(conn, batch, ids):
+    """Insert one batch of chunks (and their parameters) in one transaction."""
+    with conn:
+        insert_documents(conn, (
+            {**chunk, **{INDEX_COLUMNS[name]: ids[name][i] for name in INDEX_COLUMNS}}
+            for i, chunk in enumerate(batch)
+        ))
         
-        conn.commit()
-        print(f"  Processed {min(i+batch_size, len(chunks))}/{len(chunks)} chunks...")
-    
-    print(f"✅ Inserted {len(chunks)} entries into SQLite")
+        conn.executemany('''INSERT INTO parameters 
+                   (doc_id, class_name, method_name, param_name, param_type, param_description)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                 [(chunk["doc_id"], chunk["class_name"], chunk["item_name"],
+                   param.get("Name", param.get("Parameter", "")),
+                   param.get("Type", ""),
+                   param.get("Description", ""))
+                  for chunk in batch
+                  for param in chunk["parameters_list"] or []
+                  if isinstance(param, dict)])
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def process_json_files(conn, faiss_indexes, embed_model, sink=None, batch_size=BATCH_SIZE):
+    """Stream all JSON files through embedding, FAISS, SQLite and the sink.
+    Only one batch of chunks is alive at a time. Returns the chunk count."""
+    json_files = sorted(DOCS_DIR.glob("*.json"))
+    print(f"\n📄 Found {len(json_files)} JSON files to process")
+    print("\n🔢 Creating embeddings and inserting into database...")
     
-    return chunks
+    total = 0
+    for batch in batched(iter_chunks(json_files), batch_size):
+        ids = index_batch(faiss_indexes, batch, embed_model)
+        write_batch(conn, batch, ids)
+        if sink is not None:
+            sink.write_batch(batch, ids)
+        total += len(batch)
+        rss = peak_rss_mb()
+        print(f"  Processed {total} chunks..." + (f" (peak RSS {rss:.0f} MB)" if rss else ""))
+    
+    print(f"✅ Inserted {total} entries into SQLite")
+    return total
 
-def save_faiss_indexes(faiss_indexes):
+def save_faiss_indexes(faiss_indexes, out_dir=FAISS_DIR):
     """Save all FAISS indexes to disk"""
     print("\n💾 Saving FAISS indexes...")
+    out_dir.mkdir(parents=True, exist_ok=True)
     for name, index in faiss_indexes.items():
-        path = FAISS_DIR / f"{name}.index"
+        path = out_dir / f"{name}.index"
         faiss.write_index(index, str(path))
         print(f"  ✓ Saved {name}.index ({index.ntotal} vectors)")
+    main = faiss_indexes["main"]
+    threshold = calibrate(main.reconstruct_n(0, main.ntotal), METRIC)
+    save_metric(out_dir, METRIC, threshold)
+    print(f"  ✓ Calibrated {METRIC} similarity threshold: {threshold}")
     
-    print(f"✅ All FAISS indexes saved to {FAISS_DIR}")
+    print(f"✅ All FAISS indexes saved to {out_dir}")
 
-def save_processed_chunks(chunks):
-    """Save processed chunks as JSON for backup/debugging"""
-    output_path = PROCESSED_DIR / "processed_chunks.json"
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(chunks, f, ensure_ascii=False, indent=2)
-    print(f"✅ Saved processed chunks to {output_path}")
+class ChunkSink:
+    """Export processed chunks with the `documents` table's columns as
+    <base>.jsonl.gz (+ .parquet when pyarrow is installed)."""
+
+    def __init__(self, base):
+        self._sink = RecordSink(base, DOCUMENT_SCHEMA, parquet=WRITE_PARQUET)
+
+    def write_batch(self, batch, ids):
+        self._sink.write(
+            {**chunk, **{INDEX_COLUMNS[name]: ids[name][i] for name in INDEX_COLUMNS}}
+            for i, chunk in enumerate(batch)
+        )
+
+    def close(self, commit=True):
+        self._sink.close(commit)
+        if commit:
+            print(f"✅ Saved processed chunks to {', '.join(map(str, self._sink.paths))}")
+
+def stage_build(embed_model, dimension):
+    """Build into BUILDS_DIR/.staging-<id>; nothing live is touched.
+    Returns (staging dir, build id, chunk count)."""
+    # Step 2: Create databases in a staging build directory
+    build_id = generation_id()
+    staging = BUILDS_DIR / f".staging-{build_id}"
+    staging.mkdir(parents=True)
+    print(f"\n🗄️  Creating SQLite database (staging: {staging})...")
+    conn = create_sqlite_db(staging / "premiere_docs.db")
+    
+    print("\n🔍 Creating FAISS indexes...")
+    faiss_indexes = create_faiss_indexes(dimension)
+    
+    # Step 3: Stream JSON files through embedding, FAISS, SQLite and the JSONL sink
+    print("\n⚙️  Processing documentation files...")
+    sink = ChunkSink(staging / CHUNKS_NAME)
+    try:
+        total_chunks = process_json_files(conn, faiss_indexes, embed_model, sink, batch_size=BATCH_SIZE)
+    except BaseException:
+        sink.close(commit=False)
+        raise
+    finally:
+        conn.close()
+    sink.close()
+    
+    # Step 4: Save everything
+    save_faiss_indexes(faiss_indexes, staging / "faiss_indexes")
+    symbols = SymbolIndex.from_db(staging / "premiere_docs.db")
+    symbols.save(staging / "faiss_indexes" / "symbols.json")
+    print(f"✅ Symbol index saved ({len(symbols)} keys)")
+    FilterIndex.from_db(staging / "premiere_docs.db").save(staging / "faiss_indexes" / "filters.npz")
+    graph = TypeGraph.from_db(staging / "premiere_docs.db")
+    graph.save(staging / "faiss_indexes" / "type_graph.json")
+    with open(staging / GRAPH_STORE.name, "w", encoding="utf-8") as f:
+        json.dump(graph.to_graph_store(), f, indent=2)
+    print(f"✅ Type graph saved ({len(graph.nodes)} classes, {len(graph.targets)} edges)")
+    return staging, build_id, total_chunks
+
+# ============================================================================
+# BLUE/GREEN: validate a staged build, then promote it atomically
+# ============================================================================
+def validate_build(build_dir, embed_model):
+    """Raise ValueError unless the staged build is consistent and searchable."""
+    conn = sqlite3.connect(build_dir / "premiere_docs.db")
+    try:
+        rows = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        if rows == 0:
+            raise ValueError("no documents in staged build")
+
+        indexes = {name: faiss.read_index(str(build_dir / "faiss_indexes" / f"{name}.index"))
+                   for name in INDEX_COLUMNS}
+        for name, column in INDEX_COLUMNS.items():
+            ids = [r[0] for r in conn.execute(f"SELECT {column} FROM documents WHERE {column} IS NOT NULL")]
+            ntotal = indexes[name].ntotal
+            if any(i < 0 or i >= ntotal for i in ids) or len(set(ids)) != len(ids):
+                raise ValueError(f"{name}: rows point at missing or shared vectors")
+            if len(ids) != ntotal:
+                # INSERT OR REPLACE on a duplicate doc_id leaves its first vector unreferenced
+                print(f"  ⚠️  {name}: {ntotal - len(ids)} vectors not referenced by any row")
+        if indexes["main"].ntotal < rows:
+            raise ValueError(f"main index has {indexes['main'].ntotal} vectors for {rows} rows")
+
+        # Smoke 1: stored vectors score like themselves (by score, not id:
+        # duplicate texts have identical vectors and may tie ahead of it)
+        main = indexes["main"]
+        sample = [r[0] for r in conn.execute(
+            "SELECT faiss_id_main FROM documents WHERE faiss_id_main IS NOT NULL "
+            "ORDER BY RANDOM() LIMIT ?", (SMOKE_SAMPLES,))]
+        for faiss_id in sample:
+            vec = main.reconstruct(faiss_id).reshape(1, -1)
+            D, _ = main.search(vec, 1)
+            own = float(vec[0] @ vec[0]) if index_metric(main) == COSINE else 0.0
+            if abs(float(D[0, 0]) - own) > SMOKE_TOLERANCE * max(1.0, abs(own)):
+                raise ValueError(f"vector {faiss_id} does not retrieve itself "
+                                 f"(top score {D[0, 0]:.6f}, own {own:.6f})")
+
+        # Smoke 2: a real query returns hits that resolve to rows
+        vec = np.array(embed_model.get_text_embedding(SMOKE_QUERY), dtype="float32").reshape(1, -1)
+        _, I = main.search(vec, 5)
+        hits = [int(i) for i in I[0] if i != -1]
+        resolved = conn.execute(
+            f"SELECT COUNT(*) FROM documents WHERE faiss_id_main IN ({','.join('?' * len(hits))})", hits
+        ).fetchone()[0] if hits else 0
+        if not hits or resolved == 0:
+            raise ValueError(f"smoke query {SMOKE_QUERY!r} returned no resolvable hits")
+    finally:
+        conn.close()
+    print(f"✅ Staged build validated ({rows} rows)")
+
+def promote_build(staging_dir, build_id):
+    """Move the validated build into BUILDS_DIR and make it live.
+
+    The bundle is written and verified from the staged files first, so a
+    failure there leaves everything on the old build. FAISS_DIR,
+    SQLITE_DB, the chunk export and GRAPH_STORE resolve through
+    CURRENT_BUILD, so all of them switch with one rename; readers see either the old or the new files, and processes
+    that already opened the old ones keep using them.
+    """
+    bundle_path = bundle_from_build(staging_dir / "faiss_indexes" / "main.index",
+                                    staging_dir / "premiere_docs.db", EMBED_MODEL)
+    if not open_bundle(bundle_path).verify():
+        shutil.rmtree(bundle_path, ignore_errors=True)
+        raise ValueError(f"bundle {bundle_path} failed checksum verification")
+
+    final = BUILDS_DIR / build_id
+    os.rename(staging_dir, final)
+    swap_symlink(CURRENT_BUILD, final)
+    ensure_symlink(FAISS_DIR, CURRENT_BUILD / "faiss_indexes")      # no-ops after the first build
+    ensure_symlink(SQLITE_DB, CURRENT_BUILD / "premiere_docs.db")
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    for suffix in (".jsonl.gz", ".parquet"):           # .parquet dangles without pyarrow: skipped on read
+        ensure_symlink(PROCESSED_DIR / f"{CHUNKS_NAME}{suffix}", CURRENT_BUILD / f"{CHUNKS_NAME}{suffix}")
+    GRAPH_STORE.parent.mkdir(parents=True, exist_ok=True)
+    ensure_symlink(GRAPH_STORE, CURRENT_BUILD / GRAPH_STORE.name)
+
+    # The bundle is what hot-swapping searchers follow
+    publish(bundle_path)
+    link_shard(bundle_path, CORPUS, CORPUS_VERSION)
+    prune_generations(BUILDS_DIR, KEEP_BUILDS, live=final)
+    return final, bundle_path
 
 # ============================================================================
 # MAIN
@@ -435,38 +614,35 @@ def main():
     
     # Step 1: Initialize embedding model
     print("\n📦 Initializing embedding model...")
-    embed_model = OllamaEmbedding(
-        model_name=EMBED_MODEL,
-        base_url="http://localhost:11434"
-    )
+    embed_model = llama_index_embedding(EMBED_MODEL)
     
     # Get embedding dimension
     test_vector = embed_model.get_text_embedding("test")
     dimension = len(test_vector)
     print(f"✅ Embedding model loaded (dimension: {dimension})")
     
-    # Step 2: Create databases
-    print("\n🗄️  Creating SQLite database...")
-    conn = create_sqlite_db()
-    
-    print("\n🔍 Creating FAISS indexes...")
-    faiss_indexes = create_faiss_indexes(dimension)
-    
-    # Step 3: Process JSON files
-    print("\n⚙️  Processing documentation files...")
-    chunks = process_json_files(conn, faiss_indexes, embed_model)
-    
-    # Step 4: Save everything
-    save_faiss_indexes(faiss_indexes)
-    save_processed_chunks(chunks)
-    
-    conn.close()
+    for dir_path in [PROCESSED_DIR, EMBEDDINGS_DIR, BUILDS_DIR]:
+        dir_path.mkdir(parents=True, exist_ok=True)
+
+    # Steps 2-4: stream everything into a staging build directory
+    staging, build_id, total_chunks = stage_build(embed_model, dimension)
+
+    # Step 5: Validate the staged build, then promote it (FAISS + SQLite + bundle)
+    print("\n🔎 Validating staged build...")
+    validate_build(staging, embed_model)
+    print("\n📦 Promoting build...")
+    final, bundle_path = promote_build(staging, build_id)
+    print(f"✅ Live build: {final}")
+    print(f"✅ Published bundle: {bundle_path}")
     
     # Summary
     print("\n" + "=" * 70)
     print("✅ INDEXING COMPLETE!")
     print("=" * 70)
-    print(f"📊 Total chunks indexed: {len(chunks)}")
+    print(f"📊 Total chunks indexed: {total_chunks}")
+    rss = peak_rss_mb()
+    if rss:
+        print(f"📈 Peak RSS: {rss:.0f} MB")
     print(f"📁 SQLite database: {SQLITE_DB}")
     print(f"📁 FAISS indexes: {FAISS_DIR}")
     print(f"📁 Processed data: {PROCESSED_DIR}")
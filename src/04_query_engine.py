@@ -5,13 +5,24 @@ plan_and_pick_api.py  ––  1 file, 2 jobs:
   2. for each step pick the single closest Premiere-Pro API
 """
 
+import contextvars
 import json
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Iterator
 import numpy as np
-import faiss
 from pathlib import Path
-from llama_index.llms.ollama import Ollama
-from llama_index.embeddings.ollama import OllamaEmbedding
+
+from context_packer import count_tokens, pack_candidates
+from docs_db import rows_by_faiss_id
+from id_filters import FilterIndex, faiss_params
+from symbol_index import SymbolIndex, looks_like_symbol
+from ollama_client import llama_index_embedding, llama_index_llm
+from tracing import span, start_span
+from type_graph import TypeGraph
+from vector_metric import COSINE, index_metric, load_threshold, normalize, range_search, similarity
 
 # -----------------------------------------------------------
 # CONFIG – keep in sync with your existing build scripts
@@ -20,20 +31,29 @@ EMBEDDINGS_DIR = Path("embeddings")
 FAISS_DIR      = EMBEDDINGS_DIR / "faiss_indexes"
 SQLITE_DB      = EMBEDDINGS_DIR / "premiere_docs.db"
 EMBED_MODEL    = "embeddinggemma"
+TOP_K          = 5        # candidates per step for the re-ranker (cap for threshold search)
 LLM_MODEL      = "mistral"
 
 PROMPT_FILE    = Path("prompt/prompt.txt")   # your few-shot prompt lives here
 
+@lru_cache(maxsize=None)
+def default_llm():
+    """One pooled LLM client per process instead of one per call."""
+    return llama_index_llm(LLM_MODEL, request_timeout=12000)
+
 # -----------------------------------------------------------
 # 1. LLM-based decomposer (identical logic to your first file)
 # -----------------------------------------------------------
-def decompose_query(query: str) -> list[dict]:
+def decompose_query(query: str, llm=None) -> list[dict]:
     system_prompt = PROMPT_FILE.read_text(encoding="utf-8")
     prompt = f"{system_prompt}\n\nUser request: {query}"
 
-    llm = Ollama(model=LLM_MODEL, request_timeout=12000)
-    raw = llm.complete(prompt).text.strip()
+    llm = llm or default_llm()
+    with span("decompose", prompt_tokens=count_tokens(prompt)):
+        raw = llm.complete(prompt).text.strip()
+    return _parse_plan(raw)
 
+def _parse_plan(raw: str) -> list[dict]:
     cleaned = (
         raw.replace("```json", "")
            .replace("```", "")
@@ -47,70 +67,318 @@ def decompose_query(query: str) -> list[dict]:
         return [{"action": line.strip(), "description": ""}
                 for line in cleaned.splitlines() if line.strip()]
 
+# -----------------------------------------------------------
+# 1b. Streaming decomposer – emits each step as soon as it is closed
+# -----------------------------------------------------------
+def iter_json_objects(chunks: Iterable[str]) -> Iterator[dict]:
+    """Incrementally parse a stream of text chunks and yield every
+    top-level JSON object ({...}) the moment its closing brace arrives.
+
+    Anything outside an object (the surrounding `[`, commas, markdown
+    fences, chatter) is ignored, so the planner output does not have to
+    be clean JSON for the steps to come through.
+    """
+    buf = []
+    depth = 0
+    in_string = False
+    escaped = False
+    for chunk in chunks:
+        for ch in chunk:
+            if depth == 0:
+                if ch == "{":
+                    buf = [ch]
+                    depth = 1
+                continue
+            buf.append(ch)
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        obj = json.loads("".join(buf))
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(obj, dict) and obj.get("action"):
+                        yield obj
+
+
+def decompose_query_stream(query: str, llm=None) -> Iterator[dict]:
+    """Same prompt as decompose_query(), but consumes the planner output
+    token by token and yields each {action, description} step as soon as
+    the model has finished writing it."""
+    system_prompt = PROMPT_FILE.read_text(encoding="utf-8")
+    prompt = f"{system_prompt}\n\nUser request: {query}"
+
+    llm = llm or default_llm()
+    # not `with span(...)`: the span would stay current across the yields, and a
+    # consumer that abandons the generator would close it from another context
+    s = start_span("decompose", prompt_tokens=count_tokens(prompt), stream=True)
+    text, steps, error = [], 0, None
+
+    def deltas():
+        for r in llm.stream_complete(prompt):
+            text.append(r.delta or "")
+            yield text[-1]
+    try:
+        for step in iter_json_objects(deltas()):
+            steps += 1
+            yield step
+        if not steps:
+            # no JSON object in the output: same line-per-step fallback as decompose_query()
+            for step in _parse_plan("".join(text).strip()):
+                steps += 1
+                yield step
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        s.attrs["steps"] = steps
+        s.finish(error)
+
 # -----------------------------------------------------------
 # 2. Documentation searcher (stripped-down version)
 # -----------------------------------------------------------
+ROW_COLUMNS = ("class_name", "item_name", "member_type", "full_signature",
+               "description", "parameters", "return_type", "details", "example_code")
+
 class DocSearcher:
-    def __init__(self):
-        self.emb = OllamaEmbedding(model_name=EMBED_MODEL, base_url="http://localhost:11434")
-        self.conn = sqlite3.connect(SQLITE_DB)
+    def __init__(self, emb=None, bundle=None):
+        # emb: anything with get_text_embedding(), e.g. an EmbeddingBatcher
+        self.emb = emb or llama_index_embedding(EMBED_MODEL)
+        self._lock = threading.Lock()
+        # bundle: an index_bundle.IndexBundle – vectors and rows from one mmapped build
+        self.bundle = bundle
+        self._symbols = None
+        self._filters = None
+        self._graph = None
+        self._symbols_lock = threading.Lock()
+        if bundle is not None:
+            self.conn = None
+            self.index = bundle
+            self.metric = bundle.metric
+            threshold = bundle.manifest.get("threshold")       # a calibrated 0.0 is a threshold too
+            self.threshold = load_threshold(FAISS_DIR, self.metric) if threshold is None else threshold
+            return
+        # shared by the streaming pipeline's worker threads, guarded by _lock
+        self.conn = sqlite3.connect(SQLITE_DB, check_same_thread=False)
+        import faiss
         self.index = faiss.read_index(str(FAISS_DIR / "main.index"))
+        # cosine builds: normalized vectors, scores are cosine similarities
+        self.metric = index_metric(self.index)
+        self.threshold = load_threshold(FAISS_DIR, self.metric)
+
+    @classmethod
+    def from_bundle(cls, path=None, emb=None):
+        from index_bundle import open_bundle
+        return cls(emb=emb, bundle=open_bundle(path))
+
+    def _resolve_many(self, faiss_ids: list[int]) -> dict:
+        """{faiss_id: row tuple} for all hits: one bundle read each, or one
+        SQLite query (cold columns decompressed only for these rows)."""
+        if self.bundle is not None:
+            rows = {i: self.bundle.row(i) for i in faiss_ids}
+            # tombstones (None) are skipped, like ids without a row in SQLite
+            return {i: tuple(r.get(c, "") for c in ROW_COLUMNS) for i, r in rows.items() if r is not None}
+        return rows_by_faiss_id(self.conn, ROW_COLUMNS, faiss_ids, lock=self._lock)
+
+    @staticmethod
+    def _record(row, similarity: float) -> dict:
+        return {
+            "class_name": row[0],
+            "item_name": row[1],
+            "member_type": row[2],
+            "full_signature": row[3],
+            "description": row[4] or "",
+            "parameters": row[5] or "",
+            "return_type": row[6] or "",
+            "details": row[7] or "",
+            "example_code": row[8] or "",
+            "similarity": similarity,
+        }
+
+    # ---------- symbol lookups (no embedding, no LLM) ----------
+    @property
+    def symbols(self) -> SymbolIndex:
+        """Loaded on first use: symbols.json saved by the build, else
+        derived from the bundle rows / SQLite."""
+        with self._symbols_lock:
+            if self._symbols is None:
+                saved = FAISS_DIR / "symbols.json"
+                if self.bundle is not None:
+                    self._symbols = SymbolIndex.from_bundle(self.bundle)
+                elif saved.exists():
+                    self._symbols = SymbolIndex.load(saved)
+                else:
+                    self._symbols = SymbolIndex.from_db(SQLITE_DB)
+            return self._symbols
+
+    @property
+    def filters(self) -> FilterIndex:
+        """class_name / section_type / member_type postings, loaded like symbols."""
+        with self._symbols_lock:
+            if self._filters is None:
+                saved = FAISS_DIR / "filters.npz"
+                if self.bundle is not None:
+                    self._filters = FilterIndex.from_bundle(self.bundle)
+                elif saved.exists():
+                    self._filters = FilterIndex.load(saved)
+                else:
+                    self._filters = FilterIndex.from_db(SQLITE_DB)
+            return self._filters
+
+    @property
+    def graph(self) -> TypeGraph:
+        """Class/member type graph for access chains, loaded like symbols."""
+        with self._symbols_lock:
+            if self._graph is None:
+                saved = FAISS_DIR / "type_graph.json"
+                if self.bundle is not None:
+                    self._graph = TypeGraph.from_bundle(self.bundle)
+                elif saved.exists():
+                    self._graph = TypeGraph.load(saved)
+                else:
+                    self._graph = TypeGraph.from_db(SQLITE_DB)
+            return self._graph
+
+    def access_chains(self, text: str, k: int = 3) -> list[dict]:
+        """Concrete expressions (app.project.activeSequence...) for the
+        objects / members named in `text`, straight from the type graph."""
+        with span("type_graph") as s:
+            chains = self.graph.resolve(text, limit=k)
+            s["hits"] = len(chains)
+        return chains
+
+    def with_access(self, records: list[dict]) -> list[dict]:
+        """Add the "access" expression to each record."""
+        graph = self.graph
+        for r in records:
+            r["access"] = graph.access_path(r["class_name"], r["item_name"], r["member_type"])
+        return records
+
+    def lookup_symbol(self, text: str, k: int = 5) -> list[dict]:
+        """Exact / suffix / prefix / fuzzy name matches, best tier only."""
+        with span("symbol_lookup") as s:
+            hits = self.symbols.lookup(text, limit=k)
+            rows = self._resolve_many([faiss_id for faiss_id, _, _ in hits])
+            s["hits"] = len(hits)
+        return self.with_access([{**self._record(rows[faiss_id], score), "match": how}
+                                 for faiss_id, score, how in hits if faiss_id in rows])
+
+    def search(self, text: str, **filters) -> list[dict]:
+        """Route API-name queries to the symbol index, everything else
+        (and any filtered query) to the vector search."""
+        if looks_like_symbol(text) and not any(filters.values()):
+            hits = self.lookup_symbol(text)
+            if hits:
+                return hits
+        return self.nearest_api(text, **filters)
+
     # ---------- only public method we need ----------
-    def nearest_api(self, text: str) -> list[dict]: # Change return type to list
-        """Return top-K closest API records for arbitrary text."""
-        K = 5 # Set K to 5
-        vec = np.array(self.emb.get_text_embedding(text), dtype="float32").reshape(1, -1)
-        dists, ids = self.index.search(vec, k=K)
-
-        results = []
-        for i in range(K):
-            faiss_id = int(ids[0, i])
-            distance = float(dists[0, i])
-
-            if faiss_id == -1: # Skip if no more results (e.g., small index)
-                continue
+    def nearest_api(self, text: str, k: int = 5, class_name=None, member_type=None,
+                    section_type=None, threshold: float = None) -> list[dict]:
+        """Return top-K closest API records for arbitrary text, optionally
+        only among documents matching class_name / member_type /
+        section_type (a value or a list of values each). With a threshold,
+        only hits at least that similar (still at most k)."""
+        return self.nearest_api_many([text], k, class_name, member_type, section_type, threshold)[0]
+
+    def nearest_api_many(self, texts: list[str], k: int = 5, class_name=None, member_type=None,
+                         section_type=None, threshold: float = None) -> list[list[dict]]:
+        """nearest_api() for a batch of texts: one embedding call, one
+        index search and one metadata resolve for all of them."""
+        subset = None
+        if class_name or member_type or section_type:
+            subset = self.filters.select(class_name=class_name, member_type=member_type,
+                                         section_type=section_type)
+        if not texts or (subset is not None and len(subset) == 0):
+            return [[] for _ in texts]
+        with span("embed", batch_size=len(texts)):
+            embed_batch = getattr(self.emb, "get_text_embedding_batch", None)
+            if len(texts) > 1 and embed_batch is not None:
+                vecs = embed_batch(list(texts))
+            else:
+                vecs = [self.emb.get_text_embedding(t) for t in texts]
+            vecs = np.array(vecs, dtype="float32").reshape(len(texts), -1)
+            if self.metric == COSINE:
+                vecs = normalize(vecs)
+        with span("faiss_search", k=k, subset=None if subset is None else len(subset),
+                  threshold=threshold, batch_size=len(texts)) as s:
+            params = faiss_params(subset) if subset is not None and self.bundle is None else None
+            if threshold is not None:
+                found = range_search(self.index, vecs, threshold, max_k=k, params=params,
+                                     ids=subset, metric=self.metric)
+            else:
+                if self.bundle is not None:
+                    dists, ids = self.bundle.search(vecs, k=k, ids=subset)
+                elif params is not None:
+                    dists, ids = self.index.search(vecs, k=k, params=params)
+                else:
+                    dists, ids = self.index.search(vecs, k=k)
+                found = [(similarity(dists[q], self.metric), ids[q]) for q in range(len(texts))]
+            hits = [[(int(i), float(sim)) for i, sim in zip(ids, sims) if int(i) != -1]  # -1: fewer than k vectors
+                    for sims, ids in found]
+            s["hits"] = sum(map(len, hits))
+        if not any(hits):
+            return [[] for _ in texts]
+
+        with span("resolve") as s:
+            resolved = self._resolve_many(sorted({faiss_id for h in hits for faiss_id, _ in h}))
+            s["rows"] = len(resolved)
+        return [self.with_access([self._record(resolved[faiss_id], sim)
+                                  for faiss_id, sim in h if resolved.get(faiss_id)])
+                for h in hits]
 
-            row = self.conn.execute(
-                """SELECT class_name, item_name, member_type, full_signature,
-                          description, parameters, return_type, details, example_code
-                   FROM documents WHERE faiss_id_main = ?""",
-                (faiss_id,)
-            ).fetchone()
-
-            if row:
-                results.append({
-                    "class_name": row[0],
-                    "item_name": row[1],
-                    "member_type": row[2],
-                    "full_signature": row[3],
-                    "description": row[4] or "",
-                    "parameters": row[5] or "",
-                    "return_type": row[6] or "",
-                    "details": row[7] or "",
-                    "example_code": row[8] or "",
-                    "similarity": 1.0 / (1.0 + distance) # Inverse distance as score
-                })
-        return results
+    def relevant_apis(self, text: str, max_k: int = TOP_K, threshold: float = None,
+                      **filters) -> list[dict]:
+        """Every API at least `threshold` similar (default: the build's
+        calibrated threshold), best first, at most max_k. Unrelated tail
+        candidates never get resolved or sent to the LLM. Builds without a
+        calibrated threshold return the plain top max_k."""
+        return self.relevant_apis_many([text], max_k, threshold, **filters)[0]
+
+    def relevant_apis_many(self, texts: list[str], max_k: int = TOP_K, threshold: float = None,
+                           **filters) -> list[list[dict]]:
+        return self.nearest_api_many(texts, k=max_k,
+                                     threshold=self.threshold if threshold is None else threshold,
+                                     **filters)
     
     def close(self):
         """Closes the SQLite database connection."""
-        self.conn.close()
+        if self.conn is not None:
+            self.conn.close()
         
 # -----------------------------------------------------------
 # NEW: LLM-based re-ranker
 # -----------------------------------------------------------
-def re_rank_apis(action: str, candidates: list[dict]) -> dict:
-    """Uses LLM to select the single best API from the top-K candidates."""
-    # 1. Format the candidates for the LLM
+def re_rank_apis(action: str, candidates: list[dict], llm=None, chains=None) -> dict:
+    """Uses LLM to select the single best API from the top-K candidates.
+    `chains` (from DocSearcher.access_chains) are shown as known-good
+    expressions so the model does not have to invent how to reach an object."""
+    # 1. Format the candidates for the LLM (trimmed to the token budget)
     candidate_list = "\n".join([
         f"--- Candidate {i+1} ---\n"
         f"API: {c['full_signature']}\n"
+        + (f"Access: {c['access']}\n" if c.get("access") else "") +
         f"Details: {c['details']}\n"
         f"Description: {c['description']}\n"
-        for i, c in enumerate(candidates)
+        for i, c in enumerate(pack_candidates(action, candidates))
     ])
 
     # 2. Construct the re-ranking prompt
+    known_chains = ""
+    if chains:
+        known_chains = "KNOWN ACCESS CHAINS:\n" + "\n".join(
+            f"    {c['chain']}" + (f"  -> {c['returns']}" if c["returns"] else "") for c in chains)
     re_rank_prompt = f"""
     You are an expert Adobe Premiere Pro API developer. Your task is to select the single best API from the provided list of candidates that perfectly matches the user's required action.
 
@@ -118,12 +386,14 @@ def re_rank_apis(action: str, candidates: list[dict]) -> dict:
 
     CANDIDATE APIs:
     {candidate_list}
+    {known_chains}
 
     INSTRUCTION: Review the candidates and output ONLY the 'full_signature' of the single best matching API. Do not add any extra text, explanation, or markdown formatting. The output must be the exact string of the chosen full_signature.
     """
 
-    llm = Ollama(model=LLM_MODEL, request_timeout=12000)
-    best_signature = llm.complete(re_rank_prompt).text.strip()
+    llm = llm or default_llm()
+    with span("re_rank", candidates=len(candidates), prompt_tokens=count_tokens(re_rank_prompt)):
+        best_signature = llm.complete(re_rank_prompt).text.strip()
 
     # 3. Find and return the chosen candidate object
     for c in candidates:
@@ -136,31 +406,109 @@ def re_rank_apis(action: str, candidates: list[dict]) -> dict:
 # -----------------------------------------------------------
 # 3. End-to-end pipeline
 # -----------------------------------------------------------
-def plan_and_pick(query: str) -> list[dict]:
-    plan = decompose_query(query)
-    searcher = DocSearcher()
+def plan_and_pick(query: str, searcher: DocSearcher = None, llm=None) -> list[dict]:
+    """Decompose + pick. Pass a long-lived searcher/llm to skip the setup
+    cost; otherwise they are created here and the searcher closed after."""
+    with span("plan_and_pick") as s:
+        plan = _plan_and_pick(query, searcher, llm)
+        s["steps"] = len(plan)
+    return plan
+
+def symbol_plan(query: str, searcher: DocSearcher):
+    """One-step plan when the query names exactly one API, else None."""
+    if not looks_like_symbol(query):
+        return None
+    hits = [h for h in searcher.lookup_symbol(query) if h["match"] in ("exact", "suffix")]
+    if len(hits) != 1:
+        return None
+    return [{"action": query, "description": "Direct API lookup", "best_api": hits[0]}]
+
+def _plan_and_pick(query: str, searcher: DocSearcher = None, llm=None) -> list[dict]:
+    owns_searcher = searcher is None
+    searcher = searcher or DocSearcher()
     try:
+        plan = symbol_plan(query, searcher)
+        if plan is not None:
+            return plan
+        plan = decompose_query(query, llm=llm)
         for step in plan:
-            # Step 1: Get top 5 candidates via semantic search
-            candidates = searcher.nearest_api(step["action"])
+            # Step 1: Get the candidates above the similarity threshold (at most TOP_K)
+            candidates = searcher.relevant_apis(step["action"])
+            step["access_chains"] = searcher.access_chains(step["action"])
 
             if candidates:
                 # Step 2: Use LLM to re-rank and pick the best one
-                best_api = re_rank_apis(step["action"], candidates)
+                best_api = re_rank_apis(step["action"], candidates, llm=llm,
+                                        chains=step["access_chains"])
                 step["best_api"] = best_api
             else:
                 step["best_api"] = None
     finally:
-        searcher.close()  # <--- This line caused the error
+        if owns_searcher:
+            searcher.close()
     return plan
 
+def _pick_for_step(searcher: DocSearcher, step: dict, fallback=None, llm=None) -> dict:
+    """Search + re-rank for a single step (runs on a worker thread)."""
+    candidates = searcher.relevant_apis(step["action"])
+    if not candidates and fallback is not None:
+        candidates = fallback.result()
+    step["access_chains"] = searcher.access_chains(step["action"])
+    step["best_api"] = (re_rank_apis(step["action"], candidates, llm=llm, chains=step["access_chains"])
+                        if candidates else None)
+    return step
+
+def plan_and_pick_stream(query: str, speculative: bool = False, workers: int = 2,
+                         searcher: DocSearcher = None, llm=None) -> list[dict]:
+    """Streaming variant of plan_and_pick().
+
+    Retrieval and re-ranking for each step start while the planner is
+    still generating the remaining steps. With speculative=True the raw
+    user query is searched right away as well; those candidates are used
+    for any step whose own search comes back empty.
+    """
+    owns_searcher = searcher is None
+    searcher = searcher or DocSearcher()
+    pool = ThreadPoolExecutor(max_workers=workers)
+    # run workers in a copy of this context so their spans join this trace
+    submit = lambda fn, *a: pool.submit(contextvars.copy_context().run, fn, *a)
+    try:
+        with span("plan_and_pick", stream=True, speculative=speculative) as s:
+            plan = symbol_plan(query, searcher)
+            if plan is not None:
+                s["steps"] = 1
+                return plan
+            fallback = submit(searcher.relevant_apis, query) if speculative else None
+            futures = [submit(_pick_for_step, searcher, step, fallback, llm)
+                       for step in decompose_query_stream(query, llm=llm)]
+            plan = [f.result() for f in futures]
+            s["steps"] = len(plan)
+        return plan
+    finally:
+        pool.shutdown(wait=True)
+        if owns_searcher:
+            searcher.close()
+
 # -----------------------------------------------------------
 # 4. CLI demo
 # -----------------------------------------------------------
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stream", action="store_true", help="Pipeline retrieval with planner generation")
+    parser.add_argument("--speculative", action="store_true", help="Also search the raw query up front (with --stream)")
+    parser.add_argument("--metrics", action="store_true", help="Print per-stage latency summary")
+    args = parser.parse_args()
+
     user = (
         "i want my selected image to get crop vertically only 20 px should be visible "
         "and then scale that image so user focus becomes clear"
     )
-    out = plan_and_pick(user)
-    print(json.dumps(out, indent=2, default=str))
\ No newline at end of file
+    if args.stream:
+        out = plan_and_pick_stream(user, speculative=args.speculative)
+    else:
+        out = plan_and_pick(user)
+    print(json.dumps(out, indent=2, default=str))
+    if args.metrics:
+        import tracing
+        print(json.dumps(tracing.metrics(), indent=2))
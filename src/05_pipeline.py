@@ -1,28 +1,54 @@
 # src/05_pipeline.py
 import json
-from sentence_transformers import SentenceTransformer
-import faiss
-from llama_index.llms.ollama import Ollama
+import os
+import pickle
+import threading
+from pathlib import Path
 import numpy as np
 
+from context_packer import pack_texts
+from ollama_client import llama_index_llm
+from record_io import find_export, iter_records
+from tracing import span
+from vector_metric import COSINE, index_metric, normalize, range_search
+
 # ----------------------------
 # CONFIG
 # ----------------------------
 FAISS_INDEX_PATH = "embeddings/faiss_index.bin"
 DOCS_PATH = "data/processed/ppro_grouped.json"
+DOC_FIELDS = ("name", "description", "example", "section")
 EMBED_MODEL = "all-MiniLM-L6-v2"
 LLM_MODEL = "mistral"  # or any Ollama model
-TOP_K = 5
-SIM_THRESHOLD = 0.55
+TOP_K = 5                # at most this many tools per query
+SIM_THRESHOLD = 0.55     # similarity: cosine for IndexFlatIP, 1 / (1 + d) for L2 indexes
 
 # ----------------------------
 # LOADERS
 # ----------------------------
 def load_faiss_index(path=FAISS_INDEX_PATH):
+    import faiss
     index = faiss.read_index(path)
     return index
 
+def load_embed_model(name=EMBED_MODEL):
+    # sentence_transformers pulls in torch: import it only when a session needs the model
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
 def load_docs(path=DOCS_PATH):
+    """Tool docs in index order. Reads a flat .parquet / .jsonl.gz export
+    of the same data (only the four needed columns) when one sits next to
+    the JSON file and is not older than it, otherwise the nested JSON."""
+    path = Path(path)
+    export = find_export(path.with_suffix(""))
+    if export is not None and (not path.exists() or export.stat().st_mtime >= path.stat().st_mtime):
+        return [
+            {"name": r["name"], "description": r["details"] or "",
+             "example": r["example"] or "", "section": r["section"]}
+            for r in iter_records(export, columns=("section", "name", "details", "example"))
+        ]
+
     with open(path, "r", encoding="utf-8") as f:
         raw = json.load(f)
 
@@ -37,31 +63,122 @@ def load_docs(path=DOCS_PATH):
             })
     return docs
 
+def load_docs_cached(path=DOCS_PATH, snapshot=None):
+    """load_docs() through a binary snapshot (default: <name>.docs.pickle
+    next to the JSON): one pickle of the four columns, rebuilt whenever
+    the JSON or its export is newer."""
+    path = Path(path)
+    snapshot = Path(snapshot) if snapshot else path.with_suffix(".docs.pickle")
+    sources = [p for p in (path, find_export(path.with_suffix(""))) if p is not None and p.exists()]
+    newest = max((p.stat().st_mtime for p in sources), default=0)
+    if snapshot.exists() and snapshot.stat().st_mtime >= newest:
+        with open(snapshot, "rb") as f:
+            columns = pickle.load(f)
+        return [dict(zip(DOC_FIELDS, row)) for row in zip(*(columns[c] for c in DOC_FIELDS))]
+
+    docs = load_docs(path)
+    snapshot.parent.mkdir(parents=True, exist_ok=True)
+    tmp = snapshot.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump({c: [d[c] for d in docs] for c in DOC_FIELDS}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, snapshot)
+    return docs
+
 
 # ----------------------------
 # SEMANTIC TOOL FINDER
 # ----------------------------
+def _tool_hits(sims, ids, docs):
+    return [{
+        "similarity": float(sim),
+        "tool": docs[idx].get("name", "unknown"),
+        "description": docs[idx].get("description", ""),
+        "example": docs[idx].get("example", "")
+    } for sim, idx in zip(sims, ids)]
+
 def find_relevant_tools(query, index, docs, model, top_k=TOP_K, threshold=SIM_THRESHOLD):
-    q_emb = np.array([model.encode(query, convert_to_numpy=True)]).astype("float32")
-    D, I = index.search(q_emb, top_k)
-    results = []
-    for dist, idx in zip(D[0], I[0]):
-        if dist >= threshold:
-            results.append({
-                "similarity": float(dist),
-                "tool": docs[idx].get("name", "unknown"),
-                "description": docs[idx].get("description", ""),
-                "example": docs[idx].get("example", "")
-            })
-    return results
+    """Tools at least `threshold` similar to the query, best first, at most top_k."""
+    return find_relevant_tools_many([query], index, docs, model, top_k, threshold)[0]
+
+def find_relevant_tools_many(queries, index, docs, model, top_k=TOP_K, threshold=SIM_THRESHOLD):
+    """find_relevant_tools() for many queries: one encode() forward pass
+    and one range search for the whole batch."""
+    if not queries:
+        return []
+    with span("embed", batch_size=len(queries)):
+        q_emb = np.asarray(model.encode(list(queries), convert_to_numpy=True), dtype="float32")
+    metric = index_metric(index)
+    if metric == COSINE:
+        q_emb = normalize(q_emb)
+    with span("faiss_search", k=top_k, threshold=threshold, batch_size=len(queries)) as s:
+        found = range_search(index, q_emb, threshold, max_k=top_k, metric=metric)
+        s["hits"] = sum(len(ids) for _, ids in found)
+    return [_tool_hits(sims, ids, docs) for sims, ids in found]
+
+# ----------------------------
+# SESSION (resources loaded once)
+# ----------------------------
+class PipelineSession:
+    """Embedding model, LLM client, FAISS index and docs, each loaded on
+    first use and then shared. Safe to use from several threads; two
+    resources can load at the same time."""
+
+    def __init__(self, index_path=FAISS_INDEX_PATH, docs_path=DOCS_PATH,
+                 embed_model=EMBED_MODEL, llm_model=LLM_MODEL):
+        self._loaders = {
+            "model": lambda: load_embed_model(embed_model),
+            "llm": lambda: llama_index_llm(llm_model, request_timeout=1200),
+            "index": lambda: load_faiss_index(index_path),
+            "docs": lambda: load_docs_cached(docs_path),
+        }
+        self._resources = {}
+        self._locks = {name: threading.Lock() for name in self._loaders}
+
+    def _get(self, name):
+        if name not in self._resources:
+            with self._locks[name]:
+                if name not in self._resources:
+                    with span("load", resource=name):
+                        self._resources[name] = self._loaders[name]()
+        return self._resources[name]
+
+    model = property(lambda self: self._get("model"))
+    llm = property(lambda self: self._get("llm"))
+    index = property(lambda self: self._get("index"))
+    docs = property(lambda self: self._get("docs"))
+
+    def warm(self):
+        """Load everything now instead of on the first query."""
+        for name in self._loaders:
+            self._get(name)
+        return self
+
+    def find_relevant_tools(self, query, top_k=TOP_K, threshold=SIM_THRESHOLD):
+        return find_relevant_tools(query, self.index, self.docs, self.model, top_k, threshold)
+
+    def find_relevant_tools_many(self, queries, top_k=TOP_K, threshold=SIM_THRESHOLD):
+        return find_relevant_tools_many(queries, self.index, self.docs, self.model, top_k, threshold)
+
+    def clarify_query(self, query, tool_candidates):
+        return clarify_query(query, tool_candidates, self.llm)
+
+_default_session = None
+_default_lock = threading.Lock()
+
+def default_session() -> PipelineSession:
+    global _default_session
+    with _default_lock:
+        if _default_session is None:
+            _default_session = PipelineSession()
+        return _default_session
 
 # ----------------------------
 # LLM CLARIFIER
 # ----------------------------
 def clarify_query(query, tool_candidates, llm):
-    tool_list = "\n".join(
-        [f"- {t['tool']}: {t['description']}" for t in tool_candidates]
-    )
+    tool_list = "\n".join(pack_texts(
+        query, [f"- {t['tool']}: {t['description']}" for t in tool_candidates]
+    ))
     prompt = f"""
     User query: {query}
     
@@ -81,37 +198,42 @@ def clarify_query(query, tool_candidates, llm):
       }}]
     """
 
-    resp = llm.complete(prompt)
+    with span("llm", candidates=len(tool_candidates)):
+        resp = llm.complete(prompt)
     return resp.text.strip()
 
 # ----------------------------
 # MAIN PIPELINE
 # ----------------------------
-def run_pipeline(query):
+def run_pipeline(query, session: PipelineSession = None):
+    """Models, index and docs come from `session` (default: one shared
+    session), so only the first call pays the loading cost."""
     print(f"\n--- Running pipeline for query ---\n{query}\n")
+    session = session or default_session()
+
+    with span("pipeline") as s:
+        # Step 1: Tool finder
+        print("Searching for relevant tools...")
+        tools = session.find_relevant_tools(query)
+        s["tools"] = len(tools)
+        if not tools:
+            print("No relevant tools found.")
+            return
 
-    # Load models & index
-    model = SentenceTransformer(EMBED_MODEL)
-    llm = Ollama(model=LLM_MODEL, request_timeout=1200)
-    index = load_faiss_index()
-    docs = load_docs()
-
-    # Step 1: Tool finder
-    print("Searching for relevant tools...")
-    tools = find_relevant_tools(query, index, docs, model)
-    if not tools:
-        print("No relevant tools found.")
-        return
-
-    # Step 2: LLM clarification
-    print("Clarifying context and action...")
-    answer = clarify_query(query, tools, llm)
+        # Step 2: LLM clarification
+        print("Clarifying context and action...")
+        answer = session.clarify_query(query, tools)
     print("\n--- Clarified Instruction ---")
     print(answer)
+    return answer
 
 # ----------------------------
 # ENTRY POINT
 # ----------------------------
 if __name__ == "__main__":
-    user_query = input("Enter your query: ")
-    run_pipeline(user_query)
+    session = default_session()
+    while True:
+        user_query = input("Enter your query (empty to quit): ").strip()
+        if not user_query:
+            break
+        run_pipeline(user_query, session)
@@ -5,13 +5,17 @@ full_pipeline_llamaindex.py –– fully LlamaIndex-based
   - Create VectorStoreIndex
   - Persist to disk
   - Query with semantic search + optional LLM re-ranking
+  - llama_index is imported by the functions that use it and the loaded
+    index / LLM are cached, so `--help` starts instantly and repeated
+    queries in one process load the index once
 """
 
 import json
+from functools import lru_cache
 from pathlib import Path
-from llama_index import Document
-from llama_index.embeddings.ollama import OllamaEmbedding
-from llama_index.llms.ollama import Ollama
+
+from context_packer import pack_texts
+from ollama_client import llama_index_embedding, llama_index_llm
 
 # --------------------------------------------
 # CONFIG
@@ -25,6 +29,7 @@ LLM_MODEL      = "mistral"
 # HELPER: chunk JSON into Document objects
 # --------------------------------------------
 def create_documents(json_file):
+    from llama_index.core import Document
     with open(json_file, "r", encoding="utf-8") as f:
         data = json.load(f)
 
@@ -54,42 +59,48 @@ def create_documents(json_file):
 # BUILD INDEX
 # --------------------------------------------
 def build_index():
+    from llama_index.core import VectorStoreIndex
     INDEX_DIR.mkdir(parents=True, exist_ok=True)
 
     # Embeddings
-    embed_model = OllamaEmbedding(model_name=EMBED_MODEL, base_url="http://localhost:11434")
-    service_ctx = ServiceContext.from_defaults(embed_model=embed_model)
+    embed_model = llama_index_embedding(EMBED_MODEL)
 
     all_docs = []
     for f in DOCS_DIR.glob("*.json"):
         all_docs.extend(create_documents(f))
 
     # Vector index
-    index = VectorStoreIndex.from_documents(all_docs, service_context=service_ctx)
+    index = VectorStoreIndex.from_documents(all_docs, embed_model=embed_model)
 
     # Persist
-    storage_context = StorageContext.from_defaults(persist_dir=INDEX_DIR)
-    index.storage_context = storage_context
-    index.storage_context.persist()
+    index.storage_context.persist(persist_dir=INDEX_DIR)
+    load_index.cache_clear()
     print(f"✅ Indexed {len(all_docs)} documents into {INDEX_DIR}")
 
 # --------------------------------------------
 # QUERY ENGINE
 # --------------------------------------------
-def query_index(query: str, top_k: int = 5):
-    embed_model = OllamaEmbedding(model_name=EMBED_MODEL, base_url="http://localhost:11434")
-    service_ctx = ServiceContext.from_defaults(embed_model=embed_model)
+@lru_cache(maxsize=None)
+def load_index():
+    """Persisted index, loaded once per process."""
+    from llama_index.core import StorageContext, load_index_from_storage
     storage_context = StorageContext.from_defaults(persist_dir=INDEX_DIR)
-    index = VectorStoreIndex.load_from_storage(storage_context, service_context=service_ctx)
-    # LlamaIndex query engine
-    response_nodes = index.as_query_engine(similarity_top_k=top_k).retrieve(query)
+    return load_index_from_storage(storage_context, embed_model=llama_index_embedding(EMBED_MODEL))
+
+def query_index(query: str, top_k: int = 5):
+    # semantic search only, no LLM call
+    response_nodes = load_index().as_retriever(similarity_top_k=top_k).retrieve(query)
     return [{"text": n.node.get_text(), "metadata": n.node.metadata} for n in response_nodes]
 
+@lru_cache(maxsize=None)
+def get_llm():
+    return llama_index_llm(LLM_MODEL, request_timeout=12000)
+
 # --------------------------------------------
 # LLM RE-RANKER (optional)
 # --------------------------------------------
 def re_rank(query: str, candidates: list[dict]):
-    candidate_text = "\n".join([f"{c['text']}" for c in candidates])
+    candidate_text = "\n".join(pack_texts(query, [c['text'] for c in candidates]))
     prompt = f"""
 You are an expert Premiere Pro API developer. User wants: "{query}"
 
@@ -98,8 +109,7 @@ Candidate APIs:
 
 Choose the single best API by returning ONLY the full_signature string.
 """
-    llm = Ollama(model=LLM_MODEL, request_timeout=12000)
-    best = llm.complete(prompt).text.strip()
+    best = get_llm().complete(prompt).text.strip()
     for c in candidates:
         if c['text'].startswith(best):
             return c
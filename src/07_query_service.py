@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+07_query_service.py  ––  resident query service
+  - loads DocSearcher (FAISS + SQLite) and the Ollama clients once
+  - preloads the Ollama models and pins them with keep_alive
+  - serves plan / search / plan_and_pick / rag over HTTP (TCP or Unix socket);
+    API-name queries are answered from the symbol index, without Ollama
+  - concurrent embedding calls are micro-batched (embed_batcher.py),
+    counters and per-stage latency histograms (tracing.py) at GET /metrics
+  - POST /reload (or SIGHUP) swaps in fresh resources without dropping
+    in-flight requests
+  - searches the published index bundle when there is one, and reloads
+    by itself when a rebuild promotes a new bundle generation
+  - corpus shards (shards.py) are loaded / unloaded with POST /shards/load
+    and /shards/unload; /search with "corpora" scatters over them
+  - POST /chain resolves objects to access chains from the type graph
+    (type_graph.py), e.g. "the selected clip" -> app.project.activeSequence.getSelection()
+
+  python src/07_query_service.py --port 8765
+  curl -s localhost:8765/search -d '{"text": "get selected clips"}'
+  curl -s localhost:8765/search -d '{"text": "playhead", "class_name": "Sequence", "member_type": "method"}'
+  curl -s localhost:8765/search -d '{"text": "open a file", "corpora": ["premiere-pro", "extendscript@2024"]}'
+  curl -s localhost:8765/chain -d '{"text": "the selected clip"}'
+"""
+
+import asyncio
+import contextvars
+import importlib
+import json
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from context_packer import count_tokens, pack_texts_indexed
+from embed_batcher import EmbeddingBatcher
+from id_filters import FILTER_COLUMNS
+from index_bundle import BUNDLE_ROOT
+from shards import ShardSet, list_shards
+from ollama_client import get_client, llama_index_embedding, llama_index_llm
+from tracing import span
+import tracing
+
+qe = importlib.import_module("04_query_engine")
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+KEEP_ALIVE   = -1            # keep models loaded for as long as we run
+HOST         = "127.0.0.1"
+PORT         = 8765
+WORKERS      = 4             # threads for blocking search / LLM calls
+RAG_TOP_K    = 5
+MAX_BODY     = 1 << 20
+WATCH_EVERY  = 5.0           # seconds between checks of BUNDLE_ROOT/current
+
+RAG_PROMPT = """Use the following Premiere Pro API documentation to answer the question.
+If you don't know the answer, just say you don't know.
+----------------
+CONTEXT:
+{context}
+
+QUESTION:
+{question}"""
+
+# -----------------------------------------------------------
+# 1. Resident resources (one "generation" per load / reload)
+# -----------------------------------------------------------
+def preload_models():
+    """Load the planner and embedding models into Ollama and pin them."""
+    client = get_client()
+    client.keep_alive = KEEP_ALIVE
+    for model, embedding in ((qe.LLM_MODEL, False), (qe.EMBED_MODEL, True)):
+        try:
+            client.pin(model, embedding=embedding)
+        except Exception as e:
+            print(f"Warning: could not preload {model}: {e}")
+
+
+def published_bundle():
+    """Resolved path of the live bundle, or None before the first publish."""
+    current = BUNDLE_ROOT / "current"
+    return os.path.realpath(current) if current.exists() else None
+
+
+class Generation:
+    """Everything a request needs, loaded once and shared by all requests."""
+
+    def __init__(self, number: int, shard_keys=()):
+        self.number = number
+        self.loaded_at = time.time()
+        self.in_flight = 0
+        self.retired = False
+        self.searcher = self.shards = None
+        self.bundle_path = published_bundle()
+        self.embedder = EmbeddingBatcher.for_llama_index(
+            llama_index_embedding(qe.EMBED_MODEL, keep_alive=KEEP_ALIVE)
+        )
+        try:
+            if self.bundle_path:
+                self.searcher = qe.DocSearcher.from_bundle(self.bundle_path, emb=self.embedder)
+            else:
+                self.searcher = qe.DocSearcher(emb=self.embedder)
+            self.searcher.symbols          # build/load the symbol / filter / graph indexes before serving
+            self.searcher.filters
+            self.searcher.graph
+            self.llm = llama_index_llm(qe.LLM_MODEL, request_timeout=12000, keep_alive=KEEP_ALIVE)
+            # corpus shards are opened on demand; a reload reopens the ones that were loaded,
+            # except those that are gone or no longer match the embedding model
+            self.shards = ShardSet(self.embedder, embed_model=qe.EMBED_MODEL)
+            for corpus, version in shard_keys:
+                try:
+                    self.shards.load(corpus, version)
+                except (KeyError, OSError, ValueError) as e:
+                    print(f"Warning: not reloading shard {corpus}@{version}: {e}")
+        except BaseException:
+            self.close()                   # a failed load must not leak the batcher thread / shard pool
+            raise
+
+    def close(self):
+        for resource in (self.searcher, self.shards, self.embedder):
+            if resource is not None:
+                resource.close()
+
+
+class ServiceState:
+    def __init__(self):
+        self.current = None
+        self.failed_bundle = None      # last bundle path whose load failed, not retried
+        self._reload_lock = asyncio.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=WORKERS)
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()        # keep the request's trace on the worker
+        return await loop.run_in_executor(self.pool, lambda: ctx.run(fn, *args, **kwargs))
+
+    async def load(self):
+        """Build the next generation off the event loop, then swap it in.
+        The previous one is closed once its last in-flight request ends."""
+        async with self._reload_lock:
+            number = self.current.number + 1 if self.current else 1
+            await self.run(preload_models)
+            keys = [(s["corpus"], s["version"]) for s in self.current.shards.loaded()] \
+                if self.current else []
+            new = await self.run(Generation, number, keys)
+            old, self.current = self.current, new
+            if old is not None:
+                old.retired = True
+                if old.in_flight == 0:
+                    await self.run(old.close)      # joins the batcher thread: not on the loop
+            print(f"✅ Generation {number} ready ({new.bundle_path or 'FAISS + SQLite'})")
+            return new
+
+    async def watch_bundle(self):
+        """Hot-swap to a newly promoted bundle; in-flight requests finish
+        on the generation they started with."""
+        while True:
+            await asyncio.sleep(WATCH_EVERY)
+            latest = published_bundle()
+            if latest and latest not in (self.current.bundle_path, self.failed_bundle):
+                print(f"🔄 New index bundle {latest}, reloading")
+                try:
+                    await self.load()
+                    self.failed_bundle = None
+                except Exception as e:
+                    # wait for the next publish instead of rebuilding a broken generation every tick
+                    self.failed_bundle = latest
+                    print(f"Warning: reload failed, keeping generation {self.current.number}: {e}")
+
+    @asynccontextmanager
+    async def acquire(self):
+        gen = self.current
+        gen.in_flight += 1
+        try:
+            yield gen
+        finally:
+            gen.in_flight -= 1
+            if gen.retired and gen.in_flight == 0:
+                await self.run(gen.close)
+
+# -----------------------------------------------------------
+# 2. Endpoints
+# -----------------------------------------------------------
+def rag_answer(gen: Generation, question: str, top_k: int = RAG_TOP_K) -> dict:
+    hits = gen.searcher.relevant_apis(question, max_k=top_k)
+    packed = pack_texts_indexed(question, [
+        f"{h['full_signature']}\n{h['description']}\n{h['details']}" for h in hits
+    ])
+    context = "\n\n".join(text for _, text in packed)
+    prompt = RAG_PROMPT.format(context=context, question=question)
+    with span("answer", prompt_tokens=count_tokens(prompt)):
+        answer = gen.llm.complete(prompt).text.strip()
+    # only what the packer kept: dropped duplicates / over-budget hits were not in the prompt
+    return {"answer": answer, "sources": [hits[i]["full_signature"] for i, _ in packed]}
+
+
+async def handle(state: ServiceState, method: str, path: str, body: dict):
+    if method == "GET" and path == "/health":
+        gen = state.current
+        return 200, {"status": "ok", "generation": gen.number, "bundle": gen.bundle_path,
+                     "loaded_at": gen.loaded_at, "in_flight": gen.in_flight}
+    if method == "GET" and path == "/metrics":
+        return 200, {"embedder": state.current.embedder.metrics(), "spans": tracing.metrics()}
+    if method == "GET" and path == "/shards":
+        return 200, {"loaded": state.current.shards.loaded(),
+                     "available": [f"{c}@{v}" for c, v in list_shards()]}
+    if method == "POST" and path == "/reload":
+        gen = await state.load()
+        return 200, {"generation": gen.number}
+    if method != "POST":
+        return 404, {"error": f"unknown endpoint {method} {path}"}
+
+    async with state.acquire() as gen:
+        if path == "/shards/load":
+            key, _ = await state.run(gen.shards.load, body["corpus"], body.get("version"))
+            return 200, {"loaded": list(key)}
+        if path == "/shards/unload":
+            return 200, {"unloaded": gen.shards.unload(body["corpus"], body.get("version"))}
+        if path == "/plan":
+            return 200, {"plan": await state.run(qe.decompose_query, body["query"], llm=gen.llm)}
+        if path == "/search":
+            if body.get("corpora"):
+                return 200, {"results": await state.run(gen.shards.search, body["text"],
+                                                        body.get("k", 5), body["corpora"])}
+            filters = {k: body[k] for k in FILTER_COLUMNS if body.get(k)}
+            return 200, {"results": await state.run(gen.searcher.search, body["text"], **filters)}
+        if path == "/chain":
+            if body.get("class_name"):
+                return 200, {"chain": gen.searcher.graph.chain_to(body["class_name"])}
+            return 200, {"chains": gen.searcher.access_chains(body["text"], body.get("k", 3))}
+        if path == "/plan_and_pick":
+            if body.get("stream"):
+                plan = await state.run(qe.plan_and_pick_stream, body["query"],
+                                       speculative=body.get("speculative", False),
+                                       searcher=gen.searcher, llm=gen.llm)
+            else:
+                plan = await state.run(qe.plan_and_pick, body["query"],
+                                       searcher=gen.searcher, llm=gen.llm)
+            return 200, {"plan": plan}
+        if path == "/rag":
+            return 200, await state.run(rag_answer, gen, body["query"], body.get("top_k", RAG_TOP_K))
+    return 404, {"error": f"unknown endpoint {method} {path}"}
+
+# -----------------------------------------------------------
+# 3. Minimal HTTP/1.1 loop (keep-alive, JSON in / JSON out)
+# -----------------------------------------------------------
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+async def write_response(writer, status: int, payload, keep_alive: bool = True):
+    data = json.dumps(payload, default=str).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        + data
+    )
+    await writer.drain()
+
+async def serve_connection(state: ServiceState, reader, writer):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, path, _ = request_line.split(" ", 2)
+            except ValueError:
+                await write_response(writer, 400, {"error": f"malformed request line {request_line!r}"},
+                                     keep_alive=False)
+                break
+            headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    k, v = line.split(":", 1)
+                    headers[k.strip().lower()] = v.strip()
+            # a body we do not read would be parsed as the next request: close instead
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                await write_response(writer, 400, {"error": "invalid Content-Length"}, keep_alive=False)
+                break
+            if length > MAX_BODY:
+                await write_response(writer, 413, {"error": f"body over {MAX_BODY} bytes"}, keep_alive=False)
+                break
+            raw = await reader.readexactly(length) if length else b""
+
+            try:
+                body = json.loads(raw) if raw else {}
+                with span("request", method=method, path=path.split("?", 1)[0]) as s:
+                    status, payload = await handle(state, method, path.split("?", 1)[0], body)
+                    s["status"] = status
+            except (json.JSONDecodeError, KeyError) as e:
+                status, payload = 400, {"error": f"bad request: {e}"}
+            except Exception as e:
+                status, payload = 500, {"error": str(e)}
+
+            keep_alive = headers.get("connection", "").lower() != "close"
+            await write_response(writer, status, payload, keep_alive)
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def main(host=HOST, port=PORT, socket_path=None):
+    state = ServiceState()
+    print("📦 Loading models, FAISS index and SQLite...")
+    await state.load()
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(state.load()))
+    except (AttributeError, NotImplementedError):
+        pass  # no SIGHUP on this platform; POST /reload still works
+
+    watcher = asyncio.ensure_future(state.watch_bundle())
+
+    handler = lambda r, w: serve_connection(state, r, w)
+    if socket_path:
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+        print(f"🚀 Listening on unix:{socket_path}")
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        print(f"🚀 Listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+# -----------------------------------------------------------
+# 4. CLI
+# -----------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--socket", help="Serve on a Unix socket instead of TCP")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
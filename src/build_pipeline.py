@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+build_pipeline.py  ––  scrape → parse → embed as a cached DAG
+
+    python src/build_pipeline.py                 # everything that is out of date
+    python src/build_pipeline.py embed           # one stage (+ what it needs)
+    python src/build_pipeline.py --dry-run       # show what would run and why
+    python src/build_pipeline.py embed --force embed
+
+  - every stage declares its script, input globs and outputs; a stage
+    that reads another stage's outputs runs after it, everything else
+    runs in parallel (--jobs)
+  - fingerprint = input file contents + the script and every src/ module
+    it imports + its CONFIG constants + the Ollama model digest
+  - a stage is skipped when its fingerprint matches the last successful
+    run and its outputs still exist, so a no-op rebuild returns at once
+    and a docs change only re-runs the stages that read docs_json/
+  - stage state lives in .build_cache/pipeline.json; file hashes are
+    reused while size + mtime are unchanged
+  - scrape / parse read from the network: they have no input files and
+    only re-run when their code changes, their outputs go missing, or
+    with --force
+"""
+
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tracing import span
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+ROOT       = Path(__file__).resolve().parents[1]    # scripts use paths relative to the repo root
+CACHE_FILE = ROOT / ".build_cache" / "pipeline.json"
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+JOBS       = 2
+
+@dataclass
+class Stage:
+    name: str
+    script: str                                    # relative to ROOT
+    outputs: list[str]
+    inputs: list[str] = field(default_factory=list)       # globs relative to ROOT
+    args: list[str] = field(default_factory=list)
+    model_setting: str = None                      # CONFIG constant naming the Ollama model
+
+STAGES = [
+    Stage("scrape", "app/01_scrape_docs.py", outputs=["docs_txt"]),
+    Stage("parse", "src/02_parse_structure.py",
+          outputs=["data/processed/ppro_grouped.json", "data/processed/ppro_grouped.jsonl.gz"]),
+    Stage("embed", "src/03_build_embeddings.py", inputs=["docs_json/*.json"],
+          outputs=["embeddings/premiere_docs.db", "embeddings/faiss_indexes",
+                   "data/processed/processed_chunks.jsonl.gz", "storage/type_graph_store.json"],
+          model_setting="EMBED_MODEL"),
+    Stage("llamaindex", "src/06_llamaindex_exp.py", inputs=["docs_json/*.json"],
+          outputs=["index_storage"], args=["--index"], model_setting="EMBED_MODEL"),
+]
+
+# -----------------------------------------------------------
+# Fingerprints
+# -----------------------------------------------------------
+class FileHashes:
+    """sha256 per file, recomputed only when size or mtime changed."""
+
+    def __init__(self, saved: dict = None):
+        self.saved = saved or {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> str:
+        st = path.stat()
+        key = str(path.relative_to(ROOT))
+        with self._lock:
+            hit = self.saved.get(key)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            return hit[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self._lock:
+            self.saved[key] = [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+def local_imports(script: Path, seen=None) -> list[Path]:
+    """The script plus every src/ module it imports, transitively
+    (including importlib.import_module("04_query_engine") calls)."""
+    seen = seen if seen is not None else {}
+    if script in seen or not script.exists():
+        return list(seen)
+    tree = ast.parse(script.read_text(encoding="utf-8"))
+    seen[script] = True                    # dict: insertion-ordered set
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(a.name.split(".")[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+        elif (isinstance(node, ast.Call) and getattr(node.func, "attr", None) == "import_module"
+              and node.args and isinstance(node.args[0], ast.Constant)):
+            names.add(str(node.args[0].value))
+    for name in sorted(names):
+        local_imports(ROOT / "src" / f"{name}.py", seen)
+    return list(seen)
+
+def config_constants(script: Path) -> dict:
+    """Top-level UPPER_CASE = <literal> assignments (the CONFIG block)."""
+    out = {}
+    for node in ast.parse(script.read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if isinstance(target, ast.Name) and target.id.isupper():
+                try:
+                    out[target.id] = ast.literal_eval(node.value)
+                except ValueError:
+                    out[target.id] = ast.unparse(node.value)     # e.g. Path("docs_json")
+    return out
+
+_digests = {}
+
+def model_digest(model: str) -> str:
+    """Digest of the local Ollama model, so a re-pulled model rebuilds;
+    the bare name when Ollama is not reachable."""
+    if model not in _digests:
+        try:
+            with urllib.request.urlopen(f"{OLLAMA_URL}/api/tags", timeout=2) as r:
+                tags = json.load(r).get("models", [])
+            digest = next((m["digest"] for m in tags
+                           if m["name"] in (model, f"{model}:latest")), "")
+        except (OSError, ValueError):
+            digest = ""
+        _digests[model] = f"{model}@{digest}" if digest else model
+    return _digests[model]
+
+def fingerprint(stage: Stage, hashes: FileHashes) -> dict:
+    """Per-part digests (inputs / code / config / model) for one stage."""
+    script = ROOT / stage.script
+    files = sorted({p for pattern in stage.inputs for p in ROOT.glob(pattern) if p.is_file()})
+    inputs = hashlib.sha256()
+    for p in files:
+        inputs.update(f"{p.relative_to(ROOT)}\0{hashes.get(p)}\n".encode())
+    code = hashlib.sha256()
+    for path in sorted(local_imports(script)):
+        code.update(f"{path.relative_to(ROOT)}\0{hashes.get(path)}\n".encode())
+    config = config_constants(script)
+    parts = {
+        "inputs": inputs.hexdigest()[:16],
+        "code": code.hexdigest()[:16],
+        "config": hashlib.sha256(json.dumps([config, stage.args], sort_keys=True, default=str)
+                                 .encode()).hexdigest()[:16],
+    }
+    if stage.model_setting and config.get(stage.model_setting):
+        parts["model"] = model_digest(config[stage.model_setting])
+    return parts
+
+# -----------------------------------------------------------
+# DAG
+# -----------------------------------------------------------
+def _under(path: str, outputs: list[str]) -> bool:
+    return any(path == o or path.startswith(o.rstrip("/") + "/") for o in outputs)
+
+def dependencies(stages: list[Stage]) -> dict:
+    """{stage: upstream stage names}: a stage depends on every stage
+    whose outputs one of its input globs reads from."""
+    deps = {s.name: set() for s in stages}
+    for s in stages:
+        for other in stages:
+            if other is not s and any(_under(i, other.outputs) for i in s.inputs):
+                deps[s.name].add(other.name)
+    return deps
+
+def select(stages: list[Stage], targets) -> list[Stage]:
+    """The targets plus everything upstream of them, in declared order."""
+    by_name, deps = {s.name: s for s in stages}, dependencies(stages)
+    unknown = set(targets or ()) - set(by_name)
+    if unknown:
+        raise KeyError(f"Unknown stage(s) {sorted(unknown)}; have {sorted(by_name)}")
+    wanted, todo = set(), list(targets or by_name)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(deps[name])
+    return [s for s in stages if s.name in wanted]
+
+# -----------------------------------------------------------
+# Runner
+# -----------------------------------------------------------
+class Pipeline:
+    def __init__(self, stages=STAGES, cache_file: Path = CACHE_FILE, jobs: int = JOBS):
+        self.stages = stages
+        self.cache_file = Path(cache_file)
+        self.jobs = jobs
+        state = json.loads(self.cache_file.read_text()) if self.cache_file.exists() else {}
+        self.done = state.get("stages", {})
+        self.hashes = FileHashes(state.get("files"))
+        self._lock = threading.Lock()
+
+    def save(self):
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_file.with_suffix(".tmp")
+        with self._lock:
+            tmp.write_text(json.dumps({"stages": self.done, "files": self.hashes.saved}, indent=1))
+        os.replace(tmp, self.cache_file)
+
+    def reasons(self, stage: Stage, parts: dict) -> list[str]:
+        """Why the stage has to run; [] = up to date."""
+        last = self.done.get(stage.name)
+        if last is None:
+            return ["never built"]
+        changed = [k for k in parts if last["fingerprint"].get(k) != parts[k]]
+        missing = [o for o in stage.outputs if not (ROOT / o).exists()]
+        return changed + [f"missing {o}" for o in missing]
+
+    def _run_stage(self, stage: Stage, force: bool, dry_run: bool, upstream=()) -> dict:
+        with span("stage", stage=stage.name) as s:
+            parts = fingerprint(stage, self.hashes)
+            why = ["forced"] if force else self.reasons(stage, parts)
+            if dry_run:             # upstream has not really run, so our inputs look unchanged
+                why += [f"upstream {u}" for u in upstream]
+            s["ran"] = bool(why) and not dry_run
+            if not why or dry_run:
+                return {"stage": stage.name, "status": "would run" if why else "skipped",
+                        "reasons": why, "seconds": 0.0}
+            t0 = time.perf_counter()
+            proc = subprocess.run([sys.executable, str(ROOT / stage.script), *stage.args], cwd=ROOT)
+            seconds = time.perf_counter() - t0
+        if proc.returncode != 0:
+            return {"stage": stage.name, "status": "failed", "reasons": why, "seconds": seconds,
+                    "returncode": proc.returncode}
+        with self._lock:
+            self.done[stage.name] = {"fingerprint": parts, "seconds": round(seconds, 3),
+                                     "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self.save()
+        return {"stage": stage.name, "status": "ran", "reasons": why, "seconds": seconds}
+
+    def run(self, targets=None, force=(), dry_run: bool = False) -> list[dict]:
+        """Run the out-of-date stages among targets (and their upstream),
+        independent ones in parallel; returns one report per stage."""
+        stages = select(self.stages, targets)
+        deps = dependencies(stages)
+        force = set(force)
+        reports, pending, running = {}, {s.name: s for s in stages}, {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                progressed = False
+                for name, stage in list(pending.items()):
+                    upstream = [reports.get(d) for d in deps[name]]
+                    if any(r is None for r in upstream):
+                        continue                              # still waiting
+                    del pending[name]
+                    progressed = True
+                    blocked = [r["stage"] for r in upstream if r["status"] == "failed"
+                               or r["status"].startswith("blocked")]
+                    if blocked:
+                        reports[name] = {"stage": name, "status": f"blocked by {', '.join(blocked)}",
+                                         "reasons": [], "seconds": 0.0}
+                        continue
+                    would_run = sorted(d for d in deps[name] if reports[d]["status"] == "would run")
+                    running[pool.submit(self._run_stage, stage, name in force or "*" in force,
+                                        dry_run, would_run)] = name
+                if not running:
+                    if not progressed:
+                        raise ValueError(f"Dependency cycle between {sorted(pending)}")
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    reports[running.pop(f)] = f.result()
+        self.save()
+        return [reports[s.name] for s in stages]
+
+def print_report(reports: list[dict], elapsed: float):
+    icons = {"ran": "✅", "skipped": "⏭️ ", "would run": "🔸", "failed": "❌"}
+    for r in reports:
+        why = f"  ({', '.join(r['reasons'])})" if r["reasons"] else ""
+        print(f"{icons.get(r['status'], '⛔')} {r['stage']:<12} {r['status']:<14} "
+              f"{r['seconds']:8.1f}s{why}")
+    print(f"⏱️  Total: {elapsed:.1f}s")
+
+# -----------------------------------------------------------
+# CLI
+# -----------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("stages", nargs="*", help=f"Targets (default: all of {[s.name for s in STAGES]})")
+    parser.add_argument("--force", nargs="*", metavar="STAGE",
+                        help="Re-run these stages (no names = all selected)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would run")
+    parser.add_argument("--jobs", type=int, default=JOBS, help="Stages run in parallel")
+    args = parser.parse_args()
+
+    force = [] if args.force is None else (args.force or ["*"])
+    t0 = time.perf_counter()
+    reports = Pipeline(jobs=args.jobs).run(args.stages, force=force, dry_run=args.dry_run)
+    print_report(reports, time.perf_counter() - t0)
+    sys.exit(1 if any(r["status"] == "failed" for r in reports) else 0)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+bulk_query.py  ––  offline batch mode: JSONL queries in, NDJSON results out
+
+    python src/bulk_query.py queries.jsonl -o plans.ndjson                 # plan_and_pick
+    python src/bulk_query.py queries.jsonl -o hits.ndjson --mode search -k 10
+    python src/bulk_query.py queries.jsonl -o tools.ndjson --mode tools   # 05 run_pipeline
+
+Input lines are {"id": ..., "query": "..."} objects (id defaults to the
+line number) or bare JSON strings. Every result line carries the id.
+
+  - queries are processed BATCH_SIZE at a time: one embedding call, one
+    index search and one metadata resolve per batch (per stage)
+  - LLM stages (decompose, re-rank, clarify) run on a pool of
+    LLM_CONCURRENCY threads, so Ollama's parallel slots stay busy
+  - results are appended and flushed as soon as a query is done; the
+    output file is the checkpoint, so re-running the same command skips
+    every id already written (a half-written last line is dropped, and
+    queries that failed are tried again)
+  - progress and throughput (queries/s) go to stderr
+
+    from bulk_query import run_bulk
+    for result in run_bulk([{"id": 1, "query": "get selected clips"}], mode="search"):
+        ...
+"""
+
+import contextvars
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from tracing import span
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+BATCH_SIZE      = 32       # queries per embedding / search batch
+LLM_CONCURRENCY = 4        # match Ollama's OLLAMA_NUM_PARALLEL
+PROGRESS_EVERY  = 5.0      # seconds between progress lines
+MODES           = ("plan", "search", "tools")
+
+# -----------------------------------------------------------
+# Input / checkpoint
+# -----------------------------------------------------------
+def read_queries(path) -> Iterator[dict]:
+    """{"id", "query"} per non-blank line."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"query": item}
+            yield {"id": item.get("id", line_no), "query": item.get("query") or item.get("text", "")}
+
+def completed_ids(out_path) -> set:
+    """Ids already in the output file without an "error" (failed queries
+    are retried). A trailing partial line (crash mid-write) is cut off so
+    appending continues on a clean line."""
+    out_path = Path(out_path)
+    if not out_path.exists():
+        return set()
+    with open(out_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    done = set()
+    for line in data[:end].splitlines():
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+        if "id" in result and "error" not in result:
+            done.add(result["id"])
+    return done
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+# -----------------------------------------------------------
+# Stages
+# -----------------------------------------------------------
+class BulkRunner:
+    """Resources for one bulk run (searcher, LLM, 05 session), loaded once
+    for the chosen mode and shared by every batch."""
+
+    def __init__(self, mode: str = "plan", concurrency: int = LLM_CONCURRENCY, k: int = None,
+                 threshold: float = None, searcher=None, llm=None, session=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}; use one of {MODES}")
+        self.mode = mode
+        self.k = k
+        self.threshold = threshold
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.qe = importlib.import_module("04_query_engine") if mode != "tools" else None
+        self.pipeline = importlib.import_module("05_pipeline") if mode == "tools" else None
+        self.searcher, self.llm, self.session = searcher, llm, session
+        self._owns_searcher = searcher is None and self.qe is not None
+        if self._owns_searcher:
+            from index_bundle import BUNDLE_ROOT
+            current = BUNDLE_ROOT / "current"
+            self.searcher = (self.qe.DocSearcher.from_bundle(os.path.realpath(current))
+                             if current.exists() else self.qe.DocSearcher())
+        if mode == "plan" and self.llm is None:
+            self.llm = self.qe.default_llm()
+        if mode == "tools" and self.session is None:
+            self.session = self.pipeline.default_session()
+
+    def _submit(self, fn, *args, **kwargs):
+        # copy the context so worker spans join this trace
+        return self.pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def run_batch(self, batch: list[dict]) -> Iterator[dict]:
+        """Results for one batch, each yielded as soon as it is complete."""
+        with span("bulk_batch", mode=self.mode, batch_size=len(batch)):
+            yield from getattr(self, f"_{self.mode}")(batch)
+
+    # ---------- search: embed + search + resolve, all batched ----------
+    def _search(self, batch):
+        texts = [r["query"] for r in batch]
+        if self.threshold is not None:
+            found = self.searcher.relevant_apis_many(texts, max_k=self.k or self.qe.TOP_K,
+                                                     threshold=self.threshold)
+        else:
+            found = self.searcher.nearest_api_many(texts, k=self.k or self.qe.TOP_K)
+        for rec, hits in zip(batch, found):
+            yield {**rec, "results": hits}
+
+    # ---------- plan: LLM decompose -> batched search -> LLM re-rank ----------
+    def _plan(self, batch):
+        qe, searcher = self.qe, self.searcher
+        plans, pending = {}, []
+        for i, rec in enumerate(batch):
+            plan = qe.symbol_plan(rec["query"], searcher)
+            if plan is not None:
+                yield {**rec, "plan": plan}
+            else:
+                pending.append(i)
+
+        futures = {self._submit(qe.decompose_query, batch[i]["query"], llm=self.llm): i for i in pending}
+        for f in as_completed(futures):
+            i = futures[f]
+            try:
+                plans[i] = f.result()
+            except Exception as e:
+                yield {**batch[i], "error": f"decompose: {e}"}
+
+        steps = [(i, step) for i in sorted(plans) for step in plans[i]]
+        candidates = searcher.relevant_apis_many([step["action"] for _, step in steps],
+                                                 max_k=self.k or qe.TOP_K, threshold=self.threshold)
+        remaining = {i: len(plans[i]) for i in plans}
+        reranks = {}
+        for (i, step), cands in zip(steps, candidates):
+            step["access_chains"] = searcher.access_chains(step["action"])
+            if cands:
+                reranks[self._submit(qe.re_rank_apis, step["action"], cands, llm=self.llm,
+                                     chains=step["access_chains"])] = (i, step)
+            else:
+                step["best_api"] = None
+                remaining[i] -= 1
+        for i in [i for i, n in remaining.items() if n == 0]:
+            yield {**batch[i], "plan": plans[i]}
+        for f in as_completed(reranks):
+            i, step = reranks[f]
+            try:
+                step["best_api"] = f.result()
+            except Exception as e:
+                step["best_api"], step["error"] = None, f"re_rank: {e}"
+            remaining[i] -= 1
+            if remaining[i] == 0:
+                yield {**batch[i], "plan": plans[i]}
+
+    # ---------- tools: 05 batched tool finder -> LLM clarifier ----------
+    def _tools(self, batch):
+        threshold = self.pipeline.SIM_THRESHOLD if self.threshold is None else self.threshold
+        found = self.session.find_relevant_tools_many([r["query"] for r in batch],
+                                                      top_k=self.k or self.pipeline.TOP_K,
+                                                      threshold=threshold)
+        futures = {}
+        for rec, tools in zip(batch, found):
+            if tools:
+                futures[self._submit(self.session.clarify_query, rec["query"], tools)] = (rec, tools)
+            else:
+                yield {**rec, "tools": [], "answer": None}
+        for f in as_completed(futures):
+            rec, tools = futures[f]
+            try:
+                yield {**rec, "tools": tools, "answer": f.result()}
+            except Exception as e:
+                yield {**rec, "tools": tools, "error": f"clarify: {e}"}
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        if self._owns_searcher:
+            self.searcher.close()
+
+def run_bulk(queries: Iterable[dict], mode: str = "plan", batch_size: int = BATCH_SIZE,
+             **runner_kwargs) -> Iterator[dict]:
+    """Results for {"id", "query"} records, in completion order; each
+    carries "seconds" = time spent on its batch so far."""
+    runner = BulkRunner(mode, **runner_kwargs)
+    try:
+        for batch in _batches(queries, batch_size):
+            t0 = time.perf_counter()
+            for result in runner.run_batch(batch):
+                yield {**result, "seconds": round(time.perf_counter() - t0, 3)}
+    finally:
+        runner.close()
+
+# -----------------------------------------------------------
+# CLI
+# -----------------------------------------------------------
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="JSONL with one query per line")
+    parser.add_argument("-o", "--output", required=True, help="NDJSON results (appended; doubles as checkpoint)")
+    parser.add_argument("--mode", choices=MODES, default="plan")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=LLM_CONCURRENCY, help="Parallel LLM calls")
+    parser.add_argument("-k", type=int, help="Candidates per query / step")
+    parser.add_argument("--threshold", type=float, help="Similarity threshold (range search)")
+    parser.add_argument("--metrics", action="store_true", help="Print per-stage latency summary")
+    args = parser.parse_args(argv)
+
+    done = completed_ids(args.output)
+    todo = (q for q in read_queries(args.input) if q["id"] not in done)
+    if done:
+        print(f"⏭️  Resuming: {len(done)} queries already in {args.output}", file=sys.stderr)
+
+    count = errors = 0
+    t0 = last = time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as out:
+        for result in run_bulk(todo, args.mode, args.batch_size, concurrency=args.concurrency,
+                               k=args.k, threshold=args.threshold):
+            out.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            count += 1
+            errors += "error" in result
+            now = time.perf_counter()
+            if now - last >= PROGRESS_EVERY:
+                print(f"📈 {count} done, {count / (now - t0):.1f} q/s", file=sys.stderr)
+                last = now
+
+    elapsed = time.perf_counter() - t0
+    print(f"✅ {count} queries in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.1f} q/s), "
+          f"{errors} errors -> {args.output}", file=sys.stderr)
+    if args.metrics:
+        import tracing
+        print(json.dumps(tracing.metrics(), indent=2), file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
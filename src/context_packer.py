@@ -0,0 +1,186 @@
+"""
+context_packer.py  ––  fit retrieved context into a token budget
+
+  - count tokens with one cached tokenizer (tiktoken, which LlamaIndex
+    already ships; a regex word-piece estimate if it is missing)
+  - drop near-duplicate chunks (word-shingle Jaccard)
+  - trim long prose fields (details) down to the sentences that overlap
+    the query most, keeping their original order; code (example_code) is
+    cut to its leading whole lines, never reflowed
+  - stop adding candidates once the budget is spent
+
+Used by every RAG and re-rank prompt:
+
+    from context_packer import pack_candidates, pack_texts
+    candidates = pack_candidates(action, candidates, budget=RERANK_BUDGET)
+    chunks = pack_texts(question, [n.text for n in nodes], budget=RAG_BUDGET)
+"""
+
+import re
+from functools import lru_cache
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+ENCODING        = "cl100k_base"
+RERANK_BUDGET   = 1500     # tokens for all re-rank candidates together
+RAG_BUDGET      = 2000     # tokens of context in RAG answers
+FIELD_BUDGET    = 200      # per long field of a single candidate
+DUP_THRESHOLD   = 0.85     # shingle Jaccard above which a chunk is a duplicate
+SHINGLE         = 3
+
+LONG_FIELDS = ("details", "example_code")
+CODE_FIELDS = ("example_code",)
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# -----------------------------------------------------------
+# Token counting
+# -----------------------------------------------------------
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """Return an encode(text) -> list callable, loaded once per process."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(ENCODING).encode
+    except Exception:
+        return _WORD.findall
+
+def count_tokens(text: str) -> int:
+    # not memoized: most inputs are one-off prompts, and tiktoken is fast
+    if not text:
+        return 0
+    return len(get_tokenizer()(text))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of text within max_tokens, measured with the same
+    tokenizer as count_tokens (binary search over the prefix length)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip()
+
+# -----------------------------------------------------------
+# Near-duplicate removal
+# -----------------------------------------------------------
+def _shingles(text: str) -> set:
+    words = text.lower().split()
+    if len(words) < SHINGLE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+
+def dedupe(texts: list[str], threshold: float = DUP_THRESHOLD) -> list[int]:
+    """Indices of the texts to keep; later near-duplicates are dropped."""
+    kept, seen = [], []
+    for i, text in enumerate(texts):
+        sh = _shingles(text)
+        if any(len(sh & other) / (len(sh | other) or 1) >= threshold for other in seen):
+            continue
+        kept.append(i)
+        seen.append(sh)
+    return kept
+
+# -----------------------------------------------------------
+# Query-relevant trimming
+# -----------------------------------------------------------
+def trim_to_relevant(text: str, query: str, max_tokens: int) -> str:
+    """Keep the sentences with the most query-term overlap, in original
+    order, until max_tokens is reached."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    terms = {w.lower() for w in _WORD.findall(query) if w.isalnum()}
+    sentences = [s for s in _SENTENCE.split(text) if s.strip()]
+    scored = sorted(
+        range(len(sentences)),
+        key=lambda i: (-len(terms & {w.lower() for w in _WORD.findall(sentences[i])}), i),
+    )
+    keep, used = set(), 0
+    for i in scored:
+        cost = count_tokens(sentences[i])
+        if used + cost > max_tokens:
+            continue
+        keep.add(i)
+        used += cost
+    if not keep:
+        # a single sentence longer than the budget: hard-cut it
+        return truncate_tokens(sentences[scored[0]], max_tokens)
+    return " ".join(sentences[i] for i in sorted(keep))
+
+def trim_code(code: str, max_tokens: int) -> str:
+    """Leading whole lines of code within max_tokens. Lines are never
+    joined or reordered: a `//` comment must not swallow the next line."""
+    if count_tokens(code) <= max_tokens:
+        return code
+    lines, used = [], 0
+    for line in code.splitlines():
+        cost = count_tokens(line + "\n")
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines) if lines else truncate_tokens(code, max_tokens)
+
+# -----------------------------------------------------------
+# Packers
+# -----------------------------------------------------------
+def pack_candidates(query: str, candidates: list[dict], budget: int = RERANK_BUDGET,
+                    fields=LONG_FIELDS, field_budget: int = FIELD_BUDGET) -> list[dict]:
+    """Copies of the API records (best first) trimmed to fit the budget."""
+    keys = [f"{c.get('full_signature', '')}\n{c.get('description', '')}\n{c.get('details', '')}"
+            for c in candidates]
+    packed, used = [], 0
+    for i in dedupe(keys):
+        c = dict(candidates[i])
+        for field in fields:
+            if c.get(field):
+                c[field] = (trim_code(c[field], field_budget) if field in CODE_FIELDS
+                            else trim_to_relevant(c[field], query, field_budget))
+        cost = sum(count_tokens(str(v)) for v in c.values() if isinstance(v, str))
+        if packed and used + cost > budget:
+            break
+        packed.append(c)
+        used += cost
+    return packed
+
+def pack_texts_indexed(query: str, texts: list[str], budget: int = RAG_BUDGET) -> list[tuple[int, str]]:
+    """(index into texts, trimmed text) for every chunk that made it in,
+    so callers can tell which sources the prompt actually contains."""
+    packed, used = [], 0
+    for i in dedupe(texts):
+        remaining = budget - used
+        if remaining <= 0:
+            break
+        text = trim_to_relevant(texts[i], query, remaining)
+        packed.append((i, text))
+        used += count_tokens(text)
+    return packed
+
+def pack_texts(query: str, texts: list[str], budget: int = RAG_BUDGET) -> list[str]:
+    """De-duplicated chunks (best first) trimmed to fit the budget."""
+    return [text for _, text in pack_texts_indexed(query, texts, budget)]
+
+def llama_index_postprocessor(budget: int = RAG_BUDGET):
+    """Node postprocessor applying pack_texts() inside LlamaIndex query engines."""
+    from llama_index.core.postprocessor.types import BaseNodePostprocessor
+    from llama_index.core.schema import NodeWithScore
+
+    class TokenBudgetPostprocessor(BaseNodePostprocessor):
+        def _postprocess_nodes(self, nodes, query_bundle=None):
+            query = query_bundle.query_str if query_bundle else ""
+            texts = [n.node.get_content() for n in nodes]
+            packed = []
+            for i, text in pack_texts_indexed(query, texts, budget):
+                # a copy keeps the node's class, relationships and metadata; only the text changes
+                node = nodes[i].node.model_copy()
+                node.set_content(text)
+                packed.append(NodeWithScore(node=node, score=nodes[i].score))
+            return packed
+
+    return TokenBudgetPostprocessor()
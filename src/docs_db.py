@@ -0,0 +1,190 @@
+"""
+docs_db.py  ––  schema + read/write helpers for premiere_docs.db
+
+Two layouts of the `documents` table:
+
+  legacy  every column as TEXT in one table, json_metadata included
+  slim    (PRAGMA user_version = 2)
+          documents       every column search results and filters read
+                          (DocSearcher's ROW_COLUMNS), as TEXT
+          documents_cold  json_metadata as a compressed BLOB, keyed by doc_id
+
+In the slim layout a search lookup reads only the documents table;
+json_metadata (the raw source JSON, the biggest column) sits in its own
+table, is never read unless asked for, and is decompressed only for the
+rows a query actually returns.
+
+    create_schema(conn, slim=True)
+    insert_documents(conn, rows)                     # rows: dicts
+    rows = rows_by_faiss_id(conn, ROW_COLUMNS, ids)  # {faiss_id: tuple}
+
+Blobs are zstd when `zstandard` is installed, zlib otherwise; short
+texts are stored as-is. A one-byte header records which, so a DB written
+with one codec stays readable without it where possible.
+"""
+
+import threading
+import zlib
+from contextlib import nullcontext
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+SLIM_VERSION   = 2
+ZSTD_LEVEL     = 9
+MIN_COMPRESS   = 64          # bytes; shorter texts are not worth a frame
+SQLITE_MAX_VARS = 900
+
+HOT_COLUMNS = ("doc_id", "class_name", "section_type", "item_name", "member_type",
+               "full_signature", "description", "return_type", "parameters",
+               "details", "example_code")
+COLD_COLUMNS = ("json_metadata",)
+FAISS_COLUMNS = ("faiss_id_main", "faiss_id_description", "faiss_id_details", "faiss_id_example")
+
+_RAW, _ZLIB, _ZSTD = b"\x00", b"\x01", b"\x02"
+
+# -----------------------------------------------------------
+# Codec
+# -----------------------------------------------------------
+_codecs = threading.local()      # zstd (de)compressors are not thread-safe: one pair per thread
+
+def _zstd(kind):
+    codec = getattr(_codecs, kind, None)
+    if codec is None:
+        codec = (zstandard.ZstdCompressor(level=ZSTD_LEVEL) if kind == "compressor"
+                 else zstandard.ZstdDecompressor())
+        setattr(_codecs, kind, codec)
+    return codec
+
+def compress_text(text):
+    if not text:
+        return None
+    data = text.encode("utf-8")
+    if len(data) < MIN_COMPRESS:
+        return _RAW + data
+    if zstandard is not None:
+        return _ZSTD + _zstd("compressor").compress(data)
+    return _ZLIB + zlib.compress(data, 9)
+
+def decompress_text(blob) -> str:
+    if blob is None:
+        return ""
+    if isinstance(blob, str):            # legacy TEXT column
+        return blob
+    blob = bytes(blob)
+    codec, data = blob[:1], blob[1:]
+    if codec == _ZSTD:
+        if zstandard is None:
+            raise ImportError("zstandard is required to read this premiere_docs.db")
+        data = _zstd("decompressor").decompress(data)
+    elif codec == _ZLIB:
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
+
+# -----------------------------------------------------------
+# Schema
+# -----------------------------------------------------------
+def create_schema(conn, slim: bool = True):
+    c = conn.cursor()
+    cold = "" if slim else ",\n                  json_metadata TEXT"
+    c.execute(f'''CREATE TABLE IF NOT EXISTS documents
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  doc_id TEXT UNIQUE,
+                  class_name TEXT,
+                  section_type TEXT,
+                  item_name TEXT,
+                  member_type TEXT,
+                  full_signature TEXT,
+                  description TEXT,
+                  return_type TEXT,
+                  parameters TEXT,
+                  details TEXT,
+                  example_code TEXT,
+                  faiss_id_main INTEGER,
+                  faiss_id_description INTEGER,
+                  faiss_id_details INTEGER,
+                  faiss_id_example INTEGER{cold})''')
+    # search hits are looked up by faiss id
+    c.execute('CREATE INDEX IF NOT EXISTS idx_faiss_main ON documents(faiss_id_main)')
+    if slim:
+        c.execute('''CREATE TABLE IF NOT EXISTS documents_cold
+                     (doc_id TEXT PRIMARY KEY,
+                      json_metadata BLOB) WITHOUT ROWID''')
+        c.execute(f'PRAGMA user_version = {SLIM_VERSION}')
+    conn.commit()
+
+def is_slim(conn) -> bool:
+    return conn.execute("PRAGMA user_version").fetchone()[0] == SLIM_VERSION
+
+def cold_columns(conn) -> tuple:
+    """Columns this DB keeps in documents_cold; () for the legacy layout."""
+    return COLD_COLUMNS if is_slim(conn) else ()
+
+# -----------------------------------------------------------
+# Writes
+# -----------------------------------------------------------
+def insert_documents(conn, rows, slim: bool = None):
+    """INSERT OR REPLACE documents (dicts with HOT/COLD/FAISS keys; missing
+    faiss ids are NULL). Caller commits."""
+    rows = list(rows)
+    slim = is_slim(conn) if slim is None else slim
+    hot = HOT_COLUMNS + FAISS_COLUMNS + (() if slim else COLD_COLUMNS)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO documents ({', '.join(hot)}) VALUES ({', '.join('?' * len(hot))})",
+        [tuple(r.get(col) for col in hot) for r in rows])
+    if slim:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO documents_cold (doc_id, {', '.join(COLD_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' * len(COLD_COLUMNS))})",
+            [(r["doc_id"], *(compress_text(r.get(col)) for col in COLD_COLUMNS)) for r in rows])
+
+# -----------------------------------------------------------
+# Reads
+# -----------------------------------------------------------
+def rows_by_faiss_id(conn, columns, faiss_ids, key: str = "faiss_id_main", lock=None) -> dict:
+    """{faiss_id: tuple(columns)} for the given ids, one query per
+    SQLITE_MAX_VARS ids. Cold columns are decompressed after the query
+    (outside `lock`), only for the rows returned."""
+    faiss_ids = list(dict.fromkeys(int(i) for i in faiss_ids))
+    if not faiss_ids:
+        return {}
+    with lock or nullcontext():
+        cold_cols = cold_columns(conn)
+    select = [f"c.{col}" if col in cold_cols else f"d.{col}" for col in columns]
+    join = " LEFT JOIN documents_cold c ON c.doc_id = d.doc_id" \
+        if any(col in cold_cols for col in columns) else ""
+
+    raw = []
+    for i in range(0, len(faiss_ids), SQLITE_MAX_VARS):
+        chunk = faiss_ids[i:i + SQLITE_MAX_VARS]
+        with lock or nullcontext():
+            raw.extend(conn.execute(
+                f"SELECT d.{key}, {', '.join(select)} FROM documents d{join} "
+                f"WHERE d.{key} IN ({', '.join('?' * len(chunk))})", chunk).fetchall())
+
+    cold = [j for j, col in enumerate(columns) if col in cold_cols]
+    out = {}
+    for fid, *values in raw:
+        for j in cold:
+            values[j] = decompress_text(values[j])
+        out[fid] = tuple(values)
+    return out
+
+def iter_documents(conn, columns, where: str = "1"):
+    """Stream tuples(columns) for every document matching `where`, cold
+    columns decompressed."""
+    cold_cols = cold_columns(conn)
+    select = [f"c.{col}" if col in cold_cols else f"d.{col}" for col in columns]
+    join = " LEFT JOIN documents_cold c ON c.doc_id = d.doc_id" \
+        if any(col in cold_cols for col in columns) else ""
+    cold = [j for j, col in enumerate(columns) if col in cold_cols]
+    for row in conn.execute(f"SELECT {', '.join(select)} FROM documents d{join} WHERE {where}"):
+        row = list(row)
+        for j in cold:
+            row[j] = decompress_text(row[j])
+        yield tuple(row)
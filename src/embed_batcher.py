@@ -0,0 +1,146 @@
+"""
+embed_batcher.py  ––  dynamic micro-batching for embedding calls
+
+Concurrent callers each ask for one embedding; the batcher queues their
+texts and flushes them as a single batched backend call as soon as either
+MAX_BATCH texts are waiting or the oldest one has waited MAX_WAIT_MS.
+
+    batcher = EmbeddingBatcher.for_llama_index(OllamaEmbedding(...))
+    vec = batcher.get_text_embedding("get selected clips")     # blocking
+    fut = batcher.submit("set in point")                        # Future
+
+The batcher exposes get_text_embedding / get_query_embedding (LlamaIndex
+style) and embed_query (LangChain style), so it can be handed to
+DocSearcher or LlamaIndexSplitRetriever in place of the raw model.
+"""
+
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable
+
+from tracing import span
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+MAX_BATCH   = 32
+MAX_WAIT_MS = 5
+
+_STOP = object()
+
+# -----------------------------------------------------------
+# Dispatcher
+# -----------------------------------------------------------
+class EmbeddingBatcher:
+    def __init__(self, embed_batch: Callable[[list[str]], list[list[float]]],
+                 max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        self.embed_batch = embed_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._texts = 0
+        self._errors = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def for_llama_index(cls, embed_model, **kwargs):
+        return cls(embed_model.get_text_embedding_batch, **kwargs)
+
+    @classmethod
+    def for_langchain(cls, embeddings, **kwargs):
+        return cls(embeddings.embed_documents, **kwargs)
+
+    # ---------- caller side ----------
+    def submit(self, text: str) -> Future:
+        fut = Future()
+        with self._lock:
+            # nothing may queue up behind _STOP: the worker would never see it
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher is closed")
+            self._queue.put((text, fut))
+        return fut
+
+    def embed(self, text: str) -> list[float]:
+        return self.submit(text).result()
+
+    get_text_embedding = embed
+    get_query_embedding = embed
+    embed_query = embed
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        futures = [self.submit(t) for t in texts]
+        return [f.result() for f in futures]
+
+    get_text_embedding_batch = embed_many
+    embed_documents = embed_many
+
+    def metrics(self) -> dict:
+        with self._lock:
+            flushes = sum(self._batch_sizes.values())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "flushes": flushes,
+                "texts": self._texts,
+                "errors": self._errors,
+                "mean_batch_size": self._texts / flushes if flushes else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            }
+
+    def close(self):
+        """Finish everything already submitted, then stop the worker."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._worker.join()
+
+    # ---------- worker side ----------
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            texts = [t for t, _ in batch]
+            try:
+                with span("embed_batch", batch_size=len(texts)):
+                    vectors = self.embed_batch(texts)
+                if len(vectors) != len(texts):
+                    raise RuntimeError(f"embedding backend returned {len(vectors)} vectors "
+                                       f"for {len(texts)} texts")
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._texts += len(batch)
+            for (_, fut), vec in zip(batch, vectors):
+                fut.set_result(vec)
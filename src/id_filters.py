@@ -0,0 +1,109 @@
+"""
+id_filters.py  ––  metadata postings for filtered vector search
+
+For each filter column (class_name, section_type, member_type) and
+value, the sorted faiss ids of the matching documents. A filtered search
+turns its filters into one id array and hands it to the index, so only
+those vectors are scored:
+
+    filters = FilterIndex.from_db("embeddings/premiere_docs.db")
+    ids = filters.select(class_name="Sequence", member_type="method")
+    D, I = index.search(vec, 5, params=faiss_params(ids))      # FAISS
+    D, I = bundle.search(vec, 5, ids=ids)                      # index bundle
+
+  - values match case-insensitively; a list means "any of these"
+  - several columns are intersected
+  - saved next to the FAISS indexes as filters.npz at build time
+"""
+
+import numpy as np
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+FILTER_COLUMNS = ("class_name", "section_type", "member_type")
+_SEP = "\t"
+
+# -----------------------------------------------------------
+# Postings
+# -----------------------------------------------------------
+class FilterIndex:
+    def __init__(self, postings: dict):
+        """postings: {(column, lower-cased value): sorted int64 ids}"""
+        self.postings = postings
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: (faiss_id, class_name, section_type, member_type)."""
+        lists = {}
+        for faiss_id, *values in rows:
+            if faiss_id is None:
+                continue
+            for column, value in zip(FILTER_COLUMNS, values):
+                if value:
+                    lists.setdefault((column, value.lower()), []).append(int(faiss_id))
+        return cls({key: np.unique(np.asarray(ids, dtype="int64")) for key, ids in lists.items()})
+
+    @classmethod
+    def from_db(cls, sqlite_db):
+        import sqlite3
+        from docs_db import iter_documents
+        conn = sqlite3.connect(str(sqlite_db))
+        try:
+            return cls.from_rows(iter_documents(conn, ("faiss_id_main",) + FILTER_COLUMNS,
+                                                "d.faiss_id_main IS NOT NULL"))
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        return cls.from_rows(
+            (i, *(r.get(c) for c in FILTER_COLUMNS))
+            for i, r in bundle.rows())
+
+    def save(self, path):
+        keys = sorted(self.postings)
+        arrays = [self.postings[k] for k in keys]
+        offsets = np.cumsum([0] + [len(a) for a in arrays]).astype("int64")
+        np.savez(path,
+                 keys=np.array([f"{c}{_SEP}{v}" for c, v in keys]),
+                 ids=np.concatenate(arrays) if arrays else np.zeros(0, dtype="int64"),
+                 offsets=offsets)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            keys, ids, offsets = data["keys"], data["ids"], data["offsets"]
+            return cls({tuple(str(k).split(_SEP, 1)): ids[offsets[i]:offsets[i + 1]]
+                        for i, k in enumerate(keys)})
+
+    def values(self, column: str) -> list[str]:
+        return sorted(v for c, v in self.postings if c == column)
+
+    def select(self, **filters):
+        """Sorted ids matching every given column, or None when no filter
+        is set (= search everything)."""
+        selected = None
+        for column, wanted in filters.items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"Unknown filter {column!r}; use one of {FILTER_COLUMNS}")
+            if wanted is None:
+                continue
+            wanted = [wanted] if isinstance(wanted, str) else wanted
+            parts = [self.postings.get((column, w.lower())) for w in wanted]
+            parts = [p for p in parts if p is not None]
+            ids = np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype="int64")
+            selected = ids if selected is None else np.intersect1d(selected, ids, assume_unique=True)
+        return selected
+
+# -----------------------------------------------------------
+# FAISS glue
+# -----------------------------------------------------------
+def faiss_params(ids):
+    """SearchParameters restricting a FAISS search to `ids` (hash-set
+    selector; the distance is only computed for members)."""
+    import faiss
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(ids, dtype="int64"))
+    params = faiss.SearchParameters(sel=selector)
+    params.referenced_objects = [selector]      # SWIG does not keep it alive
+    return params
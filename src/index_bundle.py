@@ -0,0 +1,334 @@
+"""
+index_bundle.py  ––  one versioned, mmap-able directory per index build
+
+    embeddings/bundles/
+      current -> generations/20261019-101500.123456-ab12cd   (symlink, swapped atomically)
+      generations/20261019-101500.123456-ab12cd/
+        manifest.json        format version, counts, model fingerprint, checksums
+        vectors.npy          float32 [n, dim], opened with mmap_mode="r"
+        norms.npy            float32 [n], squared L2 norms for flat search
+        rows.jsonl           compact metadata, one JSON object per row
+                             (`null` for a vector without a metadata row)
+        rows.offsets.npy     int64 [n + 1] byte offsets into rows.jsonl
+
+Opening a bundle is a handful of mmaps and one small JSON read; rows are
+decoded only when a search hits them. Publishing a new build is one
+symlink rename, so readers see either the old bundle or the new one.
+
+    path = write_bundle(vectors, rows, embed_model=EMBED_MODEL)
+    publish(path)
+    bundle = open_bundle()                  # follows BUNDLE_ROOT/current
+    dists, ids = bundle.search(query_vec, k=5)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+FORMAT_VERSION = 1
+BUNDLE_ROOT    = Path("embeddings/bundles")
+KEEP_GENERATIONS = 3
+
+ROW_FIELDS = ("doc_id", "class_name", "item_name", "member_type", "full_signature",
+              "description", "parameters", "return_type", "details", "example_code")
+
+# -----------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def generation_id() -> str:
+    """Sortable, unique directory name: builds made within the same second
+    still order by creation time, so pruning never drops the newest."""
+    ns = time.time_ns()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(ns // 1_000_000_000))
+    return f"{stamp}.{ns // 1000 % 1_000_000:06d}-{uuid.uuid4().hex[:6]}"
+
+def model_fingerprint(embed_model_name: str, dim: int, embed_model=None) -> dict:
+    """Identify the embedding space; a probe vector catches silent model swaps."""
+    fp = {"model": embed_model_name, "dim": dim}
+    if embed_model is not None:
+        probe = np.asarray(embed_model.get_text_embedding("index bundle fingerprint probe"),
+                           dtype="float32")
+        fp["probe_sha256"] = hashlib.sha256(np.round(probe, 4).tobytes()).hexdigest()
+    return fp
+
+# -----------------------------------------------------------
+# Write + publish
+# -----------------------------------------------------------
+def write_bundle(vectors, rows, embed_model: str, embed_model_obj=None,
+                 root: Path = BUNDLE_ROOT, extra: dict = None, metric: str = "l2") -> Path:
+    """Write a complete bundle into root/generations/<id> and return its path.
+    metric="cosine": the vectors are already L2-normalized and searched by
+    inner product.
+
+    The bundle is assembled in a hidden staging directory and renamed into
+    place only when every file and the manifest have been written.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    if vectors.ndim != 2 or not len(vectors):
+        raise ValueError(f"Nothing to bundle: expected a non-empty [n, dim] matrix, got shape {vectors.shape}")
+    if len(vectors) != len(rows):
+        raise ValueError(f"{len(vectors)} vectors but {len(rows)} metadata rows")
+
+    generations = Path(root) / "generations"
+    generations.mkdir(parents=True, exist_ok=True)
+    gen_id = generation_id()
+    staging = generations / f".staging-{gen_id}"
+    staging.mkdir()
+
+    np.save(staging / "vectors.npy", vectors)
+    np.save(staging / "norms.npy", (vectors ** 2).sum(axis=1).astype("float32"))
+
+    offsets = [0]
+    with open(staging / "rows.jsonl", "wb") as f:
+        for row in rows:
+            record = None if row is None else {k: row.get(k, "") for k in ROW_FIELDS}
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(staging / "rows.offsets.npy", np.asarray(offsets, dtype="int64"))
+
+    files = {}
+    for name in ("vectors.npy", "norms.npy", "rows.jsonl", "rows.offsets.npy"):
+        path = staging / name
+        with open(path, "rb+") as f:
+            os.fsync(f.fileno())
+        files[name] = {"sha256": _sha256(path), "bytes": path.stat().st_size}
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "generation": gen_id,
+        "created_at": time.time(),
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "metric": metric,
+        "embedding": model_fingerprint(embed_model, int(vectors.shape[1]), embed_model_obj),
+        "files": files,
+        **(extra or {}),
+    }
+    with open(staging / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    _fsync_dir(staging)
+
+    final = generations / gen_id
+    os.rename(staging, final)
+    _fsync_dir(generations)
+    return final
+
+
+def swap_symlink(link: Path, target: Path):
+    """Atomically (re)point `link` at `target` with a single rename.
+
+    A real file or directory already sitting at `link` (a pre blue/green
+    layout) is moved aside once so the rename can replace it next time.
+    """
+    link = Path(link)
+    tmp_link = link.with_name(f".{link.name}-{uuid.uuid4().hex[:6]}")
+    os.symlink(os.path.relpath(target, link.parent), tmp_link)
+    if link.is_dir() and not link.is_symlink():
+        link.rename(link.with_name(f".{link.name}.pre-bluegreen-{int(time.time())}"))
+    os.replace(tmp_link, link)
+    _fsync_dir(link.parent)
+
+
+def ensure_symlink(link: Path, target: Path):
+    """Point `link` at `target` unless it already does. For fixed paths that
+    resolve through a `current` link: created once, never flipped again.
+    A real file or directory at `link` is moved aside first."""
+    link = Path(link)
+    if link.is_symlink() and os.readlink(link) == os.path.relpath(target, link.parent):
+        return
+    if link.exists() and not link.is_symlink():
+        link.rename(link.with_name(f".{link.name}.pre-bluegreen-{int(time.time())}"))
+    swap_symlink(link, target)
+
+
+def prune_generations(directory: Path, keep: int, live: Path = None):
+    """Remove all but the newest `keep` generation dirs (never the live one).
+    Symlinks in `directory` (e.g. a `current` pointer) are not generations."""
+    live = Path(live).resolve() if live else None
+    generations = sorted(p for p in Path(directory).iterdir()
+                         if p.is_dir() and not p.is_symlink() and not p.name.startswith("."))
+    for old in generations[:-keep] if keep else []:
+        if old.resolve() != live:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def publish(bundle_path: Path, root: Path = BUNDLE_ROOT, keep: int = KEEP_GENERATIONS):
+    """Atomically point root/current at bundle_path, then prune old generations.
+
+    Processes that already opened an older bundle keep their mmaps; the
+    files stay readable until they close them, even after pruning.
+    """
+    root = Path(root)
+    swap_symlink(root / "current", bundle_path)
+    prune_generations(root / "generations", keep, live=bundle_path)
+
+# -----------------------------------------------------------
+# Open + search
+# -----------------------------------------------------------
+class IndexBundle:
+    def __init__(self, path: Path):
+        self.path = Path(path).resolve()
+        with open(self.path / "manifest.json", "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported bundle format {self.manifest.get('format_version')} in {self.path}")
+        self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self.norms = np.load(self.path / "norms.npy", mmap_mode="r")
+        self.offsets = np.load(self.path / "rows.offsets.npy", mmap_mode="r")
+        self._rows = np.memmap(self.path / "rows.jsonl", dtype="uint8", mode="r") \
+            if self.offsets[-1] else np.zeros(0, dtype="uint8")
+
+    @property
+    def ntotal(self) -> int:
+        return int(self.manifest["count"])
+
+    @property
+    def generation(self) -> str:
+        return self.manifest["generation"]
+
+    @property
+    def d(self) -> int:
+        return int(self.vectors.shape[1])
+
+    @property
+    def metric(self) -> str:
+        return self.manifest.get("metric", "l2")
+
+    def row(self, i: int):
+        """Metadata of row i, or None for a tombstone (vector without a row)."""
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return json.loads(self._rows[start:end].tobytes())
+
+    def rows(self):
+        """(row id, metadata) for every row that has metadata."""
+        for i in range(self.ntotal):
+            r = self.row(i)
+            if r is not None:
+                yield i, r
+
+    def _distances(self, query, ids=None):
+        """(queries, [n_queries, n_rows] distances, row ids or None); for
+        cosine bundles the distance is the negated inner product."""
+        q = np.asarray(query, dtype="float32").reshape(-1, self.d)
+        vectors, norms = self.vectors, self.norms
+        if ids is not None:
+            ids = np.asarray(ids, dtype="int64")
+            vectors, norms = vectors[ids], norms[ids]
+        if self.metric == "cosine":
+            return q, -(q @ vectors.T), ids
+        return q, norms[None, :] - 2.0 * (q @ vectors.T) + (q ** 2).sum(axis=1, keepdims=True), ids
+
+    def search(self, query, k: int = 5, ids=None):
+        """Exact search over the mmapped vectors; FAISS-style (D, I) output
+        (L2 distances ascending, or inner products descending for cosine
+        bundles). With `ids` (sorted row numbers, e.g. from id_filters) only
+        those rows are read and scored."""
+        q, d, ids = self._distances(query, ids)
+        k = min(k, d.shape[1])
+        if k == 0:
+            return np.zeros((len(q), 0), dtype="float32"), np.zeros((len(q), 0), dtype="int64")
+        top = np.argpartition(d, k - 1, axis=1)[:, :k]
+        part = np.take_along_axis(d, top, axis=1)
+        order = np.argsort(part, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        part = np.take_along_axis(part, order, axis=1)
+        return (-part if self.metric == "cosine" else part), (ids[top] if ids is not None else top)
+
+    def range_search(self, query, radius: float, ids=None):
+        """FAISS-style (lims, D, I): L2 distance < radius, or inner
+        product > radius for cosine bundles."""
+        q, d, ids = self._distances(query, ids)
+        hit = d < (-radius if self.metric == "cosine" else radius)
+        rows, cols = np.nonzero(hit)
+        lims = np.zeros(len(q) + 1, dtype="int64")
+        np.cumsum(hit.sum(axis=1), out=lims[1:])
+        D = d[rows, cols]
+        return lims, (-D if self.metric == "cosine" else D), (ids[cols] if ids is not None else cols)
+
+    def check_model(self, embed_model_name: str, dim: int):
+        fp = self.manifest["embedding"]
+        if fp["model"] != embed_model_name or fp["dim"] != dim:
+            raise ValueError(f"Bundle {self.generation} was built with {fp['model']} ({fp['dim']}d), "
+                             f"not {embed_model_name} ({dim}d)")
+
+    def verify(self) -> bool:
+        """Recompute every checksum in the manifest (slow; not done on open)."""
+        return all(_sha256(self.path / name) == info["sha256"]
+                   for name, info in self.manifest["files"].items())
+
+
+def open_bundle(path: Path = None) -> IndexBundle:
+    """Open a bundle directory, or the published one under BUNDLE_ROOT."""
+    return IndexBundle(path or BUNDLE_ROOT / "current")
+
+# -----------------------------------------------------------
+# CLI: convert an existing 03_build_embeddings.py output
+# -----------------------------------------------------------
+def bundle_from_build(faiss_path, sqlite_db, embed_model: str, root: Path = BUNDLE_ROOT) -> Path:
+    """Package main.index + premiere_docs.db into a bundle (rows keyed by faiss_id_main)."""
+    import faiss
+    import sqlite3
+    from docs_db import iter_documents
+
+    from vector_metric import index_metric, load_threshold
+
+    index = faiss.read_index(str(faiss_path))
+    vectors = index.reconstruct_n(0, index.ntotal)
+    metric = index_metric(index)
+    conn = sqlite3.connect(str(sqlite_db))
+    by_id = {
+        r[0]: dict(zip(ROW_FIELDS, r[1:]))
+        for r in iter_documents(conn, ("faiss_id_main",) + ROW_FIELDS, "d.faiss_id_main IS NOT NULL")
+    }
+    conn.close()
+    rows = [by_id.get(i) for i in range(index.ntotal)]       # None: tombstone, skipped on read
+    return write_bundle(vectors, rows, embed_model=embed_model, root=root, metric=metric,
+                        extra={"threshold": load_threshold(Path(faiss_path).parent, metric)})
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faiss", default="embeddings/faiss_indexes/main.index")
+    parser.add_argument("--db", default="embeddings/premiere_docs.db")
+    parser.add_argument("--model", default="all-minilm")
+    parser.add_argument("--root", default=str(BUNDLE_ROOT))
+    parser.add_argument("--verify", action="store_true", help="Verify checksums of the published bundle")
+    args = parser.parse_args()
+
+    if args.verify:
+        b = open_bundle(Path(args.root) / "current")
+        print(f"{b.generation}: {'ok' if b.verify() else 'CHECKSUM MISMATCH'}")
+    else:
+        path = bundle_from_build(args.faiss, args.db, args.model, Path(args.root))
+        publish(path, Path(args.root))
+        print(f"✅ Published bundle {path}")
@@ -0,0 +1,150 @@
+"""
+mongo_retriever.py  ––  FAISS hits → LlamaIndex docstore nodes (MongoDB or SQLite)
+
+  - one pooled MongoClient per URI for the whole process
+  - all FAISS hits resolved with a single `$in` query, projecting only
+    `text` and `metadata`
+  - a bounded in-process LRU cache in front of the docstore, so hot
+    nodes never leave the process again
+  - make_retriever() follows DOCSTORE_BACKEND: with the default SQLite
+    docstore the nodes are read through sqlite_docstore.SqliteNodeSource
+    (one `IN (...)` query), so retrieval reads what embed_save.py wrote
+
+The Mongo path only needs `client[db][collection].find(filter, projection)`,
+so a local stand-in (mongomock, or a small fake) works in tests.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.documents import Document
+
+from tracing import span
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+MONGO_URI           = "mongodb://127.0.0.1:27017/llama_index"
+DOCSTORE_DB         = "llama_index"
+DOCSTORE_COLLECTION = "docstore"
+MAX_POOL_SIZE       = 20
+NODE_CACHE_SIZE     = 4096
+
+PROJECTION = {"text": 1, "metadata": 1}
+
+# -----------------------------------------------------------
+# Shared client pool
+# -----------------------------------------------------------
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_mongo_client(uri: str = MONGO_URI):
+    """One MongoClient (and so one connection pool) per URI per process."""
+    with _clients_lock:
+        if uri not in _clients:
+            from pymongo import MongoClient
+            _clients[uri] = MongoClient(uri, maxPoolSize=MAX_POOL_SIZE)
+        return _clients[uri]
+
+# -----------------------------------------------------------
+# LRU node cache
+# -----------------------------------------------------------
+class NodeCache:
+    def __init__(self, maxsize: int = NODE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys) -> dict:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: dict):
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+# -----------------------------------------------------------
+# Retriever
+# -----------------------------------------------------------
+class LlamaIndexSplitRetriever:
+    def __init__(self, faiss_index, embeddings, mongo_client=None, k=2,
+                 db=DOCSTORE_DB, collection=DOCSTORE_COLLECTION, cache=None, source=None):
+        # source: anything with find_nodes(ids) -> {id: {"text", "metadata"}}
+        # (sqlite_docstore.SqliteNodeSource); otherwise the Mongo collection
+        self.faiss_index = faiss_index
+        self.embeddings = embeddings
+        self.mongo_client = mongo_client
+        self.source = source
+        self.collection = mongo_client[db][collection] if source is None else None
+        self.k = k
+        self.cache = cache if cache is not None else NodeCache()
+
+    def search_ids(self, query: str) -> tuple[list[int], list[float]]:
+        with span("embed"):
+            query_vector = np.array(self.embeddings.embed_query(query), dtype="float32").reshape(1, -1)
+        with span("faiss_search", k=self.k):
+            D, I = self.faiss_index.search(query_vector, self.k)
+        hits = [(int(i), float(d)) for i, d in zip(I[0], D[0]) if i != -1]
+        return [i for i, _ in hits], [d for _, d in hits]
+
+    def fetch_nodes(self, ids: list[int]) -> dict:
+        """Resolve ids through the cache, then one `$in` query for the rest."""
+        with span("resolve") as s:
+            found = self.cache.get_many(ids)
+            missing = [i for i in dict.fromkeys(ids) if i not in found]
+            s.update(cache_hits=len(found), cache_misses=len(missing))
+            if missing:
+                fetched = self._find(missing)
+                self.cache.put_many(fetched)
+                found.update(fetched)
+        return found
+
+    def _find(self, ids: list[int]) -> dict:
+        if self.source is not None:
+            return self.source.find_nodes(ids)
+        return {
+            row["_id"]: {"text": row.get("text", ""), "metadata": row.get("metadata", {})}
+            for row in self.collection.find({"_id": {"$in": ids}}, PROJECTION)
+        }
+
+    def get_relevant_docs(self, query: str):
+        ids, _ = self.search_ids(query)
+        return self.fetch_docs(ids)
+
+    def fetch_docs(self, ids: list[int]):
+        """Documents for FAISS ids from search_ids(), in the same order."""
+        nodes = self.fetch_nodes(ids)
+        return [
+            Document(page_content=nodes[i]["text"], metadata=nodes[i]["metadata"])
+            for i in ids if i in nodes
+        ]
+
+
+def make_retriever(faiss_index, embeddings, k=2, backend: str = None, uri: str = MONGO_URI,
+                   db=None, collection=DOCSTORE_COLLECTION, docstore_path=None):
+    """Retriever over whichever docstore DOCSTORE_BACKEND selects (Mongo:
+    the live generation's database unless db is given)."""
+    from sqlite_docstore import DOCSTORE_BACKEND, DOCSTORE_PATH, SqliteNodeSource, live_mongo_db
+    backend = backend or DOCSTORE_BACKEND
+    if backend == "mongo":
+        return LlamaIndexSplitRetriever(faiss_index, embeddings, get_mongo_client(uri), k=k,
+                                        db=db or live_mongo_db(), collection=collection)
+    source = SqliteNodeSource(docstore_path or DOCSTORE_PATH)
+    return LlamaIndexSplitRetriever(faiss_index, embeddings, k=k, source=source)
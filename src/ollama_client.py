@@ -0,0 +1,345 @@
+"""
+ollama_client.py  ––  the one way this project talks to the local Ollama
+
+  - one keep-alive connection pool per process (sync + async)
+  - a global concurrency cap (MAX_CONCURRENCY in-flight requests per side)
+  - retry with exponential backoff + full jitter on connect errors / 429 / 5xx;
+    this is the only retry layer: callers must not wrap calls in retry
+    loops of their own (attempts multiply). A caller that needs its own
+    policy builds OllamaClient(retries=0) and retries itself
+  - keep_alive sent with every request so models stay pinned in memory
+  - sync + async generate / chat / embed, with streaming variants
+
+The LlamaIndex and LangChain wrappers keep their own ollama SDK clients;
+the adapters at the bottom swap those for SDK clients that ride on the
+pooled transports here, so every module shares the same connections:
+
+    from ollama_client import get_client, llama_index_llm
+    get_client().chat("llama3.1:8b", [{"role": "user", "content": "hi"}])
+    llm = llama_index_llm("mistral", request_timeout=12000)
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Iterator
+
+import httpx
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+OLLAMA_URL      = os.getenv("OLLAMA_URL", "http://localhost:11434")   # point at a replay stand-in
+KEEP_ALIVE      = 1800        # seconds; numeric works for every wrapper
+MAX_CONCURRENCY = 4          # Ollama's OLLAMA_NUM_PARALLEL is a good value
+MAX_CONNECTIONS = 16
+RETRIES         = 3
+BACKOFF_BASE    = 0.25       # seconds, doubled per attempt
+TIMEOUT         = httpx.Timeout(1200.0, connect=5.0)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def _backoff(attempt: int) -> float:
+    """Full jitter: uniform in [0, base * 2**attempt]."""
+    return random.uniform(0, BACKOFF_BASE * (2 ** attempt))
+
+# -----------------------------------------------------------
+# Transports: pooling + concurrency cap + retry
+# -----------------------------------------------------------
+class _ReleasingStream(httpx.SyncByteStream):
+    """Hold the concurrency slot until the response body is closed."""
+
+    def __init__(self, inner, release):
+        self._inner = inner
+        self._release = release
+
+    def __iter__(self):
+        yield from self._inner
+
+    def close(self):
+        try:
+            self._inner.close()
+        finally:
+            if self._release:
+                self._release()
+                self._release = None
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, inner, release):
+        self._inner = inner
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._inner:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._inner.aclose()
+        finally:
+            if self._release:
+                self._release()
+                self._release = None
+
+
+def _limits():
+    return httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+
+
+class PooledTransport(httpx.BaseTransport):
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, retries=RETRIES, inner=None):
+        # inner: the transport doing the I/O (an httpx.MockTransport in tests)
+        self._inner = inner or httpx.HTTPTransport(limits=_limits())
+        self._sem = threading.BoundedSemaphore(max_concurrency)
+        self.retries = retries
+
+    def handle_request(self, request):
+        self._sem.acquire()
+        try:
+            for attempt in range(self.retries + 1):
+                last = attempt == self.retries
+                try:
+                    response = self._inner.handle_request(request)
+                except (httpx.ConnectError, httpx.RemoteProtocolError):
+                    if last:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES or last:
+                        if response.is_closed:        # body already buffered: nothing to hold
+                            self._sem.release()
+                        else:
+                            response.stream = _ReleasingStream(response.stream, self._sem.release)
+                        return response
+                    response.close()
+                time.sleep(_backoff(attempt))
+        except BaseException:
+            self._sem.release()
+            raise
+
+    def close(self):
+        self._inner.close()
+
+
+class AsyncPooledTransport(httpx.AsyncBaseTransport):
+    """Connection pool and semaphore are bound to an event loop, so each
+    loop gets its own (created on first use): the transport survives
+    several asyncio.run() calls, and the cap applies per loop."""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, retries=RETRIES, inner=None):
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self._shared_inner = inner
+        self._per_loop = weakref.WeakKeyDictionary()      # loop -> (inner, semaphore)
+        self._lock = threading.Lock()
+
+    def _for_loop(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._per_loop.get(loop)
+            if state is None:
+                inner = self._shared_inner or httpx.AsyncHTTPTransport(limits=_limits())
+                state = self._per_loop[loop] = (inner, asyncio.Semaphore(self.max_concurrency))
+            return state
+
+    async def handle_async_request(self, request):
+        inner, sem = self._for_loop()
+        await sem.acquire()
+        try:
+            for attempt in range(self.retries + 1):
+                last = attempt == self.retries
+                try:
+                    response = await inner.handle_async_request(request)
+                except (httpx.ConnectError, httpx.RemoteProtocolError):
+                    if last:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES or last:
+                        if response.is_closed:
+                            sem.release()
+                        else:
+                            response.stream = _AsyncReleasingStream(response.stream, sem.release)
+                        return response
+                    await response.aclose()
+                await asyncio.sleep(_backoff(attempt))
+        except BaseException:
+            sem.release()
+            raise
+
+    async def aclose(self):
+        """Close the current loop's pool; pools of other loops are dropped."""
+        with self._lock:
+            state = self._per_loop.pop(asyncio.get_running_loop(), None)
+            self._per_loop.clear()
+        if state is not None:
+            await state[0].aclose()
+
+    def close(self):
+        # sockets of another loop cannot be awaited from here: drop the pools
+        with self._lock:
+            self._per_loop.clear()
+
+# -----------------------------------------------------------
+# Client
+# -----------------------------------------------------------
+class OllamaClient:
+    def __init__(self, base_url=OLLAMA_URL, keep_alive=KEEP_ALIVE,
+                 max_concurrency=MAX_CONCURRENCY, retries=RETRIES, inner=None, async_inner=None):
+        # retries=0: one attempt per request, for callers with their own retry policy
+        # inner / async_inner: transports doing the I/O under the pools (tests)
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.transport = PooledTransport(max_concurrency, retries, inner=inner)
+        self.async_transport = AsyncPooledTransport(max_concurrency, retries, inner=async_inner)
+        self.http = httpx.Client(base_url=base_url, transport=self.transport, timeout=TIMEOUT)
+        self.ahttp = httpx.AsyncClient(base_url=base_url, transport=self.async_transport,
+                                       timeout=TIMEOUT)
+
+    def _payload(self, model, stream, **fields):
+        fields = {k: v for k, v in fields.items() if v is not None}
+        return {"model": model, "stream": stream, "keep_alive": self.keep_alive, **fields}
+
+    # ---------- sync ----------
+    def _post(self, path, payload) -> dict:
+        r = self.http.post(path, json=payload)
+        r.raise_for_status()
+        return r.json()
+
+    def _stream(self, path, payload) -> Iterator[dict]:
+        with self.http.stream("POST", path, json=payload) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def generate(self, model, prompt, options=None, **kw) -> str:
+        data = self._post("/api/generate", self._payload(model, False, prompt=prompt, options=options, **kw))
+        return data.get("response", "")
+
+    def stream_generate(self, model, prompt, options=None, **kw) -> Iterator[str]:
+        for part in self._stream("/api/generate", self._payload(model, True, prompt=prompt, options=options, **kw)):
+            yield part.get("response", "")
+
+    def chat(self, model, messages, options=None, **kw) -> str:
+        data = self._post("/api/chat", self._payload(model, False, messages=messages, options=options, **kw))
+        return data.get("message", {}).get("content", "")
+
+    def stream_chat(self, model, messages, options=None, **kw) -> Iterator[str]:
+        for part in self._stream("/api/chat", self._payload(model, True, messages=messages, options=options, **kw)):
+            yield part.get("message", {}).get("content", "")
+
+    def embed(self, model, inputs) -> list[list[float]]:
+        payload = {"model": model, "input": inputs, "keep_alive": self.keep_alive}
+        return self._post("/api/embed", payload)["embeddings"]
+
+    def pin(self, model, keep_alive=None, embedding=False):
+        """Load a model into Ollama and keep it resident."""
+        keep_alive = keep_alive if keep_alive is not None else self.keep_alive
+        if embedding:
+            self._post("/api/embed", {"model": model, "input": "", "keep_alive": keep_alive})
+        else:
+            self._post("/api/generate", {"model": model, "keep_alive": keep_alive})
+
+    # ---------- async ----------
+    async def _apost(self, path, payload) -> dict:
+        r = await self.ahttp.post(path, json=payload)
+        r.raise_for_status()
+        return r.json()
+
+    async def _astream(self, path, payload) -> AsyncIterator[dict]:
+        async with self.ahttp.stream("POST", path, json=payload) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if line:
+                    yield json.loads(line)
+
+    async def agenerate(self, model, prompt, options=None, **kw) -> str:
+        data = await self._apost("/api/generate", self._payload(model, False, prompt=prompt, options=options, **kw))
+        return data.get("response", "")
+
+    async def astream_generate(self, model, prompt, options=None, **kw) -> AsyncIterator[str]:
+        async for part in self._astream("/api/generate", self._payload(model, True, prompt=prompt, options=options, **kw)):
+            yield part.get("response", "")
+
+    async def achat(self, model, messages, options=None, **kw) -> str:
+        data = await self._apost("/api/chat", self._payload(model, False, messages=messages, options=options, **kw))
+        return data.get("message", {}).get("content", "")
+
+    async def astream_chat(self, model, messages, options=None, **kw) -> AsyncIterator[str]:
+        async for part in self._astream("/api/chat", self._payload(model, True, messages=messages, options=options, **kw)):
+            yield part.get("message", {}).get("content", "")
+
+    async def aembed(self, model, inputs) -> list[list[float]]:
+        payload = {"model": model, "input": inputs, "keep_alive": self.keep_alive}
+        return (await self._apost("/api/embed", payload))["embeddings"]
+
+    # ---------- ollama SDK clients on the shared pool ----------
+    def sdk_client(self, timeout=TIMEOUT):
+        import ollama
+        return ollama.Client(host=self.base_url, timeout=timeout, transport=self.transport)
+
+    def sdk_async_client(self, timeout=TIMEOUT):
+        import ollama
+        return ollama.AsyncClient(host=self.base_url, timeout=timeout, transport=self.async_transport)
+
+    def close(self):
+        self.http.close()
+        self.async_transport.close()
+
+    async def aclose(self):
+        await self.ahttp.aclose()          # closes this loop's async pool
+        self.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> OllamaClient:
+    """Process-wide shared client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
+
+# -----------------------------------------------------------
+# Adapters for the LlamaIndex / LangChain wrappers
+# -----------------------------------------------------------
+def wrapper_timeout(wrapper) -> httpx.Timeout:
+    """The read timeout the caller gave the wrapper (request_timeout= for
+    LlamaIndex, timeout= for LangChain), else TIMEOUT."""
+    seconds = getattr(wrapper, "request_timeout", None) or getattr(wrapper, "timeout", None)
+    return httpx.Timeout(float(seconds), connect=TIMEOUT.connect) if seconds else TIMEOUT
+
+def attach(wrapper, client: OllamaClient = None):
+    """Point a LlamaIndex or LangChain Ollama wrapper at the shared pool,
+    keeping the wrapper's own timeout."""
+    client = client or get_client()
+    timeout = wrapper_timeout(wrapper)
+    wrapper._client = client.sdk_client(timeout)
+    wrapper._async_client = client.sdk_async_client(timeout)
+    return wrapper
+
+def llama_index_llm(model, **kwargs):
+    from llama_index.llms.ollama import Ollama
+    kwargs.setdefault("keep_alive", get_client().keep_alive)
+    return attach(Ollama(model=model, base_url=get_client().base_url, **kwargs))
+
+def llama_index_embedding(model, **kwargs):
+    from llama_index.embeddings.ollama import OllamaEmbedding
+    kwargs.setdefault("keep_alive", get_client().keep_alive)
+    return attach(OllamaEmbedding(model_name=model, base_url=get_client().base_url, **kwargs))
+
+def langchain_llm(model, **kwargs):
+    from langchain_ollama.llms import OllamaLLM
+    kwargs.setdefault("keep_alive", get_client().keep_alive)
+    return attach(OllamaLLM(model=model, base_url=get_client().base_url, **kwargs))
+
+def langchain_embeddings(model, **kwargs):
+    from langchain_ollama.embeddings import OllamaEmbeddings
+    kwargs.setdefault("keep_alive", get_client().keep_alive)
+    return attach(OllamaEmbeddings(model=model, base_url=get_client().base_url, **kwargs))
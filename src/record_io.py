@@ -0,0 +1,174 @@
+"""
+record_io.py  ––  compact on-disk record files + streaming readers
+
+    with RecordSink("data/processed/processed_chunks", DOCUMENT_SCHEMA) as sink:
+        sink.write(batch)                 # -> .jsonl.gz (+ .parquet with pyarrow)
+
+    for row in iter_records(find_export("data/processed/processed_chunks"),
+                            columns=("doc_id", "description")):
+        ...
+
+  - gzip JSONL is always written (stdlib only), one compact object per line
+  - Parquet is written too when pyarrow is installed, buffered into row
+    groups so memory stays bounded
+  - readers stream row by row and project columns; Parquet reads only the
+    requested columns from disk
+  - files are written under a temp name and renamed when closed
+"""
+
+import gzip
+import json
+import os
+from pathlib import Path
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+ROW_GROUP_ROWS = 10_000
+GZIP_LEVEL     = 6
+
+# Same columns as the `documents` table in 03_build_embeddings.py
+DOCUMENT_SCHEMA = (
+    ("doc_id", "string"), ("class_name", "string"), ("section_type", "string"),
+    ("item_name", "string"), ("member_type", "string"), ("full_signature", "string"),
+    ("description", "string"), ("return_type", "string"), ("parameters", "string"),
+    ("details", "string"), ("example_code", "string"),
+    ("faiss_id_main", "int64"), ("faiss_id_description", "int64"),
+    ("faiss_id_details", "int64"), ("faiss_id_example", "int64"),
+    ("json_metadata", "string"),
+)
+
+# One row per object in 02_parse_structure.py's grouped output
+GROUPED_SCHEMA = (
+    ("section", "string"), ("name", "string"), ("description", "string"),
+    ("type", "string"), ("example", "string"), ("parameters", "string"),
+    ("returns", "string"), ("attributes", "string"), ("methods", "string"),
+    ("details", "string"),
+)
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+# -----------------------------------------------------------
+# Writers
+# -----------------------------------------------------------
+class _JsonlGzWriter:
+    def __init__(self, path: Path, columns):
+        self.path, self.columns = path, columns
+        self._tmp = path.with_name(path.name + ".tmp")
+        self._f = gzip.open(self._tmp, "wt", encoding="utf-8", compresslevel=GZIP_LEVEL)
+
+    def write(self, records):
+        for r in records:
+            row = {c: r.get(c) for c in self.columns}
+            self._f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def close(self, commit=True):
+        self._f.close()
+        if commit:
+            os.replace(self._tmp, self.path)
+        else:
+            self._tmp.unlink(missing_ok=True)
+
+
+class _ParquetWriter:
+    def __init__(self, path: Path, schema, pa):
+        self.path, self.pa = path, pa
+        self.schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in schema])
+        self._tmp = path.with_name(path.name + ".tmp")
+        self._writer = pa.parquet.ParquetWriter(self._tmp, self.schema, compression="zstd")
+        self._buffer = []
+
+    def write(self, records):
+        self._buffer.extend(records)
+        if len(self._buffer) >= ROW_GROUP_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        columns = {name: [r.get(name) for r in self._buffer] for name in self.schema.names}
+        self._writer.write_table(self.pa.table(columns, schema=self.schema))
+        self._buffer = []
+
+    def close(self, commit=True):
+        if commit:
+            self._flush()
+        self._writer.close()
+        if commit:
+            os.replace(self._tmp, self.path)
+        else:
+            self._tmp.unlink(missing_ok=True)
+
+
+class RecordSink:
+    """Write records to <base>.jsonl.gz and, when pyarrow is available
+    (and parquet=True), <base>.parquet. Extra keys are dropped, missing
+    ones written as null."""
+
+    def __init__(self, base, schema, parquet: bool = True):
+        base = Path(base)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        columns = [name for name, _ in schema]
+        self.writers = [_JsonlGzWriter(base.with_name(base.name + ".jsonl.gz"), columns)]
+        pa = _pyarrow() if parquet else None
+        if pa is not None:
+            self.writers.append(_ParquetWriter(base.with_name(base.name + ".parquet"), schema, pa))
+        self.count = 0
+
+    @property
+    def paths(self):
+        return [w.path for w in self.writers]
+
+    def write(self, records):
+        records = list(records)
+        for w in self.writers:
+            w.write(records)
+        self.count += len(records)
+
+    def close(self, commit: bool = True):
+        for w in self.writers:
+            w.close(commit)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+# -----------------------------------------------------------
+# Readers
+# -----------------------------------------------------------
+def find_export(base):
+    """Fastest existing export for a base path (.parquet, then .jsonl.gz, then .jsonl)."""
+    base = Path(base)
+    for suffix in (".parquet", ".jsonl.gz", ".jsonl"):
+        path = base.with_name(base.name + suffix)
+        if path.exists() and (suffix != ".parquet" or _pyarrow() is not None):
+            return path
+    return None
+
+def iter_records(path, columns=None, batch_rows: int = ROW_GROUP_ROWS):
+    """Stream dicts from a .parquet, .jsonl.gz or .jsonl file, keeping only `columns`."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        pa = _pyarrow()
+        if pa is None:
+            raise ImportError(f"pyarrow is required to read {path}")
+        pf = pa.parquet.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=batch_rows, columns=list(columns) if columns else None):
+            yield from batch.to_pylist()
+        return
+
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            yield {c: row.get(c) for c in columns} if columns else row
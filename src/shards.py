@@ -0,0 +1,186 @@
+"""
+shards.py  ––  one index bundle per corpus + version, scatter-gather search
+
+    embeddings/shards/
+      premiere-pro/25.0/current -> ...      (index_bundle layout per shard)
+      extendscript/2024/current -> ...
+
+    shards = ShardSet(emb, embed_model=EMBED_MODEL)
+    shards.load("premiere-pro")                       # latest version
+    hits = shards.search("get selected clips", k=5)   # all loaded shards
+    hits = shards.search("open file", corpora=["extendscript"])   # loads on demand
+    shards.unload("extendscript")
+
+  - the query is embedded once; every selected shard is searched on its
+    own thread (the numpy scoring releases the GIL) and the per-shard
+    sorted hit lists are merged with a heap
+  - shards are mmapped bundles, so a loaded shard costs address space,
+    not RAM, and unloading just drops the mapping
+  - all shards in a set must share one embedding model, otherwise their
+    scores are not comparable; load() refuses a shard whose model name or
+    dimension differs from the embedder's (probed once). Hits are merged
+    on similarity, so cosine and legacy L2 shards can be mixed
+"""
+
+import contextvars
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+from index_bundle import open_bundle, publish, swap_symlink
+from tracing import span
+from vector_metric import COSINE, normalize, similarity
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+SHARD_ROOT  = Path("embeddings/shards")
+MAX_WORKERS = 4
+DIM_PROBE   = "shard dimension probe"
+
+# -----------------------------------------------------------
+# Layout
+# -----------------------------------------------------------
+def shard_root(corpus: str, version: str, root: Path = SHARD_ROOT) -> Path:
+    return Path(root) / corpus / version
+
+def list_shards(root: Path = SHARD_ROOT) -> list[tuple[str, str]]:
+    """(corpus, version) for every published shard."""
+    root = Path(root)
+    if not root.exists():
+        return []
+    return sorted((c.name, v.name) for c in root.iterdir() if c.is_dir()
+                  for v in c.iterdir() if (v / "current").exists())
+
+def latest_version(corpus: str, root: Path = SHARD_ROOT) -> str:
+    versions = [v for c, v in list_shards(root) if c == corpus]
+    if not versions:
+        raise KeyError(f"No published shard for corpus {corpus!r} under {root}")
+    return max(versions, key=_version_key)
+
+def _version_key(version: str):
+    return tuple((0, int(p)) if p.isdigit() else (1, p) for p in version.replace("-", ".").split("."))
+
+def publish_shard(bundle_path, corpus: str, version: str, root: Path = SHARD_ROOT):
+    """Publish a bundle written under shard_root(corpus, version)."""
+    publish(bundle_path, shard_root(corpus, version, root))
+
+def link_shard(bundle_path, corpus: str, version: str, root: Path = SHARD_ROOT):
+    """Expose a bundle published elsewhere (e.g. BUNDLE_ROOT) as a shard."""
+    target = shard_root(corpus, version, root)
+    target.mkdir(parents=True, exist_ok=True)
+    swap_symlink(target / "current", Path(bundle_path))
+
+# -----------------------------------------------------------
+# Scatter-gather
+# -----------------------------------------------------------
+class ShardSet:
+    def __init__(self, emb, embed_model: str = None, root: Path = SHARD_ROOT,
+                 workers: int = MAX_WORKERS, dim: int = None):
+        # emb: anything with get_text_embedding(), e.g. an EmbeddingBatcher
+        self.emb = emb
+        self.embed_model = embed_model
+        self._dim = dim                        # embedder output size, probed on first load
+        self.root = Path(root)
+        self.shards = {}                       # (corpus, version) -> IndexBundle
+        self._lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def load(self, corpus: str, version: str = None):
+        """Open a shard (latest version by default) unless already loaded;
+        returns ((corpus, version), bundle)."""
+        version = version or latest_version(corpus, self.root)
+        key = (corpus, version)
+        with self._lock:
+            if key in self.shards:
+                return key, self.shards[key]
+        bundle = open_bundle(shard_root(corpus, version, self.root) / "current")
+        if self.embed_model:
+            bundle.check_model(self.embed_model, self.dim)
+        with self._lock:
+            return key, self.shards.setdefault(key, bundle)
+
+    @property
+    def dim(self) -> int:
+        if self._dim is None:
+            self._dim = len(self.emb.get_text_embedding(DIM_PROBE))
+        return self._dim
+
+    def unload(self, corpus: str, version: str = None) -> list[tuple[str, str]]:
+        with self._lock:
+            keys = [k for k in self.shards if k[0] == corpus and version in (None, k[1])]
+            for k in keys:
+                del self.shards[k]         # in-flight searches keep their reference
+        return keys
+
+    def loaded(self) -> list[dict]:
+        with self._lock:
+            return [{"corpus": c, "version": v, "generation": b.generation, "count": b.ntotal}
+                    for (c, v), b in sorted(self.shards.items())]
+
+    def _select(self, corpora):
+        if corpora is None:
+            with self._lock:
+                return list(self.shards.items())
+        selected = []
+        for name in corpora:
+            corpus, _, version = name.partition("@")        # "extendscript@2024"
+            selected.append(self.load(corpus, version or None))
+        return selected
+
+    @staticmethod
+    def _search_shard(key, bundle, vec, k):
+        """[(-similarity, key, row)] best first, ready for heapq.merge."""
+        with span("shard_search", corpus=key[0], version=key[1]):
+            D, I = bundle.search(normalize(vec) if bundle.metric == COSINE else vec, k)
+        sims = similarity(D[0], bundle.metric)
+        return [(-float(s), key, int(i)) for s, i in zip(sims, I[0]) if i != -1]
+
+    def search(self, text: str, k: int = 5, corpora=None) -> list[dict]:
+        """Top-k over the selected shards (default: all loaded), nearest first."""
+        selected = self._select(corpora)
+        if not selected:
+            return []
+        with span("embed"):
+            vec = np.asarray(self.emb.get_text_embedding(text), dtype="float32").reshape(1, -1)
+        futures = [self.pool.submit(contextvars.copy_context().run,
+                                    self._search_shard, key, bundle, vec, k)
+                   for key, bundle in selected]
+        with span("shard_merge", shards=len(futures)):
+            best = list(islice(heapq.merge(*(f.result() for f in futures)), k))
+        bundles = dict(selected)
+        rows = [(bundles[key].row(i), key, -neg_sim) for neg_sim, key, i in best]
+        return [{**row, "corpus": key[0], "version": key[1], "similarity": sim}
+                for row, key, sim in rows if row is not None]
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+        with self._lock:
+            self.shards.clear()
+
+# -----------------------------------------------------------
+# CLI: register a build as a shard / list shards
+# -----------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    from index_bundle import bundle_from_build
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus")
+    parser.add_argument("--version")
+    parser.add_argument("--faiss", default="embeddings/faiss_indexes/main.index")
+    parser.add_argument("--db", default="embeddings/premiere_docs.db")
+    parser.add_argument("--model", default="all-minilm")
+    parser.add_argument("--root", default=str(SHARD_ROOT))
+    args = parser.parse_args()
+
+    if args.corpus and args.version:
+        root = shard_root(args.corpus, args.version, Path(args.root))
+        path = bundle_from_build(args.faiss, args.db, args.model, root)
+        publish_shard(path, args.corpus, args.version, Path(args.root))
+        print(f"✅ Published shard {args.corpus}@{args.version}: {path}")
+    for corpus, version in list_shards(Path(args.root)):
+        print(f"  {corpus}@{version}")
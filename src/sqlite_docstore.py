@@ -0,0 +1,314 @@
+"""
+sqlite_docstore.py  ––  embedded docstore / index store for LlamaIndex
+
+Drop-in replacement for MongoDocumentStore / MongoIndexStore on a single
+host: node text and index structs live in one SQLite file next to the
+FAISS index, so there is no external service and no network round trip.
+
+    docstore, index_store = make_stores()          # DOCSTORE_BACKEND=sqlite
+    storage_context = StorageContext.from_defaults(
+        docstore=docstore, index_store=index_store, vector_store=vector_store)
+
+  - batched put (one transaction, executemany) and get (`IN (...)`)
+  - WAL + mmap for fast cold open and concurrent readers
+  - DOCSTORE_BACKEND=mongo keeps the old MongoDB stores
+  - SqliteNodeSource resolves FAISS ids to node text for the LangChain
+    retrievers (mongo_retriever.LlamaIndexSplitRetriever) without
+    loading the index
+  - rebuilds go into a new generation and are promoted in one step:
+
+    embeddings/docstores/
+      current -> 20261019-101500.123456-ab12cd     (the one symlink a promotion flips)
+      20261019-101500.123456-ab12cd/
+        docstore.db        SQLite backend: docstore + index store
+        mongo_db           Mongo backend: name of this generation's database
+        faiss.index        anything else the build keeps in sync (embed_save.py)
+    embeddings/docstore.db -> docstores/current/docstore.db
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+from llama_index.core.storage.docstore.utils import json_to_doc
+from llama_index.core.storage.index_store.keyval_index_store import KVIndexStore
+from llama_index.core.storage.kvstore.types import DEFAULT_BATCH_SIZE, DEFAULT_COLLECTION, BaseKVStore
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+DOCSTORE_BACKEND = os.getenv("DOCSTORE_BACKEND", "sqlite")   # "sqlite" | "mongo"
+DOCSTORE_PATH    = Path("embeddings/docstore.db")     # -> docstores/current/docstore.db
+DOCSTORE_GENERATIONS = Path("embeddings/docstores")
+DOCSTORE_FILE    = "docstore.db"
+MONGO_DB_FILE    = "mongo_db"
+KEEP_DOCSTORES   = 3
+MONGO_URI        = "mongodb://127.0.0.1:27017/llama_index"
+MONGO_DB         = "llama_index"       # pre-generation layout; generations use MONGO_DB_<id>
+MMAP_SIZE        = 1 << 30
+SQLITE_MAX_VARS  = 900          # stay under SQLite's bound-parameter limit
+
+# -----------------------------------------------------------
+# Key-value store
+# -----------------------------------------------------------
+class SqliteKVStore(BaseKVStore):
+    def __init__(self, path=DOCSTORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS kv
+                              (collection TEXT NOT NULL,
+                               key TEXT NOT NULL,
+                               value TEXT NOT NULL,
+                               PRIMARY KEY (collection, key)) WITHOUT ROWID''')
+        self._conn.commit()
+
+    # ---------- writes ----------
+    def put(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put_all([(key, val)], collection=collection)
+
+    def put_all(self, kv_pairs: List[Tuple[str, dict]], collection: str = DEFAULT_COLLECTION,
+                batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        """One transaction; one executemany per batch_size pairs (like
+        insert_many batches on Mongo), so only a batch is serialized at once."""
+        kv_pairs = list(kv_pairs)
+        batch_size = max(1, batch_size or len(kv_pairs))
+        with self._lock, self._conn:
+            for i in range(0, len(kv_pairs), batch_size):
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO kv (collection, key, value) VALUES (?, ?, ?)",
+                    [(collection, k, json.dumps(v)) for k, v in kv_pairs[i:i + batch_size]],
+                )
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        with self._lock, self._conn:
+            cur = self._conn.execute("DELETE FROM kv WHERE collection = ? AND key = ?", (collection, key))
+        return cur.rowcount > 0
+
+    # ---------- reads ----------
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE collection = ? AND key = ?", (collection, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, keys: List[str], collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        out = {}
+        keys = list(dict.fromkeys(keys))
+        for i in range(0, len(keys), SQLITE_MAX_VARS):
+            chunk = keys[i:i + SQLITE_MAX_VARS]
+            marks = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM kv WHERE collection = ? AND key IN ({marks})",
+                    (collection, *chunk),
+                ).fetchall()
+            out.update((k, json.loads(v)) for k, v in rows)
+        return out
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM kv WHERE collection = ?", (collection,)
+            ).fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    # ---------- async (SQLite calls are local and short) ----------
+    async def aput(self, key, val, collection=DEFAULT_COLLECTION):
+        self.put(key, val, collection)
+
+    async def aput_all(self, kv_pairs, collection=DEFAULT_COLLECTION, batch_size=DEFAULT_BATCH_SIZE):
+        self.put_all(kv_pairs, collection, batch_size)
+
+    async def aget(self, key, collection=DEFAULT_COLLECTION):
+        return self.get(key, collection)
+
+    async def aget_all(self, collection=DEFAULT_COLLECTION):
+        return self.get_all(collection)
+
+    async def adelete(self, key, collection=DEFAULT_COLLECTION):
+        return self.delete(key, collection)
+
+    def close(self):
+        self._conn.close()
+
+# -----------------------------------------------------------
+# FAISS id -> node lookup (for LlamaIndexSplitRetriever)
+# -----------------------------------------------------------
+def _data(value):
+    """The "__data__" payload of a stored node / index struct (a JSON
+    string in older LlamaIndex versions, a dict in newer ones)."""
+    data = value.get("__data__", value)
+    return json.loads(data) if isinstance(data, str) else data
+
+
+class SqliteNodeSource:
+    """FAISS id -> {"text", "metadata"} from a SQLite docstore, the way
+    LlamaIndex links them: the vector index struct maps each FAISS id to
+    a node id (nodes_dict), the docstore holds the node."""
+
+    def __init__(self, path=DOCSTORE_PATH, docstore_namespace: str = "docstore",
+                 index_namespace: str = "index_store"):
+        self.kvstore = SqliteKVStore(path)
+        self.node_collection = f"{docstore_namespace}/data"
+        self.index_collection = f"{index_namespace}/data"
+        self._node_ids = None
+        self._lock = threading.Lock()
+
+    @property
+    def node_ids(self) -> Dict[int, str]:
+        with self._lock:
+            if self._node_ids is None:
+                self._node_ids = {}
+                for struct in self.kvstore.get_all(self.index_collection).values():
+                    for vector_id, node_id in _data(struct).get("nodes_dict", {}).items():
+                        self._node_ids[int(vector_id)] = node_id
+            return self._node_ids
+
+    def find_nodes(self, ids: List[int]) -> Dict[int, dict]:
+        """One `IN (...)` docstore read for all ids; unknown ids are left out."""
+        wanted = {i: self.node_ids[i] for i in ids if i in self.node_ids}
+        found = self.kvstore.get_many(list(wanted.values()), collection=self.node_collection)
+        out = {}
+        for i, node_id in wanted.items():
+            if node_id in found:
+                node = _data(found[node_id])
+                out[i] = {"text": node.get("text", ""), "metadata": node.get("metadata", {})}
+        return out
+
+    def close(self):
+        self.kvstore.close()
+
+# -----------------------------------------------------------
+# LlamaIndex stores
+# -----------------------------------------------------------
+class SqliteDocumentStore(KVDocumentStore):
+    @classmethod
+    def from_path(cls, path=DOCSTORE_PATH, namespace: Optional[str] = None):
+        return cls(SqliteKVStore(path), namespace=namespace)
+
+    def get_nodes(self, node_ids: List[str], raise_error: bool = True):
+        """One `IN (...)` query instead of one lookup per node."""
+        found = self._kvstore.get_many(node_ids, collection=self._node_collection)
+        nodes = []
+        for node_id in node_ids:
+            if node_id not in found:
+                if raise_error:
+                    raise ValueError(f"node_id {node_id} not found.")
+                continue
+            nodes.append(json_to_doc(found[node_id]))
+        return nodes
+
+
+class SqliteIndexStore(KVIndexStore):
+    @classmethod
+    def from_path(cls, path=DOCSTORE_PATH, namespace: Optional[str] = None):
+        return cls(SqliteKVStore(path), namespace=namespace)
+
+
+def make_stores(backend: str = DOCSTORE_BACKEND, path=DOCSTORE_PATH, db_name: str = None):
+    """(docstore, index_store) for the configured backend (Mongo: the live
+    generation's database unless db_name is given)."""
+    if backend == "mongo":
+        db_name = db_name or live_mongo_db()
+        from llama_index.storage.docstore.mongodb import MongoDocumentStore
+        from llama_index.storage.index_store.mongodb import MongoIndexStore
+        return (MongoDocumentStore.from_uri(uri=MONGO_URI, db_name=db_name),
+                MongoIndexStore.from_uri(uri=MONGO_URI, db_name=db_name))
+    kvstore = SqliteKVStore(path)
+    return SqliteDocumentStore(kvstore), SqliteIndexStore(kvstore)
+
+
+def live_mongo_db() -> str:
+    """Database of the live Mongo generation (MONGO_DB before the first promotion)."""
+    pointer = DOCSTORE_GENERATIONS / "current" / MONGO_DB_FILE
+    return pointer.read_text(encoding="utf-8").strip() if pointer.exists() else MONGO_DB
+
+
+def staging_location(backend: str = DOCSTORE_BACKEND) -> Path:
+    """A new generation directory for a rebuild; not live until promote_stores()."""
+    from index_bundle import generation_id
+    location = DOCSTORE_GENERATIONS / generation_id()
+    location.mkdir(parents=True)
+    if backend == "mongo":
+        db_name = f"{MONGO_DB}_{location.name.replace('.', '_')}"     # "." is not allowed
+        reset_stores("mongo", db_name=db_name)
+        (location / MONGO_DB_FILE).write_text(db_name, encoding="utf-8")
+    return location
+
+
+def generation_stores(location, backend: str = DOCSTORE_BACKEND):
+    """(docstore, index_store) of one generation, live or not."""
+    if backend == "mongo":
+        return make_stores("mongo", db_name=(Path(location) / MONGO_DB_FILE).read_text(encoding="utf-8"))
+    return make_stores("sqlite", path=Path(location) / DOCSTORE_FILE)
+
+
+def make_staging_stores(backend: str = DOCSTORE_BACKEND):
+    location = staging_location(backend)
+    return location, generation_stores(location, backend)
+
+
+def promote_stores(location, backend: str = DOCSTORE_BACKEND, links: dict = None):
+    """Make a validated staging generation the live one.
+
+    Everything in the generation (docstore and index store, or the name of
+    their Mongo database, plus files the build wrote next to them) goes
+    live with one rename of docstores/current. DOCSTORE_PATH and `links`
+    ({file name in the generation: fixed path}) are symlinks through
+    `current`, created once. SQLite resolves them on open, so each
+    generation keeps its own -wal/-shm files.
+
+    Older generations beyond KEEP_DOCSTORES are pruned, but never the
+    previous one, nor a SQLite one that is still open somewhere (see
+    in_use); those go on a later promotion. A pruned Mongo generation
+    drops its database.
+    """
+    from index_bundle import ensure_symlink, swap_symlink
+    location, current = Path(location), DOCSTORE_GENERATIONS / "current"
+    previous = current.resolve() if current.is_symlink() else None
+    swap_symlink(current, location)
+    if backend != "mongo":
+        ensure_symlink(DOCSTORE_PATH, current / DOCSTORE_FILE)
+    for name, path in (links or {}).items():
+        ensure_symlink(path, current / name)
+
+    # only older generations: a newer one may be a build still in progress
+    older = sorted(p for p in DOCSTORE_GENERATIONS.iterdir()
+                   if p.is_dir() and not p.is_symlink() and not p.name.startswith(".")
+                   and p.name < location.name)
+    for old in older[:len(older) - max(KEEP_DOCSTORES - 1, 0)]:
+        if old.resolve() == previous:
+            continue
+        if (old / MONGO_DB_FILE).exists():
+            reset_stores("mongo", db_name=(old / MONGO_DB_FILE).read_text(encoding="utf-8"))
+        elif in_use(old / DOCSTORE_FILE):
+            continue
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def in_use(path) -> bool:
+    """True while some connection (in any process) has the WAL database open:
+    SQLite removes -wal / -shm when the last connection closes, and
+    unlinking them under an open connection can corrupt its reads."""
+    return any(Path(f"{path}{suffix}").exists() for suffix in ("-wal", "-shm"))
+
+
+def reset_stores(backend: str = DOCSTORE_BACKEND, path=DOCSTORE_PATH, db_name: str = None):
+    """Drop a docstore / index store entirely."""
+    if backend == "mongo":
+        from pymongo import MongoClient
+        MongoClient(MONGO_URI).drop_database(db_name or live_mongo_db())
+        return
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
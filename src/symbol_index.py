@@ -0,0 +1,180 @@
+"""
+symbol_index.py  ––  exact / prefix / fuzzy lookup of API names
+
+Queries like "Encoder.startBatch()" or "app.project.activeSequence" are
+already the answer's name; they do not need an embedding or an LLM.
+
+    symbols = SymbolIndex.from_db("embeddings/premiere_docs.db")
+    if looks_like_symbol(query):
+        hits = symbols.lookup(query)      # [(faiss_id, score, how), ...]
+
+  - keys are lower-cased "class.item" and bare "item", call parentheses
+    and argument lists stripped; one sorted array, prefix via bisect
+  - dotted paths fall back to their trailing segments, so
+    app.project.activeSequence finds Project.activeSequence
+  - fuzzy = Levenshtein distance <= MAX_EDITS, computed only for keys
+    of similar length that share enough bigrams (q-gram filter)
+  - saved next to the FAISS indexes as symbols.json at build time
+"""
+
+import bisect
+import json
+import re
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+MAX_EDITS    = 2
+MAX_RESULTS  = 5
+SCORES       = {"exact": 1.0, "suffix": 0.95, "prefix": 0.9, "fuzzy": 0.8}
+
+_ARGS = re.compile(r"\(.*?\)|\[.*?\]")
+_SYMBOL = re.compile(r"^[A-Za-z_$][\w$]*(\.[A-Za-z_$][\w$]*)*(\(.*\))?;?$")
+
+# -----------------------------------------------------------
+# Query shape (same cues as app/01_scrape_docs.is_likely_function,
+# restricted to a single token so sentences never match)
+# -----------------------------------------------------------
+def looks_like_symbol(text: str) -> bool:
+    text = (text or "").strip()
+    if not text or not _SYMBOL.match(text):
+        return False
+    if "(" in text or "." in text:
+        return True
+    return any(a.islower() and b.isupper() for a, b in zip(text, text[1:]))
+
+def normalize(symbol: str) -> str:
+    return _ARGS.sub("", symbol or "").strip().rstrip(";").replace(" ", "").lower()
+
+def bigrams(key: str) -> list[str]:
+    padded = f"^{key}$"
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up (returning limit + 1) past `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+# -----------------------------------------------------------
+# Index
+# -----------------------------------------------------------
+class SymbolIndex:
+    def __init__(self, entries):
+        """entries: iterable of (key, faiss_id); keys already normalized."""
+        self.entries = sorted(set(entries))
+        self.keys = [k for k, _ in self.entries]
+        self._unique = list(dict.fromkeys(self.keys))
+        self._grams = {}
+        for n, key in enumerate(self._unique):
+            for g in set(bigrams(key)):
+                self._grams.setdefault(g, []).append(n)
+
+    # ---------- build / persist ----------
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: (faiss_id, class_name, item_name, full_signature)."""
+        entries = []
+        for faiss_id, class_name, item_name, signature in rows:
+            if faiss_id is None:
+                continue
+            item = normalize(item_name)
+            for key in (normalize(signature), f"{normalize(class_name)}.{item}", item):
+                if key:
+                    entries.append((key, int(faiss_id)))
+        return cls(entries)
+
+    @classmethod
+    def from_db(cls, sqlite_db):
+        import sqlite3
+        from docs_db import iter_documents
+        conn = sqlite3.connect(str(sqlite_db))
+        try:
+            return cls.from_rows(iter_documents(
+                conn, ("faiss_id_main", "class_name", "item_name", "full_signature"),
+                "d.faiss_id_main IS NOT NULL"))
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        return cls.from_rows(
+            (i, r.get("class_name"), r.get("item_name"), r.get("full_signature"))
+            for i, r in bundle.rows())
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(tuple(e) for e in json.load(f))
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ---------- lookups ----------
+    def _ids(self, key):
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_right(self.keys, key)
+        return [self.entries[i][1] for i in range(lo, hi)]
+
+    def exact(self, symbol: str) -> list[int]:
+        return self._ids(normalize(symbol))
+
+    def prefix(self, symbol: str, limit: int = MAX_RESULTS) -> list[int]:
+        key = normalize(symbol)
+        out = []
+        for i in range(bisect.bisect_left(self.keys, key), len(self.keys)):
+            if not self.keys[i].startswith(key) or len(out) >= limit:
+                break
+            out.append(self.entries[i][1])
+        return out
+
+    def fuzzy(self, symbol: str, max_edits: int = MAX_EDITS, limit: int = MAX_RESULTS) -> list[int]:
+        key = normalize(symbol)
+        grams = set(bigrams(key))
+        shared = {}
+        for g in grams:
+            for n in self._grams.get(g, ()):
+                shared[n] = shared.get(n, 0) + 1
+        # one edit changes at most two bigrams
+        need = len(grams) - 2 * max_edits
+        scored = []
+        for n, count in shared.items():
+            candidate = self._unique[n]
+            if count >= need and abs(len(candidate) - len(key)) <= max_edits:
+                d = edit_distance(key, candidate, max_edits)
+                if d <= max_edits:
+                    scored.append((d, candidate))
+        out = []
+        for _, candidate in sorted(scored):
+            out.extend(self._ids(candidate))
+        return list(dict.fromkeys(out))[:limit]
+
+    def lookup(self, symbol: str, limit: int = MAX_RESULTS) -> list[tuple]:
+        """Best available match tier: [(faiss_id, score, how), ...]."""
+        key = normalize(symbol)
+        if not key:
+            return []
+        tiers = [("exact", lambda: self._ids(key))]
+        parts = key.split(".")
+        for n in range(1, len(parts)):        # app.project.x -> project.x -> x
+            tail = ".".join(parts[n:])
+            tiers.append(("suffix", lambda tail=tail: self._ids(tail)))
+        tiers += [("prefix", lambda: self.prefix(key, limit)),
+                  ("fuzzy", lambda: self.fuzzy(key, limit=limit))]
+        for how, find in tiers:
+            ids = list(dict.fromkeys(find()))[:limit]
+            if ids:
+                return [(i, SCORES[how], how) for i in ids]
+        return []
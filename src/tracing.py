@@ -0,0 +1,141 @@
+"""
+tracing.py  ––  lightweight in-process spans and latency histograms
+
+    from tracing import span
+    with span("faiss_search", k=5) as s:
+        D, I = index.search(vec, 5)
+        s["hits"] = int((I != -1).sum())
+
+  - spans nest per thread/task (contextvars) and share a trace_id
+  - every finished span feeds a per-name latency histogram
+  - TRACE_JSONL=path exports every span as one JSON line
+  - metrics() for dashboards (07_query_service GET /metrics, --metrics flags)
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+TRACE_JSONL = os.getenv("TRACE_JSONL")           # unset = no span export
+BUCKETS_MS  = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_current = contextvars.ContextVar("current_span", default=None)
+_lock = threading.Lock()
+_histograms = {}
+_export_file = None
+
+# -----------------------------------------------------------
+# Histograms
+# -----------------------------------------------------------
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                break
+        else:
+            i = len(BUCKETS_MS)
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound containing the q-quantile."""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip([str(b) for b in BUCKETS_MS] + ["+Inf"], self.counts)),
+        }
+
+# -----------------------------------------------------------
+# Spans
+# -----------------------------------------------------------
+def _export(record: dict):
+    global _export_file
+    if not TRACE_JSONL:
+        return
+    line = json.dumps(record, default=str)
+    with _lock:
+        if _export_file is None:
+            _export_file = open(TRACE_JSONL, "a", encoding="utf-8")
+        _export_file.write(line + "\n")
+        _export_file.flush()
+
+class Span:
+    """One timed span; finish() records it (histogram + export) once."""
+
+    def __init__(self, name: str, attrs: dict):
+        parent = _current.get()
+        self.attrs = attrs
+        self.record = {
+            "name": name,
+            "span_id": uuid.uuid4().hex[:16],
+            "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+            "parent_id": parent["span_id"] if parent else None,
+            "start": time.time(),
+        }
+        self._started = time.perf_counter()
+
+    def finish(self, error: str = None):
+        ms = (time.perf_counter() - self._started) * 1000
+        with _lock:
+            _histograms.setdefault(self.record["name"], Histogram()).observe(ms)
+        self.record.update(duration_ms=round(ms, 3), attrs=self.attrs)
+        if error:
+            self.record["error"] = error
+        _export(self.record)
+
+def start_span(name: str, **attrs) -> Span:
+    """A span that is not made current, for generators: finish() it after
+    the loop, from whatever context ends up closing the generator."""
+    return Span(name, attrs)
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block. Yields a dict for attributes discovered inside it
+    (batch_size, prompt_tokens, cache_hits, ...)."""
+    s = Span(name, attrs)
+    token = _current.set(s.record)
+    error = None
+    try:
+        yield attrs
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.finish(error)
+
+# -----------------------------------------------------------
+# Metrics output
+# -----------------------------------------------------------
+def metrics() -> dict:
+    with _lock:
+        return {name: h.summary() for name, h in sorted(_histograms.items())}
@@ -0,0 +1,243 @@
+"""
+type_graph.py  ––  API type graph for call-chain resolution without the LLM
+
+Nodes are classes, edges are members: Application --project--> Project
+--activeSequence--> Sequence --getSelection()--> TrackItem. Built from
+the documents rows (class_name, item_name, member_type, return_type,
+parameters) at index time.
+
+    graph = TypeGraph.from_db("embeddings/premiere_docs.db")
+    graph.chain_to("Sequence")      # "app.project.activeSequence"
+    graph.resolve("the selected clip")
+    # [{"chain": "app.project.activeSequence.getSelection()", "returns": "TrackItem", ...}]
+
+  - adjacency in CSR form (offsets / targets / member ids), one BFS from
+    the global roots (ROOTS) at load, so chain_to() is a parent walk
+  - shortest_path(a, b) is a BFS between any two classes
+  - parameter types are kept per member, so a chain step knows what it
+    needs to be called with
+  - to_graph_store() gives the LlamaIndex SimpleGraphStore layout
+    ({"graph_dict": {class: [[member, type], ...]}}) for storage/type_graph_store.json
+    (its own file: LlamaIndex persist() rewrites storage/graph_store.json)
+"""
+
+import json
+import re
+from collections import deque
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+ROOTS = {"app": "Application"}          # global objects a chain can start from
+MAX_CHAINS = 5
+STOPWORDS = {"the", "a", "an", "of", "to", "in", "on", "for", "and", "my", "all", "get",
+             "set", "current", "this", "that", "with", "from", "by", "is", "are", "i", "want"}
+
+_PARAM = re.compile(r"^\s*([\w$]+)\s*\(([^)]*)\)", re.M)
+_WORD = re.compile(r"[A-Za-z][a-z]*|[A-Z]+(?![a-z])|\d+")
+_MANY = re.compile(r"\barray\b|\bcollection\b|\[\]", re.I)
+
+def _stem(word: str) -> str:
+    word = word.lower()
+    return word[:5] if len(word) > 5 else word.rstrip("s")
+
+def words(text: str) -> list[str]:
+    """camelCase / snake / sentence -> lower-cased stems without stopwords."""
+    return [_stem(w) for w in _WORD.findall(text or "") if w.lower() not in STOPWORDS]
+
+# -----------------------------------------------------------
+# Graph
+# -----------------------------------------------------------
+class TypeGraph:
+    def __init__(self, nodes, members):
+        """nodes: class names. members: dicts with owner, name, kind,
+        returns (class name or None), many, params [(name, type)]."""
+        self.nodes = list(nodes)
+        self.node_id = {n.lower(): i for i, n in enumerate(self.nodes)}
+        self.members = members
+
+        # CSR adjacency over members that return a known class
+        edges = sorted((self.node_id[m["owner"].lower()], self.node_id[m["returns"].lower()], mid)
+                       for mid, m in enumerate(members) if m["returns"])
+        self.offsets = [0] * (len(self.nodes) + 1)
+        for src, _, _ in edges:
+            self.offsets[src + 1] += 1
+        for i in range(len(self.nodes)):
+            self.offsets[i + 1] += self.offsets[i]
+        self.targets = [dst for _, dst, _ in edges]
+        self.edge_member = [mid for _, _, mid in edges]
+
+        self._by_name = {(m["owner"].lower(), m["name"].lower()): mid for mid, m in enumerate(members)}
+        self._member_words = [set(words(m["name"])) for m in members]
+        self._parents = self._bfs_from_roots()
+
+    # ---------- build / persist ----------
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: (class_name, item_name, member_type, return_type, parameters)."""
+        rows = [r for r in rows if r[0] and r[1]]
+        known = {}
+        for class_name, *_ in rows:
+            known.setdefault(class_name.lower(), class_name)
+        for name in ROOTS.values():
+            known.setdefault(name.lower(), name)
+
+        def to_class(type_text):
+            head = (type_text or "").split(":", 1)[0]
+            for w in re.findall(r"[A-Za-z_$][\w$]*", head):
+                for candidate in (w, w.rstrip("s"), w[:-len("Collection")] if w.endswith("Collection") else w):
+                    if candidate.lower() in known:
+                        return known[candidate.lower()]
+            return None
+
+        members = []
+        for class_name, item_name, member_type, return_type, parameters in rows:
+            if member_type in ("overview", "enum"):
+                continue
+            members.append({
+                "owner": class_name,
+                "name": item_name.rstrip("()"),
+                "kind": member_type,
+                "returns": to_class(return_type),
+                "many": bool(_MANY.search(return_type or "")),
+                "params": [(n, t.strip()) for n, t in _PARAM.findall(parameters or "")],
+            })
+        return cls(sorted(known.values()), members)
+
+    @classmethod
+    def from_db(cls, sqlite_db):
+        import sqlite3
+        from docs_db import iter_documents
+        conn = sqlite3.connect(str(sqlite_db))
+        try:
+            return cls.from_rows(iter_documents(
+                conn, ("class_name", "item_name", "member_type", "return_type", "parameters")))
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        return cls.from_rows(
+            (r.get("class_name"), r.get("item_name"), r.get("member_type"),
+             r.get("return_type"), r.get("parameters"))
+            for _, r in bundle.rows())
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"nodes": self.nodes, "members": self.members}, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for m in data["members"]:
+            m["params"] = [tuple(p) for p in m["params"]]
+        return cls(data["nodes"], data["members"])
+
+    def to_graph_store(self) -> dict:
+        graph = {}
+        for m in self.members:
+            if m["returns"]:
+                graph.setdefault(m["owner"], []).append([m["name"], m["returns"]])
+        return {"graph_dict": graph}
+
+    # ---------- traversal ----------
+    def _out(self, node: int):
+        for e in range(self.offsets[node], self.offsets[node + 1]):
+            yield self.targets[e], self.edge_member[e]
+
+    def _bfs(self, sources):
+        """{node: (parent node, member id)} for everything reachable."""
+        parents = {s: None for s in sources}
+        queue = deque(sources)
+        while queue:
+            node = queue.popleft()
+            for nxt, mid in self._out(node):
+                if nxt not in parents:
+                    parents[nxt] = (node, mid)
+                    queue.append(nxt)
+        return parents
+
+    def _bfs_from_roots(self):
+        roots = [self.node_id[c.lower()] for c in ROOTS.values() if c.lower() in self.node_id]
+        return self._bfs(roots)
+
+    def _walk(self, parents, node):
+        steps = []
+        while parents.get(node) is not None:
+            node, mid = parents[node]
+            steps.append(mid)
+        return node, steps[::-1]
+
+    def _format(self, start: int, steps: list[int], element: bool = False) -> str:
+        """element=True indexes into a collection at the end as well, for
+        when a member of the element follows."""
+        root = next((g for g, c in ROOTS.items() if c.lower() == self.nodes[start].lower()),
+                    self.nodes[start])
+        parts = [root]
+        for i, mid in enumerate(steps):
+            m = self.members[mid]
+            call = f"{m['name']}({', '.join(p for p, _ in m['params'])})" if m["kind"] == "method" else m["name"]
+            parts.append(call + ("[i]" if m["many"] and (element or i < len(steps) - 1) else ""))
+        return ".".join(parts)
+
+    def chain_to(self, class_name: str, element: bool = False):
+        """Shortest access expression for an object of this class, from a
+        global root (or the bare class name when no root reaches it)."""
+        node = self.node_id.get((class_name or "").lower())
+        if node is None:
+            return None
+        if node not in self._parents:
+            return self.nodes[node]
+        start, steps = self._walk(self._parents, node)
+        return self._format(start, steps, element)
+
+    def shortest_path(self, src: str, dst: str):
+        """Member names leading from class src to class dst, or None."""
+        a, b = self.node_id.get(src.lower()), self.node_id.get(dst.lower())
+        if a is None or b is None:
+            return None
+        parents = self._bfs([a])
+        if b not in parents:
+            return None
+        _, steps = self._walk(parents, b)
+        return [self.members[mid]["name"] for mid in steps]
+
+    def access_path(self, class_name: str, item_name: str, member_type: str = None):
+        """Full expression for a member: chain to its owner + the member."""
+        owner = self.chain_to(class_name, element=True)
+        if owner is None:
+            return None
+        name = (item_name or "").rstrip("()")
+        mid = self._by_name.get((class_name.lower(), name.lower()))
+        if mid is not None and self.members[mid]["kind"] == "method":
+            name = f"{name}({', '.join(p for p, _ in self.members[mid]['params'])})"
+        return f"{owner}.{name}"
+
+    def resolve(self, text: str, limit: int = MAX_CHAINS) -> list[dict]:
+        """Members whose names (and return types) match the words of
+        `text`, as concrete access chains; best match, shortest chain first."""
+        query = set(words(text))
+        if not query:
+            return []
+        scored = []
+        for mid, m in enumerate(self.members):
+            score = len(query & self._member_words[mid])
+            if m["returns"]:
+                score += 0.5 * len(query & set(words(m["returns"])))
+            if score:
+                owner = self.node_id[m["owner"].lower()]
+                depth = len(self._walk(self._parents, owner)[1]) if owner in self._parents else 99
+                scored.append((-score, depth, mid))
+        out = []
+        for neg_score, _, mid in sorted(scored)[:limit]:
+            m = self.members[mid]
+            out.append({
+                "chain": self.access_path(m["owner"], m["name"]),
+                "owner": m["owner"],
+                "member": m["name"],
+                "returns": m["returns"],
+                "params": [{"name": n, "type": t} for n, t in m["params"]],
+                "score": -neg_score,
+            })
+        return out
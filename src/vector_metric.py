@@ -0,0 +1,139 @@
+"""
+vector_metric.py  ––  cosine indexes and threshold (range) retrieval
+
+Cosine builds store L2-normalized vectors in an inner-product index, so a
+search score *is* the cosine similarity. Legacy L2 builds keep working;
+their distances are mapped to 1 / (1 + d) as before.
+
+    index = new_index(dim, COSINE)
+    index.add(normalize(vectors))
+    hits = range_search(index, normalize(query_vecs), threshold=0.55, max_k=20)
+    # one (similarities, ids) pair per query, best first, only hits >= threshold
+
+  - works on FAISS indexes and on index bundles (same call)
+  - FAISS range_search when the index supports it, else top-max_k + cut
+  - calibrate() picks a threshold from the corpus itself: the similarity
+    that random document pairs only rarely reach; it is saved next to the
+    indexes (metric.json) and in the bundle manifest
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+# -----------------------------------------------------------
+# CONFIG
+# -----------------------------------------------------------
+COSINE, L2 = "cosine", "l2"
+MAX_K = 20                   # cap on hits per query for range search
+CALIBRATION_SAMPLE = 512     # documents sampled for calibrate()
+CALIBRATION_PERCENTILE = 99.0
+DEFAULT_THRESHOLD = {COSINE: 0.5, L2: 0.5}       # calibrate() on a corpus too small to sample
+METRIC_FILE = "metric.json"
+
+# -----------------------------------------------------------
+# Vectors + scores
+# -----------------------------------------------------------
+def normalize(vectors) -> np.ndarray:
+    """Row-wise L2-normalized float32 copy (zero rows stay zero)."""
+    vectors = np.array(vectors, dtype="float32", ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def new_index(dim: int, metric: str = COSINE):
+    import faiss
+    return faiss.IndexFlatIP(dim) if metric == COSINE else faiss.IndexFlatL2(dim)
+
+def index_metric(index) -> str:
+    """COSINE or L2 for a FAISS index or an index bundle."""
+    if hasattr(index, "manifest"):
+        return index.manifest.get("metric", L2)
+    import faiss
+    return COSINE if index.metric_type == faiss.METRIC_INNER_PRODUCT else L2
+
+def similarity(dists, metric: str) -> np.ndarray:
+    """Search output -> similarity in [0, 1]-ish, higher is better."""
+    dists = np.asarray(dists, dtype="float32")
+    return dists if metric == COSINE else 1.0 / (1.0 + dists)
+
+def _radius(threshold: float, metric: str):
+    """The similarity threshold in the index's own units; None when every
+    hit qualifies (L2 similarities are always > 0)."""
+    if metric == COSINE:
+        return threshold
+    return None if threshold <= 0 else 1.0 / threshold - 1.0
+
+def _top_k(index, queries, max_k: int, params=None, ids=None):
+    """Plain top-max_k search in range_search's flat (lims, D, I) layout."""
+    if hasattr(index, "manifest"):
+        D, I = index.search(queries, max_k, ids=ids)
+    else:
+        D, I = index.search(queries, max_k, params=params)
+    return np.arange(0, D.size + 1, D.shape[1]), D.ravel(), I.ravel()
+
+# -----------------------------------------------------------
+# Range search
+# -----------------------------------------------------------
+def range_search(index, queries, threshold: float, max_k: int = MAX_K, params=None,
+                 ids=None, metric: str = None) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Every hit with similarity >= threshold (at most max_k, best first),
+    one (similarities, ids) pair per query row. `params` restricts a FAISS
+    search (id_filters.faiss_params), `ids` a bundle search."""
+    metric = metric or index_metric(index)
+    queries = np.asarray(queries, dtype="float32").reshape(-1, index.d)
+    radius = _radius(threshold, metric)
+    try:
+        if radius is None:
+            lims, D, I = _top_k(index, queries, max_k, params=params, ids=ids)
+        elif hasattr(index, "manifest"):
+            lims, D, I = index.range_search(queries, radius, ids=ids)
+        else:
+            lims, D, I = index.range_search(queries, radius, params=params)
+    except RuntimeError:               # index type without range search: top-max_k, then cut
+        lims, D, I = _top_k(index, queries, max_k, params=params)
+
+    out = []
+    for q in range(len(queries)):
+        sims = similarity(D[lims[q]:lims[q + 1]], metric)
+        hit_ids = np.asarray(I[lims[q]:lims[q + 1]], dtype="int64")
+        keep = (hit_ids != -1) & (sims >= threshold)
+        sims, hit_ids = sims[keep], hit_ids[keep]
+        order = np.argsort(-sims, kind="stable")[:max_k]
+        out.append((sims[order], hit_ids[order]))
+    return out
+
+# -----------------------------------------------------------
+# Calibration
+# -----------------------------------------------------------
+def calibrate(vectors, metric: str = COSINE, sample: int = CALIBRATION_SAMPLE,
+              percentile: float = CALIBRATION_PERCENTILE, seed: int = 0) -> float:
+    """Similarity that only (100 - percentile)% of random document pairs
+    reach: anything below it is indistinguishable from an unrelated doc."""
+    vectors = np.asarray(vectors, dtype="float32")
+    if len(vectors) < 2:
+        return DEFAULT_THRESHOLD[metric]
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), size=min(sample, len(vectors)), replace=False)]
+    if metric == COSINE:
+        picked = normalize(picked)
+        scores = picked @ picked.T
+    else:
+        sq = (picked ** 2).sum(axis=1)
+        scores = 1.0 / (1.0 + np.maximum(sq[:, None] + sq[None, :] - 2.0 * picked @ picked.T, 0))
+    pairs = scores[~np.eye(len(picked), dtype=bool)]
+    return round(float(np.percentile(pairs, percentile)), 4)
+
+def save_metric(directory, metric: str, threshold: float):
+    with open(Path(directory) / METRIC_FILE, "w", encoding="utf-8") as f:
+        json.dump({"metric": metric, "threshold": threshold}, f)
+
+def load_threshold(directory, metric: str):
+    """Calibrated threshold saved with a build, else None (no cut: top-K)."""
+    path = Path(directory) / METRIC_FILE
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("metric") == metric:
+            return float(saved["threshold"])
+    return None
@@ -0,0 +1,153 @@
+import hashlib
+import importlib
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from index_bundle import open_bundle
+from record_io import iter_records
+from vector_metric import normalize
+
+build = importlib.import_module("03_build_embeddings")
+
+DIM = 8
+
+
+class FakeEmbedder:
+    """Deterministic vectors from a text hash; same=True embeds every text
+    identically (duplicate vectors tie on every search)."""
+
+    def __init__(self, same=False):
+        self.same = same
+
+    def get_text_embedding(self, text):
+        seed = 0 if self.same else int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).normal(size=DIM).astype("float32").tolist()
+
+    def get_text_embedding_batch(self, texts):
+        return [self.get_text_embedding(t) for t in texts]
+
+
+def command(name, description, code=""):
+    details = [{"code": code}] if code else []
+    returns = [{"Type": "Clip", "Description": "the clips"}] if name == "getClips" else []
+    return {"command": {"name": name, "description": description, "parameters": [],
+                        "returns": returns, "details": details}}
+
+
+@pytest.fixture
+def docs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("docs_json").mkdir()
+    for title, names in {"Sequence": ["getName", "getClips"], "Clip": ["getDuration"]}.items():
+        data = {"title": title, "description": f"The {title} object",
+                "sections": [{"Methods": {"commands": [command(n, f"{title}.{n} doc", f"x.{n}()")
+                                                       for n in names]}}]}
+        Path(f"docs_json/{title}.json").write_text(json.dumps(data))
+    return tmp_path
+
+
+def staged(emb=None):
+    return build.stage_build(emb or FakeEmbedder(), DIM)
+
+
+def test_promote_flips_one_pointer(docs):
+    emb = FakeEmbedder()
+    finals = []
+    for _ in range(2):
+        staging, build_id, _ = staged(emb)
+        build.validate_build(staging, emb)
+        final, bundle_path = build.promote_build(staging, build_id)
+        finals.append(final)
+
+    assert os.readlink(build.FAISS_DIR) == os.path.join("builds", "current", "faiss_indexes")
+    assert os.readlink(build.SQLITE_DB) == os.path.join("builds", "current", "premiere_docs.db")
+    assert build.CURRENT_BUILD.resolve() == finals[1].resolve()
+    assert build.SQLITE_DB.resolve() == (finals[1] / "premiere_docs.db").resolve()
+    assert Path("embeddings/bundles/current").resolve() == bundle_path.resolve()
+    assert Path("embeddings/shards/premiere-pro/latest/current").resolve() == bundle_path.resolve()
+    assert open_bundle(bundle_path).verify()
+    export = Path("data/processed/processed_chunks.jsonl.gz")
+    assert export.resolve() == (finals[1] / "processed_chunks.jsonl.gz").resolve()
+    graph_dict = json.loads(build.GRAPH_STORE.read_text())["graph_dict"]
+    assert graph_dict["Sequence"] == [["getClips", "Clip"]]
+    # a LlamaIndex persist() to ./storage must not touch the type graph
+    Path("storage/graph_store.json").write_text('{"graph_dict": {}}')
+    assert json.loads(build.GRAPH_STORE.read_text())["graph_dict"] == graph_dict
+
+
+def test_failed_validation_leaves_live_build(docs):
+    emb = FakeEmbedder()
+    staging, build_id, _ = staged(emb)
+    build.validate_build(staging, emb)
+    live, bundle_path = build.promote_build(staging, build_id)
+
+    staging, build_id, _ = staged(emb)
+    with sqlite3.connect(staging / "premiere_docs.db") as conn:
+        conn.execute("DELETE FROM documents")
+    with pytest.raises(ValueError):
+        build.validate_build(staging, emb)
+    assert build.CURRENT_BUILD.resolve() == live.resolve()
+    assert Path("embeddings/bundles/current").resolve() == bundle_path.resolve()
+
+
+def test_failed_bundle_leaves_live_build(docs, monkeypatch):
+    emb = FakeEmbedder()
+    staging, build_id, _ = staged(emb)
+    live, bundle_path = build.promote_build(staging, build_id)
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(build, "bundle_from_build", broken)
+    staging, build_id, _ = staged(emb)
+    with pytest.raises(OSError):
+        build.promote_build(staging, build_id)
+    assert build.CURRENT_BUILD.resolve() == live.resolve()
+    assert build.FAISS_DIR.resolve() == (live / "faiss_indexes").resolve()
+    assert Path("embeddings/bundles/current").resolve() == bundle_path.resolve()
+    assert staging.exists()
+
+
+def test_validation_accepts_duplicate_vectors(docs):
+    emb = FakeEmbedder(same=True)
+    staging, _, total = staged(emb)
+    assert total == 5
+    build.validate_build(staging, emb)
+
+
+def test_streaming_build_keeps_rows_and_vectors_aligned(docs, monkeypatch):
+    monkeypatch.setattr(build, "BATCH_SIZE", 2)          # several batches for 5 chunks
+    emb = FakeEmbedder()
+    staging, _, total = staged(emb)
+    assert not Path("data/processed").exists()           # nothing outside the staging dir yet
+
+    indexes = {name: faiss.read_index(str(staging / "faiss_indexes" / f"{name}.index"))
+               for name in build.INDEX_COLUMNS}
+    names = list(build.INDEX_COLUMNS)
+    with sqlite3.connect(staging / "premiere_docs.db") as conn:
+        rows = {r[0]: dict(zip(names, r[1:])) for r in conn.execute(
+            f"SELECT doc_id, {', '.join(build.INDEX_COLUMNS.values())} FROM documents")}
+    assert len(rows) == total == indexes["main"].ntotal
+
+    # every row's vector ids point at the embedding of that row's own text
+    chunks = {c["doc_id"]: c for c in build.iter_chunks(sorted(Path("docs_json").glob("*.json")))}
+    for doc_id, ids in rows.items():
+        for name, field in build.CHUNK_FIELDS.items():
+            text = chunks[doc_id][field]
+            if not text:
+                assert ids[name] is None
+                continue
+            expected = normalize(emb.get_text_embedding(text))[0]
+            np.testing.assert_allclose(indexes[name].reconstruct(ids[name]), expected, rtol=1e-5)
+
+    exported = {r["doc_id"]: r["faiss_id_main"] for r in iter_records(staging / "processed_chunks.jsonl.gz")}
+    assert exported == {doc_id: ids["main"] for doc_id, ids in rows.items()}
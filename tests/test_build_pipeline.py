@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import build_pipeline
+from build_pipeline import Pipeline, Stage, dependencies
+
+UPPER = """from pathlib import Path
+SUFFIX = "!"
+Path("out").mkdir(exist_ok=True)
+text = "".join(p.read_text() for p in sorted(Path("docs").glob("*.txt")))
+Path("out/upper.txt").write_text(text.upper() + SUFFIX)
+"""
+COUNT = """from pathlib import Path
+Path("out/count.txt").write_text(str(len(Path("out/upper.txt").read_text())))
+"""
+
+
+def make_pipeline(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_pipeline, "ROOT", tmp_path)
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.txt").write_text("abc")
+    (tmp_path / "upper.py").write_text(UPPER)
+    (tmp_path / "count.py").write_text(COUNT)
+    stages = [
+        Stage("count", "count.py", inputs=["out/upper.txt"], outputs=["out/count.txt"]),
+        Stage("upper", "upper.py", inputs=["docs/*.txt"], outputs=["out/upper.txt"]),
+    ]
+    return lambda: Pipeline(stages, cache_file=tmp_path / ".build_cache" / "pipeline.json")
+
+
+def statuses(reports):
+    return {r["stage"]: r["status"] for r in reports}
+
+
+def test_dependencies_from_inputs_and_outputs():
+    stages = [Stage("a", "a.py", outputs=["out"]), Stage("b", "b.py", inputs=["out/*.txt"], outputs=["x"]),
+              Stage("c", "c.py", inputs=["docs/*"], outputs=["y"])]
+    assert dependencies(stages) == {"a": set(), "b": {"a"}, "c": set()}
+
+
+def test_skips_unchanged_and_reruns_affected(tmp_path, monkeypatch):
+    pipeline = make_pipeline(tmp_path, monkeypatch)
+    assert statuses(pipeline().run()) == {"count": "ran", "upper": "ran"}
+    assert (tmp_path / "out" / "count.txt").read_text() == "4"
+
+    assert statuses(pipeline().run()) == {"count": "skipped", "upper": "skipped"}
+
+    (tmp_path / "docs" / "b.txt").write_text("de")
+    assert statuses(pipeline().run(dry_run=True)) == {"count": "would run", "upper": "would run"}
+    reports = pipeline().run()
+    assert statuses(reports) == {"count": "ran", "upper": "ran"}
+    assert reports[1]["reasons"] == ["inputs"]
+    assert (tmp_path / "out" / "count.txt").read_text() == "6"
+
+    (tmp_path / "count.py").write_text(COUNT + "\n# comment\n")
+    assert statuses(pipeline().run()) == {"count": "ran", "upper": "skipped"}
+    assert statuses(pipeline().run(["upper"], force=["upper"])) == {"upper": "ran"}
+
+
+def test_failed_stage_blocks_downstream(tmp_path, monkeypatch):
+    pipeline = make_pipeline(tmp_path, monkeypatch)
+    (tmp_path / "upper.py").write_text("raise SystemExit(3)")
+    assert statuses(pipeline().run()) == {"count": "blocked by upper", "upper": "failed"}
@@ -0,0 +1,43 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import bulk_query
+from bulk_query import completed_ids, read_queries
+
+
+def test_read_queries(tmp_path):
+    path = tmp_path / "q.jsonl"
+    path.write_text('{"id": "a", "query": "get selected clips"}\n\n"set in point"\n{"text": "render"}\n')
+    assert list(read_queries(path)) == [
+        {"id": "a", "query": "get selected clips"},
+        {"id": 3, "query": "set in point"},
+        {"id": 4, "query": "render"},
+    ]
+
+
+def test_completed_ids_drops_partial_line_and_errors(tmp_path):
+    out = tmp_path / "out.ndjson"
+    out.write_text('{"id": 1, "plan": []}\n{"id": 2, "error": "x"}\n{"id": 3, "pl')
+    assert completed_ids(out) == {1}
+    assert out.read_text().endswith('"x"}\n')
+    assert completed_ids(tmp_path / "missing.ndjson") == set()
+
+
+def test_main_resumes_from_output(tmp_path, monkeypatch):
+    queries = tmp_path / "q.jsonl"
+    queries.write_text("".join(json.dumps({"id": i, "query": f"q{i}"}) + "\n" for i in range(5)))
+    out = tmp_path / "out.ndjson"
+    seen = []
+
+    def fake_run_bulk(todo, mode, batch_size, **kwargs):
+        for q in todo:
+            seen.append(q["id"])
+            yield {**q, "results": []}
+
+    monkeypatch.setattr(bulk_query, "run_bulk", fake_run_bulk)
+    out.write_text('{"id": 0, "results": []}\n{"id": 1, "error": "timeout"}\n')
+    assert bulk_query.main([str(queries), "-o", str(out), "--mode", "search"]) == 0
+    assert seen == [1, 2, 3, 4]
+    assert completed_ids(out) == {0, 1, 2, 3, 4}
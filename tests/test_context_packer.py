@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from context_packer import (count_tokens, pack_candidates, pack_texts, pack_texts_indexed, trim_code,
+                            trim_to_relevant, truncate_tokens)
+
+
+def test_hard_cut_respects_token_budget():
+    # one "word" by whitespace, but many tokens: a word cut would keep all of it
+    sentence = "app.project.activeSequence.getSelection()[0].setSelected(true,true)" * 3
+    cut = trim_to_relevant(sentence, "selection", 10)
+    assert 0 < count_tokens(cut) <= 10
+    assert sentence.startswith(cut)
+
+
+def test_truncate_tokens_keeps_longest_prefix():
+    text = "one two three four five six"
+    assert truncate_tokens(text, 3) == "one two three"
+    assert truncate_tokens(text, 100) == text
+    assert truncate_tokens(text, 0) == ""
+
+
+def test_pack_texts_indexed_reports_kept_sources():
+    texts = ["Sequence.getSelection returns the selected clips",
+             "Sequence.getSelection returns the selected clips",      # duplicate
+             "Encoder.startBatch starts the render queue",
+             "Track.insertClip inserts a clip at a time"]              # budget already spent
+    budget = count_tokens(texts[0]) + count_tokens(texts[2])
+    packed = pack_texts_indexed("selected clips", texts, budget=budget)
+    assert [i for i, _ in packed] == [0, 2]
+    assert pack_texts("selected clips", texts, budget=budget) == [t for _, t in packed]
+
+
+def test_code_fields_keep_whole_leading_lines():
+    code = ("var seq = app.project.activeSequence; // the open sequence\n"
+            "var clips = seq.getSelection();\n"
+            + "clips[0].setSelected(true, true);\n" * 20)
+    cut = trim_code(code, 25)
+    assert code.startswith(cut) and cut.count("\n") >= 1
+    assert all(line in code.splitlines() for line in cut.splitlines())
+    assert count_tokens(cut) <= 25
+
+    [packed] = pack_candidates("selection", [{"full_signature": "Sequence.getSelection()",
+                                              "example_code": code}], field_budget=25)
+    assert packed["example_code"] == cut
@@ -0,0 +1,34 @@
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from index_bundle import open_bundle, write_bundle
+from vector_metric import COSINE
+
+qe = importlib.import_module("04_query_engine")
+
+
+@pytest.mark.parametrize("threshold, expected", [(0.0, 0.0), (0.42, 0.42), (None, None)])
+def test_bundle_threshold(tmp_path, monkeypatch, threshold, expected):
+    monkeypatch.setattr(qe, "FAISS_DIR", tmp_path / "no-build")
+    extra = {} if threshold is None else {"threshold": threshold}
+    path = write_bundle(np.eye(2, dtype="float32"), [{"item_name": "a"}, {"item_name": "b"}],
+                        embed_model="test", root=tmp_path, metric=COSINE, extra=extra)
+    searcher = qe.DocSearcher(emb=object(), bundle=open_bundle(path))
+    assert searcher.threshold == expected
+
+
+def test_uncalibrated_build_keeps_top_k(tmp_path, monkeypatch):
+    monkeypatch.setattr(qe, "FAISS_DIR", tmp_path / "no-build")
+    path = write_bundle(np.array([[1, 0], [0, 1]], dtype="float32"), [{"item_name": "a"}, {"item_name": "b"}],
+                        embed_model="test", root=tmp_path, metric=COSINE,
+                        extra={"threshold": qe.load_threshold(tmp_path / "no-build", COSINE)})
+    emb = type("Emb", (), {"get_text_embedding": lambda self, text: [0.0, 1.0]})()
+    searcher = qe.DocSearcher(emb=emb, bundle=open_bundle(path))
+    # "a" is orthogonal to the query: no cut without a calibrated threshold
+    assert [api["item_name"] for api in searcher.relevant_apis("q", max_k=2)] == ["b", "a"]
@@ -0,0 +1,31 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from docs_db import create_schema, insert_documents, iter_documents, rows_by_faiss_id
+
+ROW_COLUMNS = ("item_name", "details", "example_code")      # what DocSearcher reads per hit
+DOCS = [{"doc_id": f"d{i}", "item_name": f"item{i}", "details": "long details " * 20,
+         "example_code": f"seq.call({i})", "json_metadata": '{"raw": "%s"}' % ("x" * 200),
+         "faiss_id_main": i} for i in range(3)]
+
+
+def make_db(slim=True):
+    conn = sqlite3.connect(":memory:")
+    create_schema(conn, slim=slim)
+    insert_documents(conn, DOCS)
+    conn.commit()
+    return conn
+
+
+def test_search_columns_are_hot():
+    conn = make_db()
+    queries = []
+    conn.set_trace_callback(queries.append)
+    rows = rows_by_faiss_id(conn, ROW_COLUMNS, [2, 0, 7])
+    assert rows == {i: ("item%d" % i, DOCS[i]["details"], DOCS[i]["example_code"]) for i in (0, 2)}
+    assert not any("documents_cold" in q for q in queries)
+    # json_metadata is compressed in the cold table and read only on request
+    assert [r[0] for r in iter_documents(conn, ("json_metadata",))] == [d["json_metadata"] for d in DOCS]
+    assert rows_by_faiss_id(make_db(slim=False), ROW_COLUMNS, [2, 0, 7]) == rows
@@ -0,0 +1,75 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from embed_batcher import EmbeddingBatcher
+
+
+class FakeBackend:
+    def __init__(self, fail=False, short=False):
+        self.calls = []
+        self.fail, self.short = fail, short
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, texts):
+        self.release.wait()
+        self.calls.append(list(texts))
+        if self.fail:
+            raise ValueError("backend down")
+        vectors = [[float(len(t))] for t in texts]
+        return vectors[:-1] if self.short else vectors
+
+
+def test_concurrent_submits_share_one_batch():
+    backend = FakeBackend()
+    backend.release.clear()                 # hold the first call so the rest queue up
+    batcher = EmbeddingBatcher(backend, max_batch=4, max_wait_ms=1)
+    first = batcher.submit("a")
+    time.sleep(0.1)                         # worker is now blocked on the first call
+    futures = [batcher.submit("x" * n) for n in range(1, 5)]
+    backend.release.set()
+    assert first.result(timeout=2) == [1.0]
+    assert [f.result(timeout=2) for f in futures] == [[1.0], [2.0], [3.0], [4.0]]
+    batcher.close()
+    assert backend.calls == [["a"], ["x", "xx", "xxx", "xxxx"]]
+    assert batcher.metrics()["batch_size_histogram"] == {1: 1, 4: 1}
+
+
+def test_max_wait_flushes_a_partial_batch():
+    backend = FakeBackend()
+    batcher = EmbeddingBatcher(backend, max_batch=32, max_wait_ms=20)
+    t0 = time.monotonic()
+    assert batcher.embed("abc") == [3.0]
+    assert time.monotonic() - t0 < 1.0
+    batcher.close()
+    assert backend.calls == [["abc"]]
+
+
+@pytest.mark.parametrize("backend, error", [(FakeBackend(fail=True), ValueError),
+                                            (FakeBackend(short=True), RuntimeError)])
+def test_backend_errors_reach_every_caller(backend, error):
+    backend.release.clear()
+    batcher = EmbeddingBatcher(backend, max_batch=3, max_wait_ms=50)
+    futures = [batcher.submit(t) for t in ("a", "b", "c")]
+    backend.release.set()
+    for f in futures:
+        with pytest.raises(error):
+            f.result(timeout=2)
+    batcher.close()
+    assert batcher.metrics()["errors"] >= 1
+
+
+def test_close_drains_then_rejects():
+    backend = FakeBackend()
+    batcher = EmbeddingBatcher(backend, max_batch=2, max_wait_ms=1)
+    futures = [batcher.submit(t) for t in ("a", "bb", "ccc")]
+    batcher.close()
+    assert [f.result(timeout=0) for f in futures] == [[1.0], [2.0], [3.0]]
+    with pytest.raises(RuntimeError):
+        batcher.submit("late")
+    batcher.close()                          # idempotent
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+faiss = pytest.importorskip("faiss")
+np = pytest.importorskip("numpy")
+pytest.importorskip("llama_index.core")
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import sqlite_docstore
+from app import embed_save
+
+
+class Docstore:
+    def __init__(self, n):
+        self.docs = {f"n{i}": None for i in range(n)}
+
+
+class Retriever:
+    def __init__(self, hits):
+        self.hits = hits
+
+    def retrieve(self, query):
+        return self.hits
+
+
+def index_with(n):
+    index = faiss.IndexFlatL2(4)
+    if n:
+        index.add(np.eye(4, dtype="float32")[:n])
+    return index
+
+
+@pytest.fixture
+def live(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sqlite_docstore, "DOCSTORE_PATH", Path("embeddings/docstore.db"))
+    monkeypatch.setattr(sqlite_docstore, "DOCSTORE_GENERATIONS", Path("embeddings/docstores"))
+    location, _ = sqlite_docstore.make_staging_stores("sqlite")
+    embed_save.promote(location, index_with(2), "embeddings/faiss.index")
+    return location
+
+
+def test_promote_switches_faiss_and_docstore_together(live):
+    assert faiss.read_index("embeddings/faiss.index").ntotal == 2
+    assert Path("embeddings/faiss.index").resolve() == (live / "faiss.index").resolve()
+    assert Path("embeddings/docstore.db").resolve() == (live / "docstore.db").resolve()
+
+
+@pytest.mark.parametrize("vectors, nodes, hits", [(3, 2, ["hit"]), (2, 2, [])])
+def test_failed_validation_leaves_live_build(live, vectors, nodes, hits):
+    staging, _ = sqlite_docstore.make_staging_stores("sqlite")
+    with pytest.raises(SystemExit):
+        embed_save.validate_staged(index_with(vectors), Docstore(nodes), Retriever(hits))
+    assert Path("embeddings/docstores/current").resolve() == live.resolve()
+    assert faiss.read_index("embeddings/faiss.index").ntotal == 2
+    assert not (staging / "faiss.index").exists()
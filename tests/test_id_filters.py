@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from id_filters import FilterIndex
+from index_bundle import open_bundle, write_bundle
+
+ROWS = [
+    {"class_name": "Sequence", "section_type": "Instance Methods", "member_type": "method"},
+    {"class_name": "Sequence", "section_type": "Attributes", "member_type": "property"},
+    {"class_name": "Project", "section_type": "Instance Methods", "member_type": "method"},
+    {"class_name": "Encoder", "section_type": "Enumerations", "member_type": "enum"},
+    {"class_name": "Sequence", "section_type": "Instance Methods", "member_type": "method"},
+]
+
+
+def make_filters():
+    return FilterIndex.from_rows(
+        (i, r["class_name"], r["section_type"], r["member_type"]) for i, r in enumerate(ROWS))
+
+
+def test_select_intersects_columns_and_unions_values():
+    filters = make_filters()
+    assert filters.select() is None
+    assert filters.select(class_name="sequence").tolist() == [0, 1, 4]
+    assert filters.select(class_name="Sequence", member_type="method").tolist() == [0, 4]
+    assert filters.select(class_name=["Project", "Encoder"]).tolist() == [2, 3]
+    assert filters.select(class_name="Track").tolist() == []
+    with pytest.raises(ValueError):
+        filters.select(item_name="x")
+
+
+def test_save_load_round_trip(tmp_path):
+    filters = make_filters()
+    filters.save(tmp_path / "filters.npz")
+    loaded = FilterIndex.load(tmp_path / "filters.npz")
+    assert loaded.values("member_type") == ["enum", "method", "property"]
+    assert loaded.select(section_type="Instance Methods").tolist() == [0, 2, 4]
+
+
+def test_bundle_search_scores_only_subset(tmp_path):
+    vectors = np.eye(5, dtype="float32")
+    bundle = open_bundle(write_bundle(vectors, ROWS, embed_model="test", root=tmp_path))
+    subset = make_filters().select(class_name="Sequence", member_type="method")
+
+    D, I = bundle.search(vectors[2], k=2)
+    assert I[0, 0] == 2
+    D, I = bundle.search(vectors[2], k=5, ids=subset)
+    assert sorted(I[0].tolist()) == [0, 4]
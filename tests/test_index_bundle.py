@@ -0,0 +1,117 @@
+import importlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from index_bundle import open_bundle, prune_generations, publish, swap_symlink, write_bundle
+
+qe = importlib.import_module("04_query_engine")
+
+
+def rows(*names):
+    return [{"item_name": n, "class_name": "Clip"} for n in names]
+
+
+class FakeEmbedder:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def get_text_embedding(self, text):
+        return self.vectors[text]
+
+
+def test_write_bundle_round_trips_vectors_and_rows(tmp_path):
+    vectors = np.array([[1, 0], [0, 1], [1, 1]], dtype="float32")
+    path = write_bundle(vectors, rows("a", "b") + [None], embed_model="test", root=tmp_path)
+    bundle = open_bundle(path)
+
+    assert bundle.ntotal == 3 and bundle.d == 2
+    assert bundle.row(0)["item_name"] == "a"
+    assert bundle.row(2) is None                      # tombstone
+    assert [i for i, _ in bundle.rows()] == [0, 1]
+    D, I = bundle.search([1, 0], k=2)
+    assert I[0].tolist() == [0, 2] and D[0, 0] == 0.0
+    assert bundle.verify()
+    assert not any(p.name.startswith(".staging") for p in (tmp_path / "generations").iterdir())
+
+
+def test_write_bundle_rejects_mismatched_rows(tmp_path):
+    with pytest.raises(ValueError):
+        write_bundle(np.eye(2, dtype="float32"), rows("a"), embed_model="test", root=tmp_path)
+
+
+def test_verify_detects_corrupt_bundle(tmp_path):
+    path = write_bundle(np.eye(2, dtype="float32"), rows("a", "b"), embed_model="test", root=tmp_path)
+    with open(path / "rows.jsonl", "r+b") as f:
+        f.seek(2)
+        f.write(b"X")
+    assert not open_bundle(path).verify()
+
+
+def test_swap_symlink_replaces_link_and_moves_legacy_dir_aside(tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    old.mkdir(), new.mkdir()
+    link = tmp_path / "current"
+    link.mkdir()                                      # pre blue/green: a real directory
+    swap_symlink(link, old)
+    assert link.is_symlink() and link.resolve() == old.resolve()
+    assert any(p.name.startswith(".current.pre-bluegreen-") for p in tmp_path.iterdir())
+
+    swap_symlink(link, new)
+    assert link.resolve() == new.resolve()
+    assert not os.path.isabs(os.readlink(link))       # relative: survives moving the root
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".current-")]
+
+
+def test_prune_generations_keeps_newest_and_live(tmp_path):
+    for name in ("g1", "g2", "g3", "g4"):
+        (tmp_path / name).mkdir()
+    (tmp_path / ".staging-g5").mkdir()
+    prune_generations(tmp_path, keep=2, live=tmp_path / "g1")
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".staging-g5", "g1", "g3", "g4"]
+
+
+def test_publish_swap_prune_keeps_live(tmp_path):
+    paths = [write_bundle(np.eye(2, dtype="float32") * (i + 1), rows("a", "b"),
+                          embed_model="test", root=tmp_path) for i in range(3)]
+    publish(paths[1], root=tmp_path, keep=1)          # publish an older generation
+    assert (tmp_path / "current").resolve() == paths[1].resolve()
+    assert sorted(p.name for p in (tmp_path / "generations").iterdir()) == sorted([paths[1].name, paths[2].name])
+
+    publish(paths[2], root=tmp_path, keep=1)
+    assert open_bundle(tmp_path / "current").generation == paths[2].name
+    assert [p.name for p in (tmp_path / "generations").iterdir()] == [paths[2].name]
+
+
+def test_from_bundle_hot_swap(tmp_path):
+    emb = FakeEmbedder({"q": [1.0, 0.0]})
+    first = write_bundle(np.array([[1, 0], [0, 1]], dtype="float32"), rows("old", "other"),
+                         embed_model="test", root=tmp_path)
+    publish(first, root=tmp_path)
+    before = qe.DocSearcher.from_bundle(tmp_path / "current", emb=emb)
+
+    second = write_bundle(np.array([[0, 1], [1, 0]], dtype="float32"), rows("other", "new"),
+                          embed_model="test", root=tmp_path)
+    publish(second, root=tmp_path, keep=1)
+    after = qe.DocSearcher.from_bundle(tmp_path / "current", emb=emb)
+
+    assert after.bundle.generation == second.name
+    assert after.nearest_api("q", k=1)[0]["item_name"] == "new"
+    # the searcher opened before the swap keeps serving its own (pruned) generation
+    assert not first.exists()
+    assert before.nearest_api("q", k=1)[0]["item_name"] == "old"
+
+
+def test_manifest_records_checksums_and_extra(tmp_path):
+    path = write_bundle(np.eye(2, dtype="float32"), rows("a", "b"), embed_model="test",
+                        root=tmp_path, extra={"threshold": 0.3})
+    manifest = json.loads((path / "manifest.json").read_text())
+    assert manifest["threshold"] == 0.3
+    assert set(manifest["files"]) == {"vectors.npy", "norms.npy", "rows.jsonl", "rows.offsets.npy"}
+    assert manifest["embedding"] == {"model": "test", "dim": 2}
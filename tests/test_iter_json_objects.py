@@ -0,0 +1,69 @@
+import contextvars
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import tracing
+
+qe = importlib.import_module("04_query_engine")
+
+
+def test_objects_split_across_chunks():
+    chunks = ['[{"step": 1, "act', 'ion": "get seq', 'uence"}, {"step"', ': 2, "action": "select"}]']
+    assert list(qe.iter_json_objects(chunks)) == [
+        {"step": 1, "action": "get sequence"},
+        {"step": 2, "action": "select"},
+    ]
+
+
+def test_braces_and_escapes_inside_strings():
+    text = '{"action": "call f({x}) and \\"}\\" too", "step": 1}'
+    assert list(qe.iter_json_objects(c for c in text)) == [
+        {"action": 'call f({x}) and "}" too', "step": 1}]
+
+
+def test_ignores_chatter_garbage_and_actionless_objects():
+    chunks = ["Here is the plan:\n```json\n[", '{"action": "open"}', ",{bad json}", ',{"note": 1}',
+              "]\n```\ntrailing {", '"action": "never closed"']
+    assert list(qe.iter_json_objects(chunks)) == [{"action": "open"}]
+
+
+class Delta:
+    def __init__(self, delta):
+        self.delta = delta
+
+
+class StreamingLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream_complete(self, prompt):
+        return (Delta(c) for c in self.chunks)
+
+
+@pytest.fixture
+def prompt_file(tmp_path, monkeypatch):
+    path = tmp_path / "prompt.txt"
+    path.write_text("Plan the steps.")
+    monkeypatch.setattr(qe, "PROMPT_FILE", path)
+
+
+def test_stream_falls_back_to_one_step_per_line(prompt_file):
+    llm = StreamingLLM(["Open the sequ", "ence\n\nSelect the ", "clip\n"])
+    assert list(qe.decompose_query_stream("q", llm=llm)) == [
+        {"action": "Open the sequence", "description": ""},
+        {"action": "Select the clip", "description": ""},
+    ]
+
+
+def test_abandoned_stream_records_its_span(prompt_file):
+    before = tracing.metrics().get("decompose", {}).get("count", 0)
+    steps = qe.decompose_query_stream("q", llm=StreamingLLM(['[{"action": "a"},', '{"action": "b"}]']))
+    assert next(steps) == {"action": "a"}
+    contextvars.Context().run(steps.close)          # closed from another context
+    assert tracing.metrics()["decompose"]["count"] == before + 1
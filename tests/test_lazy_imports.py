@@ -0,0 +1,36 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("llama_index", "faiss", "langchain", "langchain_core", "langchain_community",
+         "sentence_transformers", "torch", "pymongo", "dotenv")
+
+
+def loaded_after(code):
+    """Top-level packages a fresh interpreter has imported after `code`."""
+    out = subprocess.run(
+        [sys.executable, "-c", code + "\nimport sys; print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))"],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(out.stdout.split())
+
+
+@pytest.mark.parametrize("module", ["query_engine", "ollama_query_engine", "embed_save",
+                                    "similarity", "langchain_exp"])
+def test_app_modules_import_without_heavy_deps(module):
+    loaded = loaded_after(f"import app.{module} as m\nassert callable(m.main)")
+    assert not loaded & set(HEAVY)
+
+
+def test_app_package_is_lazy():
+    loaded = loaded_after("import app")
+    assert "app" in loaded and "ollama_client" not in loaded and "context_packer" not in loaded
+
+
+def test_llamaindex_script_defers_llama_index():
+    pytest.importorskip("httpx")
+    loaded = loaded_after("import sys; sys.path.insert(0, 'src'); import importlib; "
+                          "importlib.import_module('06_llamaindex_exp')")
+    assert "llama_index" not in loaded
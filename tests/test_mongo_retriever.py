@@ -0,0 +1,111 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from mongo_retriever import LlamaIndexSplitRetriever, NodeCache
+
+
+class FakeCollection:
+    """Local Mongo stand-in: records every find() call."""
+
+    def __init__(self, rows):
+        self.rows = {r["_id"]: r for r in rows}
+        self.calls = []
+
+    def find(self, filter, projection=None):
+        self.calls.append((filter, projection))
+        ids = filter["_id"]["$in"]
+        for i in ids:
+            if i in self.rows:
+                row = self.rows[i]
+                yield {k: v for k, v in row.items() if k == "_id" or k in projection}
+
+
+class FakeIndex:
+    def __init__(self, ids):
+        self.ids = ids
+
+    def search(self, vec, k):
+        ids = (self.ids + [-1] * k)[:k]
+        return np.zeros((1, k), dtype="float32"), np.array([ids])
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return [0.0, 1.0]
+
+
+def make_retriever(ids, rows, cache=None):
+    collection = FakeCollection(rows)
+    client = {"llama_index": {"docstore": collection}}
+    retriever = LlamaIndexSplitRetriever(FakeIndex(ids), FakeEmbeddings(), client, k=3, cache=cache)
+    return retriever, collection
+
+
+ROWS = [
+    {"_id": 0, "text": "zero", "metadata": {"n": 0}, "embedding": [1] * 100},
+    {"_id": 1, "text": "one", "metadata": {"n": 1}, "embedding": [1] * 100},
+    {"_id": 2, "text": "two", "metadata": {"n": 2}, "embedding": [1] * 100},
+]
+
+
+def test_single_batched_query_with_projection_in_faiss_order():
+    retriever, collection = make_retriever([2, 0], ROWS)
+    docs = retriever.get_relevant_docs("q")
+    assert [d.page_content for d in docs] == ["two", "zero"]
+    assert len(collection.calls) == 1
+    filter, projection = collection.calls[0]
+    assert filter == {"_id": {"$in": [2, 0]}}
+    assert projection == {"text": 1, "metadata": 1}
+
+
+def test_fetch_docs_reuses_one_search():
+    retriever, collection = make_retriever([2, 0], ROWS)
+    ids, distances = retriever.search_ids("q")
+    docs = retriever.fetch_docs(ids)
+    assert ids == [2, 0] and len(distances) == 2
+    assert [d.page_content for d in docs] == ["two", "zero"]
+    assert len(collection.calls) == 1
+
+
+def test_cache_serves_repeat_queries():
+    retriever, collection = make_retriever([1, 2], ROWS)
+    retriever.get_relevant_docs("q")
+    retriever.get_relevant_docs("q")
+    assert len(collection.calls) == 1
+    assert retriever.cache.hits == 2
+
+
+def test_cache_is_bounded():
+    cache = NodeCache(maxsize=2)
+    cache.put_many({1: "a", 2: "b"})
+    cache.get_many([1])
+    cache.put_many({3: "c"})
+    assert set(cache.get_many([1, 2, 3])) == {1, 3}
+
+
+def test_sqlite_node_source(tmp_path):
+    pytest.importorskip("llama_index.core")
+    from llama_index.core.data_structs.data_structs import IndexDict
+    from llama_index.core.schema import TextNode
+    from mongo_retriever import make_retriever
+    from sqlite_docstore import make_stores
+
+    docstore, index_store = make_stores("sqlite", path=tmp_path / "docstore.db")
+    nodes = [TextNode(text=t, id_=f"n{i}") for i, t in enumerate(["zero", "one", "two"])]
+    docstore.add_documents(nodes)
+    struct = IndexDict()
+    for i, node in enumerate(nodes):
+        struct.add_node(node, text_id=str(i))
+    index_store.add_index_struct(struct)
+
+    retriever = make_retriever(FakeIndex([2, 0]), FakeEmbeddings(), k=3, backend="sqlite",
+                               docstore_path=tmp_path / "docstore.db")
+    assert [d.page_content for d in retriever.get_relevant_docs("q")] == ["two", "zero"]
+    retriever.get_relevant_docs("q")
+    assert retriever.cache.hits == 2
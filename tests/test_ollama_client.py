@@ -0,0 +1,129 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import ollama_client
+from ollama_client import OllamaClient, _backoff
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(ollama_client, "BACKOFF_BASE", 0.0)
+
+
+def scripted(statuses, calls):
+    """MockTransport answering with the given statuses in order, then 200."""
+    def handler(request):
+        calls.append(request.url.path)
+        status = statuses[len(calls) - 1] if len(calls) <= len(statuses) else 200
+        if status == "connect":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(status, json={"response": f"call {len(calls)}"})
+    return httpx.MockTransport(handler)
+
+
+def test_backoff_is_full_jitter(monkeypatch):
+    monkeypatch.setattr(ollama_client, "BACKOFF_BASE", 0.25)
+    for attempt in range(4):
+        waits = [_backoff(attempt) for _ in range(200)]
+        assert 0 <= min(waits) and max(waits) <= 0.25 * 2 ** attempt
+        assert max(waits) > 0.25 * 2 ** attempt / 2          # spread, not a fixed delay
+
+
+def test_retries_transient_errors_then_succeeds():
+    calls = []
+    client = OllamaClient(base_url="http://ollama", inner=scripted([503, "connect", 429], calls))
+    assert client.generate("m", "hi") == "call 4"
+    assert len(calls) == 4
+    client.close()
+
+
+def test_gives_up_after_retries():
+    calls = []
+    client = OllamaClient(base_url="http://ollama", retries=2, inner=scripted([500] * 10, calls))
+    with pytest.raises(httpx.HTTPStatusError):
+        client.generate("m", "hi")
+    assert len(calls) == 3
+
+    calls.clear()
+    client = OllamaClient(base_url="http://ollama", retries=1, inner=scripted(["connect"] * 10, calls))
+    with pytest.raises(httpx.ConnectError):
+        client.generate("m", "hi")
+    assert len(calls) == 2
+
+    calls.clear()
+    client = OllamaClient(base_url="http://ollama", retries=0, inner=scripted([503] * 10, calls))
+    with pytest.raises(httpx.HTTPStatusError):
+        client.generate("m", "hi")
+    assert len(calls) == 1
+
+
+def test_no_retry_on_client_errors():
+    calls = []
+    client = OllamaClient(base_url="http://ollama", inner=scripted([404], calls))
+    with pytest.raises(httpx.HTTPStatusError):
+        client.generate("m", "hi")
+    assert len(calls) == 1
+
+
+def test_sync_concurrency_cap():
+    lock, state = threading.Lock(), {"now": 0, "peak": 0}
+
+    def handler(request):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.02)
+        with lock:
+            state["now"] -= 1
+        return httpx.Response(200, json={"response": "ok"})
+
+    client = OllamaClient(base_url="http://ollama", max_concurrency=2, inner=httpx.MockTransport(handler))
+    threads = [threading.Thread(target=client.generate, args=("m", "hi")) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert state["peak"] == 2
+    client.close()
+
+
+def test_async_cap_and_several_event_loops():
+    state = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        state["now"] += 1
+        state["peak"] = max(state["peak"], state["now"])
+        await asyncio.sleep(0.01)
+        state["now"] -= 1
+        return httpx.Response(200, json={"response": "ok"})
+
+    client = OllamaClient(base_url="http://ollama", max_concurrency=3,
+                          async_inner=httpx.MockTransport(handler))
+
+    async def burst():
+        return await asyncio.gather(*(client.agenerate("m", "hi") for _ in range(9)))
+
+    assert asyncio.run(burst()) == ["ok"] * 9
+    assert asyncio.run(burst()) == ["ok"] * 9            # a second loop must work too
+    assert state["peak"] == 3
+    asyncio.run(client.aclose())
+
+
+def test_wrapper_timeout_is_kept():
+    class LlamaWrapper:
+        request_timeout = 12000.0
+
+    class LangChainWrapper:
+        timeout = 30
+
+    assert ollama_client.wrapper_timeout(LlamaWrapper()).read == 12000.0
+    assert ollama_client.wrapper_timeout(LangChainWrapper()).read == 30.0
+    assert ollama_client.wrapper_timeout(object()) == ollama_client.TIMEOUT
@@ -0,0 +1,94 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "benchmarks"))
+import ollama_replay
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Upstream stand-in: embeds a text as [len, first char code]; chat streams two lines."""
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append((self.path, payload))
+        if self.path == "/api/embed":
+            texts = [payload["input"]] if isinstance(payload["input"], str) else payload["input"]
+            body, content_type = json.dumps({"model": payload["model"],
+                                             "embeddings": [[len(t), ord(t[0])] for t in texts]}), "application/json"
+        else:
+            body = "".join(json.dumps({"message": {"content": w}, "done": w == "!"}) + "\n" for w in ("hi", "!"))
+            content_type = "application/x-ndjson"
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+@pytest.fixture
+def upstream():
+    FakeOllama.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    yield start(server)
+    server.shutdown()
+
+
+@pytest.fixture
+def run(tmp_path):
+    servers = []
+
+    def run(mode, upstream=None):
+        server = ollama_replay.serve(mode, tmp_path / "fx.jsonl", port=0, latency_scale=0,
+                                     upstream=upstream or ollama_replay.UPSTREAM)
+        servers.append(server)
+        return httpx.Client(base_url=start(server), timeout=5)
+
+    yield run
+    for server in servers:
+        server.shutdown()
+
+
+def embed(client, inputs):
+    return client.post("/api/embed", json={"model": "m", "input": inputs, "keep_alive": "5m"})
+
+
+def test_embed_batches_replay_in_any_grouping(upstream, run):
+    recorder = run("record", upstream)
+    assert embed(recorder, ["ab", "c"]).json()["embeddings"] == [[2, 97], [1, 99]]
+    assert embed(recorder, "xyz").json()["embeddings"] == [[3, 120]]
+
+    replayer = run("replay")
+    assert embed(replayer, ["c", "xyz", "ab"]).json() == {"model": "m", "embeddings": [[1, 99], [3, 120], [2, 97]]}
+    assert embed(replayer, "c").json()["embeddings"] == [[1, 99]]
+    r = embed(replayer, ["c", "new"])
+    assert r.status_code == 404 and "1 of 2" in r.json()["error"]
+    assert len(FakeOllama.requests) == 2              # replay never reaches upstream
+
+
+def test_streamed_chat_round_trip(upstream, run):
+    request = {"model": "m", "messages": [{"role": "user", "content": "hello"}], "stream": True}
+    with run("record", upstream).stream("POST", "/api/chat", json=request) as r:
+        recorded = [json.loads(line) for line in r.iter_lines() if line]
+
+    with run("replay").stream("POST", "/api/chat", json={**request, "keep_alive": -1}) as r:
+        assert r.headers["content-type"] == "application/x-ndjson"
+        assert [json.loads(line) for line in r.iter_lines() if line] == recorded
+    assert [part["message"]["content"] for part in recorded] == ["hi", "!"]
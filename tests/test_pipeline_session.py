@@ -0,0 +1,59 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+pipeline = importlib.import_module("05_pipeline")
+
+GROUPED = {"Sequence": {"getSelection": {"details": "selected clips", "example": "seq.getSelection()"},
+                        "setPlayerPosition": {"details": "move the playhead"}},
+           "Encoder": {"startBatch": {"details": "start the render queue"}}}
+
+
+class FakeModel:
+    """One-hot 'embeddings' by keyword; counts encode() calls."""
+    WORDS = ("clip", "playhead", "render")
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, convert_to_numpy=True):
+        self.calls += 1
+        single = isinstance(texts, str)
+        rows = [[float(w in t) for w in self.WORDS] for t in ([texts] if single else texts)]
+        return np.asarray(rows[0] if single else rows, dtype="float32")
+
+
+def make_session(tmp_path):
+    docs_path = tmp_path / "grouped.json"
+    docs_path.write_text(json.dumps(GROUPED))
+    session = pipeline.PipelineSession(docs_path=docs_path)
+    index = faiss.IndexFlatIP(3)
+    index.add(np.eye(3, dtype="float32"))
+    model = FakeModel()
+    session._loaders.update(model=lambda: model, index=lambda: index)
+    return session, model
+
+
+def test_docs_snapshot(tmp_path):
+    docs_path = tmp_path / "grouped.json"
+    docs_path.write_text(json.dumps(GROUPED))
+    snapshot = tmp_path / "grouped.docs.pickle"
+    docs = pipeline.load_docs_cached(docs_path, snapshot)
+    assert snapshot.exists()
+    assert pipeline.load_docs_cached(docs_path, snapshot) == docs == pipeline.load_docs(docs_path)
+
+
+def test_many_queries_one_forward_pass(tmp_path):
+    session, model = make_session(tmp_path)
+    batch = session.find_relevant_tools_many(["selected clip", "move playhead", "render"], top_k=1,
+                                             threshold=0.5)
+    assert model.calls == 1
+    assert [hits[0]["tool"] for hits in batch] == ["getSelection", "setPlayerPosition", "startBatch"]
+    assert session.find_relevant_tools("move playhead", top_k=1, threshold=0.5) == batch[1]
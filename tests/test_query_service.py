@@ -0,0 +1,175 @@
+import asyncio
+import importlib
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+service = importlib.import_module("07_query_service")
+
+
+async def exchange(raw: bytes) -> list[bytes]:
+    """Send raw bytes to serve_connection, return every response until close."""
+    server = await asyncio.start_server(lambda r, w: service.serve_connection(None, r, w), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+    return [part for part in data.split(b"HTTP/1.1 ") if part]
+
+
+@pytest.fixture
+def echo(monkeypatch):
+    async def handle(state, method, path, body):
+        return 200, {"path": path, "body": body}
+    monkeypatch.setattr(service, "handle", handle)
+
+
+def request(body: bytes, length=None, connection="keep-alive") -> bytes:
+    length = len(body) if length is None else length
+    return (f"POST /echo HTTP/1.1\r\nContent-Length: {length}\r\nConnection: {connection}\r\n\r\n"
+            .encode() + body)
+
+
+def test_keep_alive_requests(echo):
+    responses = asyncio.run(exchange(request(b'{"a": 1}') + request(b'{"b": 2}', connection="close")))
+    assert [r.split(b"\r\n", 1)[0] for r in responses] == [b"200 OK", b"200 OK"]
+    assert json.loads(responses[1].split(b"\r\n\r\n", 1)[1]) == {"path": "/echo", "body": {"b": 2}}
+
+
+def test_oversized_body_is_rejected_and_closed(echo):
+    # header only: the server must answer without reading (or parsing) the body
+    responses = asyncio.run(exchange(request(b'{"next": "request"}', length=service.MAX_BODY + 1)))
+    assert len(responses) == 1
+    assert responses[0].startswith(b"413 ") and b"Connection: close" in responses[0]
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_invalid_content_length(echo, length):
+    responses = asyncio.run(exchange(request(b"{}", length=length)))
+    assert len(responses) == 1 and responses[0].startswith(b"400 ")
+
+
+def test_rag_sources_are_only_packed_hits():
+    class Searcher:
+        def relevant_apis(self, question, max_k):
+            hit = {"full_signature": "Sequence.getSelection()", "description": "selected clips", "details": ""}
+            return [hit, dict(hit), {"full_signature": "Encoder.startBatch()", "description": "render",
+                                     "details": ""}]
+
+    class Completion:
+        text = " answer "
+
+    class LLM:
+        def complete(self, prompt):
+            return Completion()
+
+    class RagGeneration:
+        searcher = Searcher()
+        llm = LLM()
+
+    result = service.rag_answer(RagGeneration(), "selected clips")
+    assert result == {"answer": "answer", "sources": ["Sequence.getSelection()", "Encoder.startBatch()"]}
+
+
+class Closable:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeGeneration(Closable):
+    def __init__(self, bundle_path, number=1):
+        self.bundle_path = bundle_path
+        self.number = number
+        self.in_flight = 0
+        self.retired = False
+
+
+def test_failed_generation_closes_what_it_opened(monkeypatch):
+    embedder = Closable()
+    monkeypatch.setattr(service, "published_bundle", lambda: "/bundles/broken")
+    monkeypatch.setattr(service, "llama_index_embedding", lambda *a, **kw: None)
+    monkeypatch.setattr(service.EmbeddingBatcher, "for_llama_index", staticmethod(lambda emb: embedder))
+
+    def broken(path, emb=None):
+        raise ValueError("bad bundle")
+    monkeypatch.setattr(service.qe.DocSearcher, "from_bundle", staticmethod(broken))
+    with pytest.raises(ValueError):
+        service.Generation(1)
+    assert embedder.closed
+
+
+def test_watch_does_not_retry_a_failed_bundle(monkeypatch):
+    state = service.ServiceState()
+    state.current = FakeGeneration("/bundles/a")
+    published = ["/bundles/b"]
+    attempts = []
+
+    async def load():
+        attempts.append(published[0])
+        raise ValueError("bad bundle")
+    monkeypatch.setattr(state, "load", load)
+    monkeypatch.setattr(service, "WATCH_EVERY", 0.001)
+    monkeypatch.setattr(service, "published_bundle", lambda: published[0])
+
+    async def watch(seconds):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(state.watch_bundle(), seconds)
+
+    asyncio.run(watch(0.05))
+    assert attempts == ["/bundles/b"]
+    published[0] = "/bundles/c"               # a new publish is tried again
+    asyncio.run(watch(0.05))
+    assert attempts == ["/bundles/b", "/bundles/c"]
+    state.pool.shutdown()
+
+
+def test_reload_skips_shards_that_fail_to_open(monkeypatch):
+    searcher = Closable()
+    searcher.symbols = searcher.filters = searcher.graph = None
+    monkeypatch.setattr(service, "published_bundle", lambda: "/bundles/a")
+    monkeypatch.setattr(service, "llama_index_embedding", lambda *a, **kw: None)
+    monkeypatch.setattr(service, "llama_index_llm", lambda *a, **kw: None)
+    monkeypatch.setattr(service.EmbeddingBatcher, "for_llama_index", staticmethod(lambda emb: Closable()))
+    monkeypatch.setattr(service.qe.DocSearcher, "from_bundle", staticmethod(lambda path, emb=None: searcher))
+
+    def load(self, corpus, version=None):
+        if corpus == "premiere-pro":
+            raise ValueError("Bundle was built with all-minilm (384d)")
+        self.shards[(corpus, version)] = None
+    monkeypatch.setattr(service.ShardSet, "load", load)
+
+    gen = service.Generation(2, [("premiere-pro", "latest"), ("extendscript", "2024")])
+    assert list(gen.shards.shards) == [("extendscript", "2024")]
+    gen.shards.shards.clear()
+    gen.close()
+    assert searcher.closed
+
+
+def test_malformed_request_line_is_rejected(echo):
+    responses = asyncio.run(exchange(b"GARBAGE\r\n\r\n"))
+    assert len(responses) == 1 and responses[0].startswith(b"400 ")
+
+
+def test_retired_generation_is_closed_off_the_loop():
+    state = service.ServiceState()
+    old = state.current = FakeGeneration("/bundles/a")
+    closed_on = []
+    old.close = lambda: closed_on.append(threading.current_thread())
+
+    async def finish_request():
+        async with state.acquire():
+            old.retired = True
+    asyncio.run(finish_request())
+    assert closed_on and closed_on[0] is not threading.main_thread()
+    state.pool.shutdown()
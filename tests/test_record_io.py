@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from record_io import GROUPED_SCHEMA, RecordSink, find_export, iter_records
+
+ROWS = [
+    {"section": "app", "name": "project", "details": "Current project", "example": "app.project"},
+    {"section": "app", "name": "version", "details": "Version string", "example": "", "extra": 1},
+    {"section": "Sequence", "name": "getPlayerPosition", "details": "Playhead", "example": None},
+]
+
+
+def test_jsonl_round_trip_projects_columns(tmp_path):
+    with RecordSink(tmp_path / "grouped", GROUPED_SCHEMA, parquet=False) as sink:
+        sink.write(ROWS[:2])
+        sink.write(ROWS[2:])
+
+    path = find_export(tmp_path / "grouped")
+    assert path.name == "grouped.jsonl.gz"
+    assert sink.count == 3
+
+    rows = list(iter_records(path, columns=("name", "details")))
+    assert rows == [{"name": r["name"], "details": r["details"]} for r in ROWS]
+
+    full = list(iter_records(path))
+    assert "extra" not in full[1]
+    assert full[0]["returns"] is None
+
+
+def test_failed_write_leaves_no_file(tmp_path):
+    with pytest.raises(RuntimeError):
+        with RecordSink(tmp_path / "grouped", GROUPED_SCHEMA, parquet=False) as sink:
+            sink.write(ROWS)
+            raise RuntimeError("build failed")
+    assert find_export(tmp_path / "grouped") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    with RecordSink(tmp_path / "grouped", GROUPED_SCHEMA) as sink:
+        sink.write(ROWS)
+
+    path = find_export(tmp_path / "grouped")
+    assert path.suffix == ".parquet"
+    rows = list(iter_records(path, columns=("section", "name")))
+    assert rows == [{"section": r["section"], "name": r["name"]} for r in ROWS]
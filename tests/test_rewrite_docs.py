@@ -0,0 +1,76 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app import rewrite_docs
+
+
+class FakeClient:
+    """chat() answers "natural: <input>"; `failures[text]` failures first."""
+
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.calls = []
+
+    def chat(self, model, messages, options=None):
+        text = messages[-1]["content"].split("\n\n")[1]
+        self.calls.append(text)
+        if self.failures.get(text, 0):
+            self.failures[text] -= 1
+            raise ConnectionError("ollama down")
+        return f"natural: {text}"
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(rewrite_docs.time, "sleep", lambda s: None)
+    src, out = tmp_path / "docs", tmp_path / "out"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.txt").write_text("doc a")
+    (src / "sub" / "b.txt").write_text("doc b")
+    return src, out
+
+
+def run(dirs, client, force=False):
+    return rewrite_docs.process_folder_bulk(str(dirs[0]), str(dirs[1]), workers=2, force=force,
+                                            client=client)
+
+
+def test_manifest_skips_unchanged_and_force_rewrites(dirs):
+    src, out = dirs
+    client = FakeClient()
+    assert run(dirs, client)["rewritten"] == 2
+    assert (out / "sub" / "b.txt").read_text() == "natural: doc b"
+    assert not (out / rewrite_docs.JOURNAL_NAME).exists()          # folded into the manifest
+    assert set(json.loads((out / rewrite_docs.MANIFEST_NAME).read_text())) == {"a.txt", "sub/b.txt"}
+
+    (src / "a.txt").write_text("doc a, edited")
+    report = run(dirs, client)
+    assert (report["rewritten"], report["skipped_unchanged"]) == (1, 1)
+    assert client.calls[-1] == "doc a, edited"
+    assert run(dirs, client, force=True)["rewritten"] == 2
+
+
+def test_resumes_from_the_journal_of_an_interrupted_run(dirs):
+    src, out = dirs
+    out.mkdir()
+    (out / "a.txt").write_text("natural: doc a")
+    entry = {"file": "a.txt", "sha256": rewrite_docs.content_hash("doc a"), "model": rewrite_docs.MODEL_NAME}
+    (out / rewrite_docs.JOURNAL_NAME).write_text(json.dumps(entry) + '\n{"file": "sub/b.t')   # torn line
+    client = FakeClient()
+    assert run(dirs, client)["skipped_unchanged"] == 1
+    assert client.calls == ["doc b"]
+
+
+def test_retries_then_reports_failures(dirs):
+    src, out = dirs
+    client = FakeClient({"doc a": 1, "doc b": 99})
+    report = run(dirs, client)
+    assert report["rewritten"] == 1 and list(report["failed"]) == ["sub/b.txt"]
+    assert client.calls.count("doc b") == rewrite_docs.BULK_RETRIES + 1
+    assert not (out / "sub" / "b.txt").exists()
+    assert json.loads((out / rewrite_docs.REPORT_NAME).read_text())["failed"] == report["failed"]
+    assert "sub/b.txt" not in json.loads((out / rewrite_docs.MANIFEST_NAME).read_text())
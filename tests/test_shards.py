@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from index_bundle import open_bundle, write_bundle
+from shards import ShardSet, latest_version, list_shards, publish_shard, shard_root
+
+
+class FixedEmbedder:
+    def __init__(self, vec):
+        self.vec = vec
+
+    def get_text_embedding(self, text):
+        return self.vec
+
+
+def add_shard(root, corpus, version, vectors, names):
+    rows = [{"item_name": n} for n in names]
+    path = write_bundle(np.asarray(vectors, dtype="float32"), rows, embed_model="test",
+                        root=shard_root(corpus, version, root))
+    publish_shard(path, corpus, version, root)
+
+
+def test_scatter_gather_merges_across_shards(tmp_path):
+    add_shard(tmp_path, "premiere-pro", "25.0", [[0, 0], [3, 3]], ["a0", "a3"])
+    add_shard(tmp_path, "premiere-pro", "25.1", [[9, 9]], ["new"])
+    add_shard(tmp_path, "extendscript", "2024", [[1, 1], [2, 2]], ["b1", "b2"])
+    assert latest_version("premiere-pro", tmp_path) == "25.1"
+    assert len(list_shards(tmp_path)) == 3
+
+    shards = ShardSet(FixedEmbedder([0.9, 0.9]), embed_model="test", root=tmp_path)
+    hits = shards.search("q", k=3, corpora=["premiere-pro@25.0", "extendscript"])
+    assert [h["item_name"] for h in hits] == ["b1", "a0", "b2"]
+    assert [h["corpus"] for h in hits] == ["extendscript", "premiere-pro", "extendscript"]
+
+    assert shards.unload("extendscript") == [("extendscript", "2024")]
+    assert [h["item_name"] for h in shards.search("q", k=3)] == ["a0", "a3"]
+    shards.close()
+
+
+def test_load_refuses_other_embedding_model(tmp_path):
+    add_shard(tmp_path, "premiere-pro", "25.0", [[0, 0]], ["a0"])
+    shards = ShardSet(FixedEmbedder([0, 0]), embed_model="other-model", root=tmp_path)
+    with pytest.raises(ValueError):
+        shards.load("premiere-pro")
+    shards.close()
+
+
+def test_tombstone_rows_are_skipped(tmp_path):
+    vectors = np.asarray([[0, 0], [1, 1], [2, 2]], dtype="float32")
+    path = write_bundle(vectors, [{"item_name": "a0"}, None, {"item_name": "a2"}],
+                        embed_model="test", root=shard_root("premiere-pro", "25.0", tmp_path))
+    bundle = open_bundle(path)
+    assert bundle.row(1) is None
+    assert [(i, r["item_name"]) for i, r in bundle.rows()] == [(0, "a0"), (2, "a2")]
+
+    publish_shard(path, "premiere-pro", "25.0", tmp_path)
+    shards = ShardSet(FixedEmbedder([1.2, 1.2]), embed_model="test", root=tmp_path)   # tombstone is nearest
+    assert [h["item_name"] for h in shards.search("q", k=3, corpora=["premiere-pro"])] == ["a2", "a0"]
+    shards.close()
+
+
+def test_write_bundle_rejects_empty_build(tmp_path):
+    with pytest.raises(ValueError, match="Nothing to bundle"):
+        write_bundle(np.zeros((0,), dtype="float32"), [], embed_model="test", root=tmp_path)
+
+
+def test_load_checks_the_embedder_dimension(tmp_path):
+    add_shard(tmp_path, "premiere-pro", "25.0", [[0, 0]], ["a0"])
+    shards = ShardSet(FixedEmbedder([0, 0, 0]), embed_model="test", root=tmp_path)
+    with pytest.raises(ValueError, match="3d"):
+        shards.load("premiere-pro")
+    shards.close()
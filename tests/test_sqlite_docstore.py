@@ -0,0 +1,151 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import sqlite_docstore
+from sqlite_docstore import (SqliteDocumentStore, SqliteKVStore, SqliteNodeSource,
+                             make_staging_stores, make_stores, promote_stores)
+
+
+def test_kv_round_trip(tmp_path):
+    kv = SqliteKVStore(tmp_path / "kv.db")
+    kv.put("a", {"v": 1})
+    kv.put("a", {"v": 2}, collection="other")
+    assert kv.get("a") == {"v": 1} and kv.get("a", collection="other") == {"v": 2}
+    assert kv.get("missing") is None
+
+    kv.put_all([(f"k{i}", {"i": i}) for i in range(5)], collection="bulk", batch_size=2)
+    assert kv.get_all("bulk") == {f"k{i}": {"i": i} for i in range(5)}
+    assert kv.delete("k1", collection="bulk") and not kv.delete("k1", collection="bulk")
+    assert set(kv.get_all("bulk")) == {"k0", "k2", "k3", "k4"}
+    kv.close()
+
+
+def test_put_all_batches_share_one_transaction(tmp_path):
+    kv = SqliteKVStore(tmp_path / "kv.db")
+    pairs = [("a", {"ok": 1}), ("b", {"ok": 2}), ("c", {"bad": object()})]   # 3rd fails in batch 2
+    with pytest.raises(TypeError):
+        kv.put_all(pairs, batch_size=2)
+    assert kv.get_all() == {}                                   # batch 1 rolled back too
+    kv.close()
+
+
+def test_get_many_spans_parameter_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_docstore, "SQLITE_MAX_VARS", 3)
+    kv = SqliteKVStore(tmp_path / "kv.db")
+    kv.put_all([(str(i), {"i": i}) for i in range(10)])
+    assert kv.get_many(["9", "0", "4", "0", "nope", "7"]) == {"9": {"i": 9}, "0": {"i": 0},
+                                                               "4": {"i": 4}, "7": {"i": 7}}
+    kv.close()
+
+
+def nodes_and_struct():
+    from llama_index.core.data_structs.data_structs import IndexDict
+    from llama_index.core.schema import TextNode
+    nodes = [TextNode(text=f"node {i}", id_=f"n{i}", metadata={"i": i}) for i in range(3)]
+    struct = IndexDict()
+    for i, node in enumerate(nodes):
+        struct.add_node(node, text_id=str(i))           # FAISS id -> node id, as FaissVectorStore does
+    return nodes, struct
+
+
+def test_docstore_nodes_and_faiss_lookup(tmp_path):
+    nodes, struct = nodes_and_struct()
+    docstore, index_store = make_stores("sqlite", path=tmp_path / "docstore.db")
+    docstore.add_documents(nodes)
+    index_store.add_index_struct(struct)
+
+    assert [n.text for n in docstore.get_nodes(["n2", "n0"])] == ["node 2", "node 0"]
+    assert docstore.get_nodes(["n1", "zz"], raise_error=False)[0].metadata == {"i": 1}
+
+    source = SqliteNodeSource(tmp_path / "docstore.db")
+    assert source.find_nodes([2, 0, 99]) == {2: {"text": "node 2", "metadata": {"i": 2}},
+                                             0: {"text": "node 0", "metadata": {"i": 0}}}
+
+
+@pytest.fixture
+def generations(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sqlite_docstore, "DOCSTORE_PATH", Path("embeddings/docstore.db"))
+    monkeypatch.setattr(sqlite_docstore, "DOCSTORE_GENERATIONS", Path("embeddings/docstores"))
+    return Path("embeddings/docstores")
+
+
+def test_staging_promote_round_trip(generations):
+    nodes, _ = nodes_and_struct()
+
+    for text in ("first", "second"):
+        location, (docstore, _) = make_staging_stores("sqlite")
+        nodes[0].text = text
+        docstore.add_documents([nodes[0]])
+        (location / "faiss.index").write_text(text)
+        promote_stores(location, "sqlite", links={"faiss.index": Path("embeddings/faiss.index")})
+        live, _ = make_stores("sqlite", path=sqlite_docstore.DOCSTORE_PATH)
+        assert live.get_node("n0").text == text
+        # docstore and FAISS file come from the same generation
+        assert Path("embeddings/faiss.index").read_text() == text
+        assert os.path.realpath(sqlite_docstore.DOCSTORE_PATH) == os.path.realpath(location / "docstore.db")
+        assert os.readlink(sqlite_docstore.DOCSTORE_PATH) == os.path.join("docstores", "current", "docstore.db")
+
+
+def test_unpromoted_staging_leaves_live_untouched(generations):
+    nodes, _ = nodes_and_struct()
+    location, (docstore, _) = make_staging_stores("sqlite")
+    docstore.add_documents([nodes[0]])
+    promote_stores(location, "sqlite")
+
+    staging, (rejected, _) = make_staging_stores("sqlite")      # e.g. failed validation
+    nodes[0].text = "rejected"
+    rejected.add_documents([nodes[0]])
+    live, _ = make_stores("sqlite", path=sqlite_docstore.DOCSTORE_PATH)
+    assert live.get_node("n0").text == "node 0"
+    assert (generations / "current").resolve() == location.resolve()
+
+
+def test_legacy_docstore_file_is_moved_aside(generations):
+    generations.mkdir(parents=True)
+    Path("embeddings/docstore.db").write_text("legacy")
+    location, _ = make_staging_stores("sqlite")
+    promote_stores(location, "sqlite")
+    assert sqlite_docstore.DOCSTORE_PATH.is_symlink()
+    assert [p.read_text() for p in Path("embeddings").glob(".docstore.db.pre-bluegreen-*")] == ["legacy"]
+
+
+def test_promote_keeps_previous_and_open_generations(generations, monkeypatch):
+    monkeypatch.setattr(sqlite_docstore, "KEEP_DOCSTORES", 1)
+    dirs = [generations / f"{i}" for i in range(5)]
+    stores = [SqliteKVStore(path / "docstore.db") for path in dirs]
+    for kv in stores[1:]:
+        kv.close()
+    assert sqlite_docstore.in_use(dirs[0] / "docstore.db")
+    assert not sqlite_docstore.in_use(dirs[1] / "docstore.db")
+
+    promote_stores(dirs[2], "sqlite")
+    promote_stores(dirs[4], "sqlite")
+    # 0 is still open, 1 and 3 are closed and old, 2 is the previous generation, 4 is live
+    assert [p.exists() for p in dirs] == [True, False, True, False, True]
+    assert stores[0].get("missing") is None          # the open connection still reads
+    stores[0].close()
+
+
+def test_mongo_generations_share_the_pointer(generations, monkeypatch):
+    dropped = []
+    monkeypatch.setattr(sqlite_docstore, "reset_stores",
+                        lambda backend, db_name=None, **kw: dropped.append(db_name))
+    monkeypatch.setattr(sqlite_docstore, "KEEP_DOCSTORES", 1)
+    locations = [sqlite_docstore.staging_location("mongo") for _ in range(3)]
+    names = [(p / "mongo_db").read_text() for p in locations]
+    assert all(n.startswith("llama_index_") and "." not in n for n in names)
+    assert dropped == names                          # each staging database starts empty
+
+    assert sqlite_docstore.live_mongo_db() == "llama_index"      # nothing promoted yet
+    for location in locations:
+        promote_stores(location, "mongo")
+    assert sqlite_docstore.live_mongo_db() == names[2]
+    assert dropped[3:] == [names[0]]                 # pruned; names[1] was the previous one
+    assert not sqlite_docstore.DOCSTORE_PATH.exists()
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from symbol_index import SymbolIndex, looks_like_symbol
+
+ROWS = [
+    (0, "Encoder", "startBatch", "Encoder.startBatch()"),
+    (1, "Encoder", "launchEncoder", "Encoder.launchEncoder()"),
+    (2, "Project", "activeSequence", "Project.activeSequence"),
+    (3, "Sequence", "getPlayerPosition", "Sequence.getPlayerPosition()"),
+    (4, "Sequence", "setPlayerPosition", "Sequence.setPlayerPosition(newTime)"),
+]
+
+
+def test_query_shape():
+    assert looks_like_symbol("Encoder.startBatch()")
+    assert looks_like_symbol("app.project.activeSequence")
+    assert looks_like_symbol("getPlayerPosition")
+    assert not looks_like_symbol("get selected clips")
+    assert not looks_like_symbol("crop the image by 20px")
+    assert not looks_like_symbol("Sequence")
+
+
+def test_lookup_tiers():
+    index = SymbolIndex.from_rows(ROWS)
+    assert index.lookup("encoder.STARTBATCH()") == [(0, 1.0, "exact")]
+    assert index.lookup("Sequence.setPlayerPosition(ticks)") == [(4, 1.0, "exact")]
+    assert index.lookup("app.project.activeSequence") == [(2, 0.95, "suffix")]
+    assert [h[0] for h in index.lookup("Sequence.get")] == [3]
+    assert index.lookup("Encoder.startBach")[0][:1] == (0,)
+    assert index.lookup("Encoder.startBach")[0][2] == "fuzzy"
+    assert index.lookup("Timeline.nothingLikeThis") == []
+
+
+def test_save_load_round_trip(tmp_path):
+    index = SymbolIndex.from_rows(ROWS)
+    index.save(tmp_path / "symbols.json")
+    loaded = SymbolIndex.load(tmp_path / "symbols.json")
+    assert loaded.entries == index.entries
+    assert loaded.lookup("launchEncoder") == [(1, 1.0, "exact")]
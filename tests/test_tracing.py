@@ -0,0 +1,103 @@
+import contextvars
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+import tracing
+from tracing import span, start_span
+
+
+@pytest.fixture
+def records(monkeypatch):
+    exported = []
+    monkeypatch.setattr(tracing, "_export", exported.append)
+    return exported
+
+
+def by_name(records):
+    return {r["name"]: r for r in records}
+
+
+def test_spans_nest_and_share_a_trace(records):
+    with span("outer") as s:
+        with span("inner", k=5) as inner:
+            inner["hits"] = 3
+        s["done"] = True
+    with span("next"):
+        pass
+
+    r = by_name(records)
+    assert r["inner"]["parent_id"] == r["outer"]["span_id"]
+    assert r["inner"]["trace_id"] == r["outer"]["trace_id"]
+    assert r["outer"]["parent_id"] is None
+    assert r["next"]["trace_id"] != r["outer"]["trace_id"]      # a new root, a new trace
+    assert r["inner"]["attrs"] == {"k": 5, "hits": 3}
+    assert [x["name"] for x in records] == ["inner", "outer", "next"]
+
+
+def test_context_propagates_into_pool_threads(records):
+    def work(i):
+        with span("work", i=i):
+            pass
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        with span("request"):
+            futures = [pool.submit(contextvars.copy_context().run, work, i) for i in range(4)]
+            for f in futures:
+                f.result()
+        # without the copied context a worker starts its own trace
+        pool.submit(work, 99).result()
+
+    request = by_name(records)["request"]
+    workers = [r for r in records if r["name"] == "work"]
+    assert sorted(r["attrs"]["i"] for r in workers if r["parent_id"] == request["span_id"]) == [0, 1, 2, 3]
+    orphan = next(r for r in workers if r["attrs"]["i"] == 99)
+    assert orphan["parent_id"] is None and orphan["trace_id"] != request["trace_id"]
+
+
+def test_errors_are_recorded_and_reraised(records):
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+    assert records[0]["error"] == "ValueError('boom')"
+    with span("after"):
+        pass
+    assert records[1]["parent_id"] is None                       # the failed span is no longer current
+
+
+def test_start_span_is_detached(records):
+    with span("parent"):
+        s = start_span("stream", model="m")
+        with span("sibling"):
+            pass
+    s.attrs["steps"] = 2
+    s.finish()
+
+    r = by_name(records)
+    assert r["stream"]["parent_id"] == r["parent"]["span_id"]
+    assert r["sibling"]["parent_id"] == r["parent"]["span_id"]    # not nested under the stream
+    assert r["stream"]["attrs"] == {"model": "m", "steps": 2}
+
+
+def test_metrics_aggregate_per_name(records):
+    before = tracing.metrics().get("aggregated", {}).get("count", 0)
+    for _ in range(10):
+        with span("aggregated"):
+            pass
+    summary = tracing.metrics()["aggregated"]
+    assert summary["count"] == before + 10
+    assert sum(summary["buckets"].values()) == summary["count"]
+    assert summary["p50_ms"] <= summary["p99_ms"]
+
+
+def test_histogram_quantiles():
+    h = tracing.Histogram()
+    for ms in [0.05] * 90 + [7] * 9 + [60000]:
+        h.observe(ms)
+    assert h.quantile(0.5) == 0.1
+    assert h.quantile(0.95) == 10
+    assert h.quantile(1.0) == 60000                              # past the last bucket: the max
+    assert h.summary()["buckets"]["+Inf"] == 1
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from type_graph import TypeGraph
+
+ROWS = [
+    ("Application", "project", "property", "Project: the currently open project", ""),
+    ("Project", "activeSequence", "property", "Sequence: the active sequence", ""),
+    ("Project", "sequences", "property", "SequenceCollection", ""),
+    ("Sequence", "getSelection()", "method", "Array of TrackItem: the selected clips", ""),
+    ("Sequence", "setPlayerPosition()", "method", "Boolean", "newTime (String): position in ticks"),
+    ("TrackItem", "setSelected()", "method", "",
+     "state (Boolean): selected or not\nupdateUI (Boolean): redraw the UI"),
+    ("TrackItem", "Overview", "overview", "", ""),
+    ("Encoder", "startBatch()", "method", "Boolean", ""),
+]
+
+
+def test_chains_from_root():
+    graph = TypeGraph.from_rows(ROWS)
+    assert graph.chain_to("sequence") == "app.project.activeSequence"
+    assert graph.chain_to("TrackItem") == "app.project.activeSequence.getSelection()"
+    assert graph.chain_to("Encoder") == "Encoder"           # not reachable from app
+    assert graph.chain_to("Nothing") is None
+    assert graph.shortest_path("Project", "TrackItem") == ["activeSequence", "getSelection"]
+    assert graph.shortest_path("TrackItem", "Project") is None
+
+
+def test_access_path_and_resolve():
+    graph = TypeGraph.from_rows(ROWS)
+    assert (graph.access_path("TrackItem", "setSelected()")
+            == "app.project.activeSequence.getSelection()[i].setSelected(state, updateUI)")
+    best = graph.resolve("the selected clip")[0]
+    assert best["chain"] == "app.project.activeSequence.getSelection()"
+    assert best["returns"] == "TrackItem"
+    assert (graph.resolve("move the player position")[0]["chain"]
+            == "app.project.activeSequence.setPlayerPosition(newTime)")
+    assert graph.resolve("the") == []
+
+
+def test_save_load_and_graph_store(tmp_path):
+    graph = TypeGraph.from_rows(ROWS)
+    graph.save(tmp_path / "type_graph.json")
+    loaded = TypeGraph.load(tmp_path / "type_graph.json")
+    assert loaded.chain_to("TrackItem") == graph.chain_to("TrackItem")
+    store = loaded.to_graph_store()["graph_dict"]
+    assert store["Project"] == [["activeSequence", "Sequence"], ["sequences", "Sequence"]]
+    assert "TrackItem" not in store
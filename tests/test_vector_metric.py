@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from index_bundle import open_bundle, write_bundle
+from vector_metric import COSINE, L2, calibrate, load_threshold, normalize, range_search, save_metric
+
+VECTORS = normalize([[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0], [0, 0, 1], [0.7, 0.7, 0]])
+ROWS = [{"item_name": f"doc{i}"} for i in range(len(VECTORS))]
+
+
+def test_cosine_bundle_scores_are_cosine(tmp_path):
+    bundle = open_bundle(write_bundle(VECTORS, ROWS, embed_model="test", root=tmp_path, metric=COSINE))
+    D, I = bundle.search(normalize([[1, 0, 0]]), k=2)
+    assert I[0].tolist() == [0, 1]
+    assert D[0, 0] == pytest.approx(1.0) and D[0, 1] == pytest.approx(VECTORS[1, 0])
+
+
+def test_range_search_threshold_and_cap(tmp_path):
+    bundle = open_bundle(write_bundle(VECTORS, ROWS, embed_model="test", root=tmp_path, metric=COSINE))
+    queries = normalize([[1, 0, 0], [0, 0, 1], [-1, -1, -1]])
+    hits = range_search(bundle, queries, threshold=0.6)
+    assert [ids.tolist() for _, ids in hits] == [[0, 1, 4], [3], []]
+    assert np.all(np.diff(hits[0][0]) <= 0)                    # best first
+    [(sims, ids)] = range_search(bundle, queries[:1], threshold=0.6, max_k=2)
+    assert ids.tolist() == [0, 1]
+    [(sims, ids)] = range_search(bundle, queries[:1], threshold=0.6, ids=np.array([1, 2, 3]))
+    assert ids.tolist() == [1]
+
+
+def test_range_search_legacy_l2(tmp_path):
+    bundle = open_bundle(write_bundle(VECTORS, ROWS, embed_model="test", root=tmp_path))
+    [(sims, ids)] = range_search(bundle, [[1, 0, 0]], threshold=0.8)
+    assert ids.tolist() == [0, 1]                             # 1 / (1 + d) >= 0.8
+    assert sims[0] == pytest.approx(1.0)
+
+
+def test_l2_zero_threshold_keeps_top_max_k(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    index = faiss.IndexFlatL2(3)
+    index.add(VECTORS)
+    bundle = open_bundle(write_bundle(VECTORS, ROWS, embed_model="test", root=tmp_path))
+    for searched in (index, bundle):
+        [(sims, ids)] = range_search(searched, [[1, 0, 0]], threshold=0.0, max_k=3)
+        assert ids.tolist() == [0, 1, 4]
+    [(sims, ids)] = range_search(bundle, [[1, 0, 0]], threshold=0.0, ids=np.array([2, 3]))
+    assert sorted(ids.tolist()) == [2, 3]
+
+
+def test_load_threshold_without_calibration(tmp_path):
+    assert load_threshold(tmp_path, COSINE) is None
+    save_metric(tmp_path, COSINE, 0.0)
+    assert load_threshold(tmp_path, COSINE) == 0.0
+    assert load_threshold(tmp_path, L2) is None                # calibrated for another metric
+
+
+def test_faiss_matches_bundle(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    index = faiss.IndexFlatIP(3)
+    index.add(VECTORS)
+    bundle = open_bundle(write_bundle(VECTORS, ROWS, embed_model="test", root=tmp_path, metric=COSINE))
+    queries = normalize([[1, 0.2, 0], [0, 1, 1]])
+    for (s1, i1), (s2, i2) in zip(range_search(index, queries, 0.5), range_search(bundle, queries, 0.5)):
+        assert i1.tolist() == i2.tolist()
+        assert np.allclose(s1, s2, atol=1e-5)
+
+
+def test_calibrate_between_noise_and_matches():
+    rng = np.random.default_rng(1)
+    threshold = calibrate(rng.normal(size=(200, 32)), COSINE)
+    assert 0.2 < threshold < 0.6          # random 32-d directions rarely exceed this
+    assert calibrate(np.zeros((1, 4)), L2) == 0.5